@@ -15,6 +15,7 @@ drop table if exists shuttle_period_type cascade;
 drop table if exists shuttle_route_stop cascade;
 drop table if exists shuttle_route cascade;
 drop table if exists shuttle_stop cascade;
+drop table if exists shuttle_version cascade;
 drop table if exists shuttle_holiday cascade;
 
 -- 통학버스 테이블 삭제
@@ -25,12 +26,16 @@ drop table if exists commute_shuttle_stop cascade;
 -- 버스 테이블 삭제
 drop table if exists bus_realtime cascade;
 drop table if exists bus_departure_log cascade;
+drop table if exists bus_departure_log_daily cascade;
+drop table if exists bus_departure_statistics cascade;
+drop table if exists bus_departure_statistics_state cascade;
 drop table if exists bus_route_stop cascade;
 drop table if exists bus_timetable cascade;
 drop table if exists bus_route cascade;
 drop table if exists bus_stop cascade;
 
 -- 전철 테이블 삭제
+drop table if exists subway_realtime_version cascade;
 drop table if exists subway_realtime cascade;
 drop table if exists subway_timetable cascade;
 drop table if exists subway_route_station cascade;
@@ -166,6 +171,13 @@ create table if not exists shuttle_timetable(
         references shuttle_route(route_name)
 );
 
+-- 셔틀 데이터 버전 (셔틀 데이터가 변경될 때마다 증가)
+create table if not exists shuttle_version(
+    version_id bigserial primary key, -- 버전 ID
+    version_name varchar(30) not null, -- 버전 이름
+    created_at timestamptz not null -- 생성 시간
+);
+
 -- 셔틀 임시 휴일
 create table if not exists shuttle_holiday(
     holiday_date date not null,
@@ -282,26 +294,26 @@ create materialized view if not exists shuttle_timetable_grouped_view as
     inner join shuttle_route on shuttle_route_stop.route_name = shuttle_route.route_name
     where shuttle_route_stop.stop_name in ('dormitory_o', 'shuttlecock_o', 'station') and shuttle_route.route_tag = 'DJ';
 
--- 셔틀 운행 시간표 뷰 업데이트 트리거
-create or replace function update_shuttle_timetable_view()
-returns trigger as $$
-begin
-    refresh materialized view shuttle_timetable_view;
-    return new;
-end;
-$$ language plpgsql;
+-- 셔틀 운행 시간표 뷰 인덱스 (refresh materialized view concurrently)
+-- 뷰 갱신은 애플리케이션에서 변경을 모아 한 번에 수행한다. (shuttle/refresh.py)
+create unique index if not exists uq_shuttle_timetable_view
+    on shuttle_timetable_view (seq, stop_name);
+
+create unique index if not exists uq_shuttle_timetable_grouped_view
+    on shuttle_timetable_grouped_view (seq, stop_name, destination_group);
 
-create trigger update_shuttle_timetable_view_timetable
-after insert or update or delete on shuttle_timetable
-for each row execute procedure update_shuttle_timetable_view();
+-- 기간, 평일 여부, 정류장으로 필터링한 뒤 출발 시각 순으로 읽는 조회용 인덱스
+create index if not exists idx_shuttle_timetable_view_stop_time
+    on shuttle_timetable_view (period_type, weekday, stop_name, departure_time)
+    include (seq, route_name, route_tag);
 
-create trigger update_shuttle_timetable_view_route_stop
-after insert or update or delete on shuttle_route_stop
-for each row execute procedure update_shuttle_timetable_view();
+create index if not exists idx_shuttle_timetable_grouped_view_destination_time
+    on shuttle_timetable_grouped_view (period_type, weekday, stop_name, destination_group, departure_time)
+    include (seq, route_name, route_tag);
 
-create trigger update_shuttle_timetable_view_route
-after insert or update or delete on shuttle_route
-for each row execute procedure update_shuttle_timetable_view();
+create index if not exists idx_shuttle_timetable_grouped_view_stop_time
+    on shuttle_timetable_grouped_view (period_type, weekday, stop_name, departure_time)
+    include (seq, route_name, route_tag, destination_group);
 
 -- 통학버스 운행 노선
 create table if not exists commute_shuttle_route (
@@ -414,6 +426,48 @@ create table if not exists bus_departure_log (
     constraint pk_bus_departure_log primary key (stop_id, route_id, departure_date, departure_time),
     constraint fk_bus_departure_log_stop_id
         foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+) partition by range (departure_date);
+
+-- 월별 파티션은 애플리케이션이 생성하고, 범위를 벗어난 기록은 기본 파티션에 저장한다.
+create table if not exists bus_departure_log_default
+    partition of bus_departure_log default;
+
+-- 보존 기간이 지난 버스 운행 이력의 일별 요약
+create table if not exists bus_departure_log_daily (
+    stop_id int not null, -- 정류장 ID
+    route_id int not null, -- 노선 ID
+    departure_date date not null, -- 출발 날짜
+    first_departure_time timetz not null, -- 첫 출발 시간
+    last_departure_time timetz not null, -- 마지막 출발 시간
+    departure_count int not null, -- 출발 횟수
+    constraint pk_bus_departure_log_daily primary key (stop_id, route_id, departure_date),
+    constraint fk_bus_departure_log_daily_stop_id
+        foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+);
+
+-- 버스 운행 통계 (노선, 정류장, 요일, 시간대별 배차 간격과 시간표 대비 편차)
+create table if not exists bus_departure_statistics (
+    route_id int not null, -- 노선 ID
+    stop_id int not null, -- 정류장 ID
+    weekday varchar(10) not null, -- 평일, 토요일, 일요일 여부
+    departure_hour int not null, -- 출발 시간대
+    departure_count int not null default 0, -- 출발 횟수
+    headway_count int not null default 0, -- 배차 간격 표본 수
+    headway_sum double precision not null default 0, -- 배차 간격 합 (초)
+    deviation_count int not null default 0, -- 편차 표본 수
+    deviation_sum double precision not null default 0, -- 편차 합 (초)
+    early_count int not null default 0, -- 조기 출발 횟수
+    late_count int not null default 0, -- 지연 출발 횟수
+    deviation_histogram int[] not null, -- 분 단위 편차 분포 (-30분 ~ 30분)
+    constraint pk_bus_departure_statistics primary key (route_id, stop_id, weekday, departure_hour),
+    constraint fk_bus_departure_statistics_stop_id
+        foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+);
+
+-- 버스 운행 통계 집계 상태 (마지막으로 집계한 날짜)
+create table if not exists bus_departure_statistics_state (
+    state_id int primary key default 1 check (state_id = 1),
+    aggregated_date date not null -- 집계 완료 날짜
 );
 
 -- 버스 회차지 출발 시간표
@@ -480,6 +534,13 @@ create table if not exists subway_realtime(
         references subway_route_station(station_id)
 );
 
+-- 전철 실시간 운행 정보 스냅샷 버전 (스냅샷을 교체할 때마다 증가)
+create table if not exists subway_realtime_version(
+    version_id bigserial primary key, -- 버전 ID
+    version_name varchar(30) not null, -- 버전 이름
+    created_at timestamptz not null -- 생성 시간
+);
+
 -- 전철 시간표
 create table if not exists subway_timetable(
     station_id varchar(10) not null, -- 역 ID
@@ -629,3 +690,25 @@ create table if not exists room(
         foreign key (building_name)
         references building(name)
 );
+
+-- 이름 검색용 trigram 인덱스 (pg_trgm 확장을 사용할 수 있을 때만 만들고, 없으면 애플리케이션의 n-gram 인덱스를 쓴다.)
+do $$
+begin
+    if exists (select 1 from pg_available_extensions where name = 'pg_trgm') then
+        create extension if not exists pg_trgm;
+        create index if not exists idx_bus_stop_name_trgm on bus_stop using gin (stop_name gin_trgm_ops);
+        create index if not exists idx_subway_route_station_name_trgm
+            on subway_route_station using gin (station_name gin_trgm_ops);
+        create index if not exists idx_building_name_trgm on building using gin (name gin_trgm_ops);
+        create index if not exists idx_room_name_trgm on room using gin (name gin_trgm_ops);
+        create index if not exists idx_room_number_trgm on room using gin (number gin_trgm_ops);
+        create index if not exists idx_room_building_name_trgm on room using gin (building_name gin_trgm_ops);
+        create index if not exists idx_restaurant_name_trgm on restaurant using gin (restaurant_name gin_trgm_ops);
+        create index if not exists idx_reading_room_name_trgm on reading_room using gin (room_name gin_trgm_ops);
+        create index if not exists idx_notices_title_trgm on notices using gin (title gin_trgm_ops);
+        create index if not exists idx_phonebook_name_trgm on phonebook using gin (name gin_trgm_ops);
+        create index if not exists idx_academic_calendar_title_trgm
+            on academic_calendar using gin (title gin_trgm_ops);
+    end if;
+end
+$$;
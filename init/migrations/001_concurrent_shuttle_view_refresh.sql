@@ -0,0 +1,14 @@
+-- 셔틀 운행 시간표 뷰를 애플리케이션에서 concurrently 갱신하도록 변경한다.
+drop trigger if exists update_shuttle_timetable_view_timetable on shuttle_timetable;
+drop trigger if exists update_shuttle_timetable_view_route_stop on shuttle_route_stop;
+drop trigger if exists update_shuttle_timetable_view_route on shuttle_route;
+drop function if exists update_shuttle_timetable_view();
+
+create unique index if not exists uq_shuttle_timetable_view
+    on shuttle_timetable_view (seq, stop_name);
+
+create unique index if not exists uq_shuttle_timetable_grouped_view
+    on shuttle_timetable_grouped_view (seq, stop_name, destination_group);
+
+refresh materialized view shuttle_timetable_view;
+refresh materialized view shuttle_timetable_grouped_view;
@@ -0,0 +1,15 @@
+-- 셔틀 운행 시간표 뷰 조회용 인덱스를 추가한다.
+create index if not exists idx_shuttle_timetable_view_stop_time
+    on shuttle_timetable_view (period_type, weekday, stop_name, departure_time)
+    include (seq, route_name, route_tag);
+
+create index if not exists idx_shuttle_timetable_grouped_view_destination_time
+    on shuttle_timetable_grouped_view (period_type, weekday, stop_name, destination_group, departure_time)
+    include (seq, route_name, route_tag);
+
+create index if not exists idx_shuttle_timetable_grouped_view_stop_time
+    on shuttle_timetable_grouped_view (period_type, weekday, stop_name, departure_time)
+    include (seq, route_name, route_tag, destination_group);
+
+analyze shuttle_timetable_view;
+analyze shuttle_timetable_grouped_view;
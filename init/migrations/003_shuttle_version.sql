@@ -0,0 +1,6 @@
+-- 셔틀 데이터 버전 (ETag, GraphQL version 인자)
+create table if not exists shuttle_version(
+    version_id bigserial primary key, -- 버전 ID
+    version_name varchar(30) not null, -- 버전 이름
+    created_at timestamptz not null -- 생성 시간
+);
@@ -0,0 +1,57 @@
+-- 버스 운행 이력을 출발 날짜 기준 월별 파티션으로 전환한다.
+begin;
+
+alter table bus_departure_log rename to bus_departure_log_old;
+alter table bus_departure_log_old rename constraint pk_bus_departure_log to pk_bus_departure_log_old;
+alter table bus_departure_log_old rename constraint fk_bus_departure_log_stop_id to fk_bus_departure_log_old_stop_id;
+
+create table bus_departure_log (
+    stop_id int not null, -- 정류장 ID
+    route_id int not null, -- 노선 ID
+    departure_date date not null, -- 출발 날짜
+    departure_time timetz not null, -- 출발 시간
+    vehicle_id varchar(20) not null, -- 차량 ID
+    constraint pk_bus_departure_log primary key (stop_id, route_id, departure_date, departure_time),
+    constraint fk_bus_departure_log_stop_id
+        foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+) partition by range (departure_date);
+
+create table bus_departure_log_default
+    partition of bus_departure_log default;
+
+-- 기존 기록이 있는 달의 파티션을 만든다.
+do $$
+declare
+    month date;
+begin
+    for month in
+        select distinct date_trunc('month', departure_date)::date from bus_departure_log_old
+        union
+        select date_trunc('month', current_date)::date
+    loop
+        execute format(
+            'create table %I partition of bus_departure_log for values from (%L) to (%L)',
+            'bus_departure_log_p' || to_char(month, 'YYYYMM'),
+            month,
+            (month + interval '1 month')::date
+        );
+    end loop;
+end
+$$;
+
+insert into bus_departure_log select * from bus_departure_log_old;
+drop table bus_departure_log_old;
+
+create table if not exists bus_departure_log_daily (
+    stop_id int not null, -- 정류장 ID
+    route_id int not null, -- 노선 ID
+    departure_date date not null, -- 출발 날짜
+    first_departure_time timetz not null, -- 첫 출발 시간
+    last_departure_time timetz not null, -- 마지막 출발 시간
+    departure_count int not null, -- 출발 횟수
+    constraint pk_bus_departure_log_daily primary key (stop_id, route_id, departure_date),
+    constraint fk_bus_departure_log_daily_stop_id
+        foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+);
+
+commit;
@@ -0,0 +1,24 @@
+-- 버스 운행 통계 (노선, 정류장, 요일, 시간대별 배차 간격과 시간표 대비 편차)
+create table if not exists bus_departure_statistics (
+    route_id int not null, -- 노선 ID
+    stop_id int not null, -- 정류장 ID
+    weekday varchar(10) not null, -- 평일, 토요일, 일요일 여부
+    departure_hour int not null, -- 출발 시간대
+    departure_count int not null default 0, -- 출발 횟수
+    headway_count int not null default 0, -- 배차 간격 표본 수
+    headway_sum double precision not null default 0, -- 배차 간격 합 (초)
+    deviation_count int not null default 0, -- 편차 표본 수
+    deviation_sum double precision not null default 0, -- 편차 합 (초)
+    early_count int not null default 0, -- 조기 출발 횟수
+    late_count int not null default 0, -- 지연 출발 횟수
+    deviation_histogram int[] not null, -- 분 단위 편차 분포 (-30분 ~ 30분)
+    constraint pk_bus_departure_statistics primary key (route_id, stop_id, weekday, departure_hour),
+    constraint fk_bus_departure_statistics_stop_id
+        foreign key (stop_id, route_id) references bus_route_stop(stop_id, route_id)
+);
+
+-- 버스 운행 통계 집계 상태 (마지막으로 집계한 날짜)
+create table if not exists bus_departure_statistics_state (
+    state_id int primary key default 1 check (state_id = 1),
+    aggregated_date date not null -- 집계 완료 날짜
+);
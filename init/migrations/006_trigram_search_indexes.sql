@@ -0,0 +1,21 @@
+-- 이름 검색용 trigram 인덱스 (pg_trgm 확장을 사용할 수 있을 때만 만들고, 없으면 애플리케이션의 n-gram 인덱스를 쓴다.)
+do $$
+begin
+    if exists (select 1 from pg_available_extensions where name = 'pg_trgm') then
+        create extension if not exists pg_trgm;
+        create index if not exists idx_bus_stop_name_trgm on bus_stop using gin (stop_name gin_trgm_ops);
+        create index if not exists idx_subway_route_station_name_trgm
+            on subway_route_station using gin (station_name gin_trgm_ops);
+        create index if not exists idx_building_name_trgm on building using gin (name gin_trgm_ops);
+        create index if not exists idx_room_name_trgm on room using gin (name gin_trgm_ops);
+        create index if not exists idx_room_number_trgm on room using gin (number gin_trgm_ops);
+        create index if not exists idx_room_building_name_trgm on room using gin (building_name gin_trgm_ops);
+        create index if not exists idx_restaurant_name_trgm on restaurant using gin (restaurant_name gin_trgm_ops);
+        create index if not exists idx_reading_room_name_trgm on reading_room using gin (room_name gin_trgm_ops);
+        create index if not exists idx_notices_title_trgm on notices using gin (title gin_trgm_ops);
+        create index if not exists idx_phonebook_name_trgm on phonebook using gin (name gin_trgm_ops);
+        create index if not exists idx_academic_calendar_title_trgm
+            on academic_calendar using gin (title gin_trgm_ops);
+    end if;
+end
+$$;
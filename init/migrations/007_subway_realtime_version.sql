@@ -0,0 +1,6 @@
+-- 전철 실시간 운행 정보 스냅샷 버전 (ETag)
+create table if not exists subway_realtime_version(
+    version_id bigserial primary key, -- 버전 ID
+    version_name varchar(30) not null, -- 버전 이름
+    created_at timestamptz not null -- 생성 시간
+);
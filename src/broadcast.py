@@ -0,0 +1,152 @@
+# Server-sent event fan-out of realtime snapshots.
+import asyncio
+import datetime
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from fastapi import Request
+from redis.exceptions import RedisError
+from strawberry.schema.name_converter import NameConverter
+from strawberry.types.base import has_object_definition
+
+import database
+from config import settings
+
+K = TypeVar("K", bound=Hashable)
+logger = logging.getLogger(__name__)
+name_converter = NameConverter()
+
+
+def graphql_payload(value: Any) -> Any:
+    """Converts strawberry objects to plain data with the field names and scalars of the GraphQL response."""
+    if has_object_definition(value):
+        return {
+            name_converter.get_graphql_name(field): graphql_payload(getattr(value, field.python_name))
+            for field in value.__strawberry_definition__.fields
+        }
+    if isinstance(value, (list, tuple)):
+        return [graphql_payload(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+def format_event(key: Any, payload: Any) -> str:
+    return f"event: realtime\ndata: {json.dumps({'key': key, 'data': payload}, ensure_ascii=False)}\n\n"
+
+
+class RealtimeBroadcaster(Generic[K]):
+    """Pushes the realtime arrivals of a key (stop, station) to every subscriber of that key.
+
+    Ingestion publishes the keys of a new snapshot on a Redis channel so that every
+    worker hears about it. A single listener task per worker then loads the keys
+    that have subscribers once and queues only the ones whose payload changed.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        loader: Callable[[set[K]], Awaitable[dict[K, Any]]],
+    ) -> None:
+        self._channel = channel
+        self._loader = loader
+        self._subscribers: dict[K, set[asyncio.Queue]] = {}
+        self._last: dict[K, Any] = {}
+        self._task: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def subscribe(self, keys: Iterable[K]) -> AsyncIterator[asyncio.Queue]:
+        keys = set(keys)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.REALTIME_STREAM_QUEUE_SIZE)
+        for key in keys:
+            self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            for key in keys:
+                self._subscribers[key].discard(queue)
+                if not self._subscribers[key]:
+                    del self._subscribers[key]
+                    self._last.pop(key, None)
+
+    async def publish(self, keys: Iterable[K]) -> None:
+        keys = set(keys)
+        if not keys:
+            return
+        if self._task is not None and not self._task.done():
+            try:
+                await database.redis_client.publish(self._channel, json.dumps(sorted(keys)))
+                return
+            except (RedisError, OSError):
+                logger.warning("Failed to publish realtime update on %s", self._channel, exc_info=True)
+        # 리스너가 없으면 이 워커의 구독자에게만 바로 전달한다.
+        try:
+            await self.dispatch(keys)
+        except Exception:
+            logger.exception("Failed to dispatch realtime update on %s", self._channel)
+
+    async def dispatch(self, keys: set[K]) -> None:
+        keys = keys & self._subscribers.keys()
+        if not keys:
+            return
+        payloads = await self._loader(keys)
+        for key in keys:
+            payload = payloads.get(key, [])
+            if key in self._last and self._last[key] == payload:
+                continue
+            self._last[key] = payload
+            for queue in self._subscribers.get(key, ()):
+                if queue.full():
+                    # 느린 구독자는 오래된 갱신을 버리고 최신 갱신을 받는다.
+                    queue.get_nowait()
+                queue.put_nowait((key, payload))
+
+    async def stream(self, keys: Iterable[K], request: Request) -> AsyncIterator[str]:
+        keys = set(keys)
+        async with self.subscribe(keys) as queue:
+            payloads = await self._loader(keys)
+            for key in sorted(keys):
+                payload = payloads.get(key, [])
+                self._last.setdefault(key, payload)
+                yield format_event(key, payload)
+            while not await request.is_disconnected():
+                try:
+                    key, payload = await asyncio.wait_for(queue.get(), timeout=settings.REALTIME_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(key, payload)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with database.redis_client.pubsub() as pubsub:
+                    await pubsub.subscribe(self._channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        try:
+                            await self.dispatch(set(json.loads(message["data"])))
+                        except Exception:
+                            # 한 번의 전달 실패로 구독을 끊지 않고 다음 갱신을 기다린다.
+                            logger.exception("Failed to dispatch realtime update on %s", self._channel)
+            except (RedisError, OSError):
+                logger.warning("Realtime listener on %s disconnected", self._channel, exc_info=True)
+            except Exception:
+                logger.exception("Realtime listener on %s failed", self._channel)
+            await asyncio.sleep(settings.REALTIME_STREAM_RETRY_INTERVAL)
@@ -6,6 +6,7 @@ from sqlalchemy.orm import joinedload, load_only
 
 from database import fetch_all
 from model.building import Building, Room
+from search import text_search
 
 
 @strawberry.type
@@ -45,9 +46,12 @@ async def resolve_building(
         conditions.append(Building.longitude < east)
     if west is not None:
         conditions.append(Building.longitude > west)
+    order = []
     if name is not None:
-        conditions.append(Building.name.like(f"%{name}%"))
-    select_query = select(Building).where(*conditions)
+        name_search = await text_search(Building.name, name)
+        conditions.append(name_search.condition)
+        order.append(name_search.rank.desc())
+    select_query = select(Building).where(*conditions).order_by(*order, Building.id_)
     building_list: list[Building] = await fetch_all(select_query)
     mapping_func: Callable[[Building], BuildingQuery] = lambda building: BuildingQuery(
         _id=building.id_,
@@ -64,16 +68,20 @@ async def resolve_room(
     name: Optional[str] = None,
     number: Optional[str] = None,
 ) -> list[RoomQuery]:
-    conditions = []
-    if building_name is not None:
-        conditions.append(Room.building_name.like(f"%{building_name}%"))
-    if name is not None:
-        conditions.append(Room.name.like(f"%{name}%"))
-    if number is not None:
-        conditions.append(Room.number.like(f"%{number}%"))
+    conditions, order = [], []
+    for column, term in (
+        (Room.name, name),
+        (Room.number, number),
+        (Room.building_name, building_name),
+    ):
+        if term is not None:
+            search = await text_search(column, term)
+            conditions.append(search.condition)
+            order.append(search.rank.desc())
     select_query = (
         select(Room)
         .where(*conditions)
+        .order_by(*order, Room.building_name, Room.number)
         .options(
             joinedload(Room.building).options(
                 load_only(Building.name, Building.latitude, Building.longitude),
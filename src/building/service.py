@@ -8,6 +8,7 @@ from building.schemas import (
 )
 from database import fetch_all, fetch_one, execute_query
 from model.building import Building, Room
+from search import invalidate_index
 
 
 async def list_building() -> list[Building]:
@@ -50,6 +51,7 @@ async def create_building(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(Building.name, Room.name, Room.number, Room.building_name)
     select_query = select(Building).where(Building.name == new_building.name)
     return await fetch_one(select_query)
 
@@ -73,6 +75,7 @@ async def update_building(
         .values(payload)
     )
     await execute_query(update_query)
+    invalidate_index(Building.name, Room.name, Room.number, Room.building_name)
     select_query = select(Building).where(Building.name == building_name)
     return await fetch_one(select_query)
 
@@ -80,6 +83,7 @@ async def update_building(
 async def delete_building(building_name: str) -> None:
     delete_query = delete(Building).where(Building.id_ == building_name)
     await execute_query(delete_query)
+    invalidate_index(Building.name, Room.name, Room.number, Room.building_name)
 
 
 async def list_room_filter(
@@ -122,6 +126,7 @@ async def create_room(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(Room.name, Room.number, Room.building_name)
     select_query = select(Room).where(
         Room.building_name == building_name,
         Room.number == new_room.number,
@@ -149,6 +154,7 @@ async def update_room(
         .values(payload)
     )
     await execute_query(update_query)
+    invalidate_index(Room.name, Room.number, Room.building_name)
     select_query = select(Room).where(
         Room.building_name == building_name,
         Room.number == new_room.number,
@@ -162,3 +168,4 @@ async def delete_room(building_name: str, room_number: str) -> None:
         Room.number == room_number,
     )
     await execute_query(delete_query)
+    invalidate_index(Room.name, Room.number, Room.building_name)
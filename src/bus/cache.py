@@ -0,0 +1,262 @@
+import datetime
+import json
+import logging
+from typing import Iterable
+
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import select, tuple_
+
+import database
+from bus.eta import project_realtime
+from config import settings
+from database import fetch_all, fetch_rows
+from model.bus import BusRealtime
+
+logger = logging.getLogger(__name__)
+REALTIME_KEY_PREFIX = "bus:realtime"
+# 데이터베이스에 도착 정보가 있는 (정류장, 노선) 목록
+REALTIME_INDEX_KEY = f"{REALTIME_KEY_PREFIX}:index"
+
+RealtimeKey = tuple[int, int]  # (stop_id, route_id)
+
+
+def realtime_key(stop_id: int, route_id: int) -> str:
+    return f"{REALTIME_KEY_PREFIX}:{stop_id}:{route_id}"
+
+
+def index_member(stop_id: int, route_id: int) -> str:
+    return f"{stop_id}:{route_id}"
+
+
+def parse_index_member(member: str | bytes) -> RealtimeKey:
+    if isinstance(member, bytes):
+        member = member.decode()
+    stop_id, route_id = member.split(":")
+    return int(stop_id), int(route_id)
+
+
+def realtime_ttl(items: Iterable[BusRealtime]) -> int:
+    # 가장 늦게 도착하는 버스가 도착하면 항목 전체가 의미가 없어진다.
+    remaining = max(
+        (int(item.time.total_seconds()) for item in items),
+        default=settings.BUS_REALTIME_CACHE_TTL,
+    )
+    return max(1, min(remaining, settings.BUS_REALTIME_CACHE_TTL))
+
+
+def encode_realtime(items: Iterable[BusRealtime]) -> str:
+    return json.dumps(
+        [
+            {
+                "sequence": item.sequence,
+                "stops": item.stops,
+                "seats": item.seats,
+                "time": item.time.total_seconds(),
+                "lowFloor": item.low_floor,
+                "updatedAt": item.updated_at.isoformat(),
+            }
+            for item in items
+        ],
+    )
+
+
+def decode_realtime(stop_id: int, route_id: int, value: str) -> list[BusRealtime]:
+    return [
+        BusRealtime(
+            stop_id=stop_id,
+            route_id=route_id,
+            sequence=item["sequence"],
+            stops=item["stops"],
+            seats=item["seats"],
+            time=datetime.timedelta(seconds=item["time"]),
+            low_floor=item["lowFloor"],
+            updated_at=datetime.datetime.fromisoformat(item["updatedAt"]),
+        )
+        for item in json.loads(value)
+    ]
+
+
+async def write_realtime(entries: dict[RealtimeKey, list[BusRealtime]]) -> None:
+    """Stores realtime arrivals per (stop, route); an empty list caches the absence of arrivals."""
+    if database.redis_client is None or not entries:
+        return
+    try:
+        async with database.redis_client.pipeline(transaction=False) as pipe:
+            for (stop_id, route_id), items in entries.items():
+                await pipe.set(
+                    realtime_key(stop_id, route_id),
+                    encode_realtime(items),
+                    ex=realtime_ttl(items),
+                )
+            await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("Failed to write bus realtime cache", exc_info=True)
+
+
+async def read_realtime(keys: Iterable[RealtimeKey]) -> dict[RealtimeKey, list[BusRealtime]]:
+    """Returns cached arrivals; keys missing from the result are cache misses."""
+    keys = list(keys)
+    if database.redis_client is None or not keys:
+        return {}
+    try:
+        values = await database.redis_client.mget(
+            [realtime_key(stop_id, route_id) for stop_id, route_id in keys],
+        )
+    except (RedisError, OSError):
+        logger.warning("Failed to read bus realtime cache", exc_info=True)
+        return {}
+    return {
+        key: decode_realtime(*key, value)
+        for key, value in zip(keys, values)
+        if value is not None
+    }
+
+
+async def read_realtime_index() -> set[RealtimeKey] | None:
+    """Returns the cached (stop, route) pairs in the database, or None if the index is missing."""
+    if database.redis_client is None:
+        return None
+    try:
+        async with database.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.exists(REALTIME_INDEX_KEY)
+            await pipe.smembers(REALTIME_INDEX_KEY)
+            exists, members = await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("Failed to read bus realtime index", exc_info=True)
+        return None
+    if not exists:
+        return None
+    return {parse_index_member(member) for member in members}
+
+
+async def build_realtime_index(keys: Iterable[RealtimeKey]) -> None:
+    """Replaces the index with the full list of pairs read from the database."""
+    if database.redis_client is None:
+        return
+    members = [index_member(stop_id, route_id) for stop_id, route_id in keys]
+    if not members:
+        # 빈 집합은 저장되지 않으므로 다음 조회도 데이터베이스에서 읽는다.
+        return
+    try:
+        async with database.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.delete(REALTIME_INDEX_KEY)
+            await pipe.sadd(REALTIME_INDEX_KEY, *members)
+            await pipe.expire(REALTIME_INDEX_KEY, settings.BUS_REALTIME_INDEX_TTL)
+            await pipe.execute()
+    except (RedisError, OSError):
+        logger.warning("Failed to build bus realtime index", exc_info=True)
+
+
+async def update_realtime_index(
+    removed: Iterable[RealtimeKey],
+    added: Iterable[RealtimeKey],
+) -> None:
+    """Applies a realtime replacement to the index; a missing index stays missing."""
+    if database.redis_client is None:
+        return
+    removed_members = [index_member(stop_id, route_id) for stop_id, route_id in removed]
+    added_members = [index_member(stop_id, route_id) for stop_id, route_id in added]
+    try:
+        async with database.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.watch(REALTIME_INDEX_KEY)
+            # 목록이 없을 때 일부만 추가하면 전체 목록으로 오인하므로 그대로 둔다.
+            if not await pipe.exists(REALTIME_INDEX_KEY):
+                return
+            pipe.multi()
+            if removed_members:
+                await pipe.srem(REALTIME_INDEX_KEY, *removed_members)
+            if added_members:
+                await pipe.sadd(REALTIME_INDEX_KEY, *added_members)
+            await pipe.execute()
+    except WatchError:
+        # 다른 요청이 동시에 목록을 바꿨다면 다음 조회에서 다시 만든다.
+        await delete_realtime_index()
+    except (RedisError, OSError):
+        logger.warning("Failed to update bus realtime index", exc_info=True)
+        await delete_realtime_index()
+
+
+async def delete_realtime_index() -> None:
+    try:
+        await database.redis_client.delete(REALTIME_INDEX_KEY)
+    except (RedisError, OSError):
+        logger.warning("Failed to delete bus realtime index", exc_info=True)
+
+
+async def clear_realtime() -> None:
+    if database.redis_client is None:
+        return
+    try:
+        keys = [key async for key in database.redis_client.scan_iter(match=f"{REALTIME_KEY_PREFIX}:*")]
+        if keys:
+            await database.redis_client.delete(*keys)
+    except (RedisError, OSError):
+        logger.warning("Failed to clear bus realtime cache", exc_info=True)
+
+
+def group_realtime(rows: Iterable[BusRealtime]) -> dict[RealtimeKey, list[BusRealtime]]:
+    grouped: dict[RealtimeKey, list[BusRealtime]] = {}
+    for row in rows:
+        grouped.setdefault((row.stop_id, row.route_id), []).append(row)
+    return grouped
+
+
+async def get_realtime(keys: Iterable[RealtimeKey]) -> dict[RealtimeKey, list[BusRealtime]]:
+    """Reads arrivals from Redis and loads only the missing (stop, route) pairs from Postgres.
+
+    Pairs without arrivals of their own are projected from the nearest upstream stop of the route.
+    """
+    keys = set(keys)
+    result = await read_realtime(keys)
+    missing = keys - result.keys()
+    if missing:
+        # 상류 정류장의 도착 정보로 추정할 수 있도록 노선 전체를 읽는다.
+        select_query = select(BusRealtime).where(
+            BusRealtime.route_id.in_({route_id for _, route_id in missing}),
+        )
+        loaded = group_realtime(await fetch_all(select_query))
+        entries = {key: loaded.get(key, []) for key in missing}
+        entries.update(await project_realtime(loaded, [key for key in missing if not entries[key]]))
+        await write_realtime(entries)
+        result.update(entries)
+    return result
+
+
+async def list_realtime(
+    stop_id: int | None = None,
+    route_id: int | None = None,
+) -> list[BusRealtime]:
+    if stop_id is not None and route_id is not None:
+        cached = await get_realtime([(stop_id, route_id)])
+    else:
+        conditions = []
+        if stop_id is not None:
+            conditions.append(BusRealtime.stop_id == stop_id)
+        if route_id is not None:
+            conditions.append(BusRealtime.route_id == route_id)
+        # 캐시는 일부만 채워져 있을 수 있으므로 (정류장, 노선) 목록은 Redis의 목록을 기준으로 하고,
+        # 목록이 없으면 데이터베이스에서 다시 만든다.
+        index = await read_realtime_index()
+        if index is None:
+            index = {
+                (row.stop_id, row.route_id)
+                for row in await fetch_rows(select(BusRealtime.stop_id, BusRealtime.route_id).distinct())
+            }
+            await build_realtime_index(index)
+        keys = {
+            (key_stop_id, key_route_id)
+            for key_stop_id, key_route_id in index
+            if (stop_id is None or key_stop_id == stop_id) and (route_id is None or key_route_id == route_id)
+        }
+        # 빈 목록으로 캐시된 항목은 데이터베이스와 맞지 않으므로 다시 읽는다.
+        cached = {key: items for key, items in (await read_realtime(keys)).items() if items}
+        missing = keys - cached.keys()
+        if missing:
+            select_query = select(BusRealtime).where(
+                *conditions,
+                tuple_(BusRealtime.stop_id, BusRealtime.route_id).in_(missing),
+            )
+            loaded = group_realtime(await fetch_all(select_query))
+            await write_realtime(loaded)
+            cached.update(loaded)
+    return [item for key in sorted(cached) for item in sorted(cached[key], key=lambda x: x.sequence)]
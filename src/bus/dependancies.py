@@ -1,5 +1,16 @@
+import codecs
+import csv
+import json
+from typing import Annotated, AsyncIterator
+
+from fastapi import Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
 from bus import service
 from bus.exceptions import (
+    DuplicateRealtime,
+    RouteStopNotFound,
     DuplicateTimetable,
     StartStopNotFound,
     RouteNotFound,
@@ -12,7 +23,10 @@ from bus.schemas import (
     CreateBusStopRequest,
     CreateBusRouteStopRequest,
     CreateBusTimetableRequest,
+    BusRealtimeIngestRequest,
+    BusRealtimeSnapshotRequest,
 )
+from config import settings
 from utils import KST
 
 
@@ -66,3 +80,109 @@ async def create_valid_timetable(
     ):
         raise DuplicateTimetable()
     return new_timetable
+
+
+async def create_valid_realtime_snapshot(
+    snapshot: BusRealtimeIngestRequest,
+) -> list[BusRealtimeSnapshotRequest]:
+    keys = [(item.stop_id, item.route_id, arrival.sequence) for item in snapshot.data for arrival in item.arrivals]
+    if len(keys) != len(set(keys)):
+        raise DuplicateRealtime()
+    route_stops = {(item.stop_id, item.route_id) for item in snapshot.data}
+    if route_stops and await service.list_route_stop_keys(route_stops) != route_stops:
+        raise RouteStopNotFound()
+    return snapshot.data
+
+
+async def get_valid_stream_stops(stop_id: Annotated[list[int], Query()]) -> set[int]:
+    stop_ids = set(stop_id)
+    if await service.list_stop_ids(stop_ids) != stop_ids:
+        raise StopNotFound()
+    return stop_ids
+
+
+async def iter_request_lines(request: Request) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_timetable_rows(request: Request) -> AsyncIterator[tuple[int, dict]]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("text/csv"):
+        header: list[str] | None = None
+        line_no = 0
+        async for line in iter_request_lines(request):
+            line_no += 1
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [value.strip() for value in values]
+                continue
+            yield line_no, dict(zip(header, values))
+    elif content_type.startswith("application/x-ndjson"):
+        line_no = 0
+        async for line in iter_request_lines(request):
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise RequestValidationError([{"type": "json_invalid", "loc": ("body", line_no), "msg": e.msg}])
+    else:
+        # JSON 배열은 한 번에 파싱한다. 큰 파일은 CSV나 NDJSON으로 보내야 스트리밍된다.
+        try:
+            rows = json.loads((await request.body()).decode("utf-8-sig"))
+        except json.JSONDecodeError as e:
+            raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": e.msg}])
+        if not isinstance(rows, list):
+            raise RequestValidationError([{"type": "list_type", "loc": ("body",), "msg": "Input should be a list"}])
+        for index, row in enumerate(rows):
+            yield index, row
+
+
+async def iter_valid_timetable_import(request: Request) -> AsyncIterator[list[CreateBusTimetableRequest]]:
+    """Parses an uploaded timetable incrementally and yields validated batches.
+
+    Route and start stop references are checked once per batch and remembered across batches.
+    """
+    known_routes: set[int] = set()
+    known_stops: set[int] = set()
+    batch: list[CreateBusTimetableRequest] = []
+
+    async def validate(items: list[CreateBusTimetableRequest]) -> list[CreateBusTimetableRequest]:
+        route_ids = {item.route_id for item in items} - known_routes
+        if route_ids:
+            found = await service.list_route_ids(route_ids)
+            if found != route_ids:
+                raise RouteNotFound()
+            known_routes.update(found)
+        stop_ids = {item.start_stop_id for item in items} - known_stops
+        if stop_ids:
+            found = await service.list_stop_ids(stop_ids)
+            if found != stop_ids:
+                raise StartStopNotFound()
+            known_stops.update(found)
+        return items
+
+    async for position, row in iter_timetable_rows(request):
+        try:
+            batch.append(CreateBusTimetableRequest.model_validate(row))
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", position, *error["loc"])} for error in e.errors()],
+            )
+        if len(batch) >= settings.BUS_TIMETABLE_IMPORT_BATCH_SIZE:
+            yield await validate(batch)
+            batch = []
+    if batch:
+        yield await validate(batch)
@@ -0,0 +1,139 @@
+import datetime
+from typing import Iterable
+
+from sqlalchemy import extract, func, select
+
+from bus.graph import BusNetwork, bus_network
+from cache import TTLCache
+from config import settings
+from database import fetch_rows
+from model.bus import BusDepartureLog, BusRealtime
+from utils import KST
+
+MAX_SEGMENT_SECONDS = 60 * 60  # 이보다 긴 구간 기록은 운행 중단으로 보고 버린다.
+
+TravelTimes = dict[tuple[int, int], float]  # (route_id, stop_id) -> 다음 정류장까지 걸리는 시간(초)
+
+
+async def load_travel_times() -> TravelTimes:
+    """Median seconds from each stop to the next stop of the route, from recent departure logs.
+
+    Consecutive departures of the same vehicle on the same day form a segment; only
+    segments between adjacent stops of the route are kept.
+    """
+    since = datetime.datetime.now(tz=KST).date() - datetime.timedelta(days=settings.BUS_TRAVEL_TIME_DAYS)
+    window = {
+        "partition_by": (BusDepartureLog.route_id, BusDepartureLog.vehicle_id, BusDepartureLog.date),
+        "order_by": BusDepartureLog.time,
+    }
+    segments = (
+        select(
+            BusDepartureLog.route_id.label("route_id"),
+            BusDepartureLog.stop_id.label("stop_id"),
+            func.lead(BusDepartureLog.stop_id).over(**window).label("next_stop_id"),
+            (
+                func.lead(extract("epoch", BusDepartureLog.time)).over(**window)
+                - extract("epoch", BusDepartureLog.time)
+            ).label("elapsed"),
+        )
+        .where(BusDepartureLog.date >= since)
+        .subquery()
+    )
+    select_query = (
+        select(
+            segments.c.route_id,
+            segments.c.stop_id,
+            segments.c.next_stop_id,
+            func.percentile_cont(0.5).within_group(segments.c.elapsed),
+        )
+        .where(segments.c.elapsed > 0, segments.c.elapsed <= MAX_SEGMENT_SECONDS)
+        .group_by(segments.c.route_id, segments.c.stop_id, segments.c.next_stop_id)
+        .having(func.count() >= settings.BUS_TRAVEL_TIME_MIN_SAMPLES)
+    )
+    network = await bus_network.get()
+    travel_times: TravelTimes = {}
+    for route_id, stop_id, next_stop_id, elapsed in await fetch_rows(select_query):
+        next_edge = network.next_stop(route_id, stop_id)
+        if next_edge is not None and next_edge.stop_id == next_stop_id:
+            travel_times[(route_id, stop_id)] = float(elapsed)
+    return travel_times
+
+
+travel_times = TTLCache(load_travel_times, ttl=settings.BUS_TRAVEL_TIME_TTL)
+
+
+def travel_seconds(
+    network: BusNetwork,
+    times: TravelTimes,
+    route_id: int,
+    from_stop_id: int,
+    to_stop_id: int,
+) -> tuple[int, float] | None:
+    """Returns (stops, seconds) from one stop to a downstream stop of the route.
+
+    Each segment uses the historical travel time and falls back to the
+    difference of ``minute_from_start`` when there is not enough history.
+    """
+    departure, arrival = network.edge(route_id, from_stop_id), network.edge(route_id, to_stop_id)
+    if departure is None or arrival is None or arrival.sequence < departure.sequence:
+        return None
+    stops, seconds, edge = 0, 0.0, departure
+    while edge.stop_id != to_stop_id:
+        next_edge = network.next_stop(route_id, edge.stop_id)
+        if next_edge is None:
+            return None
+        seconds += times.get(
+            (route_id, edge.stop_id),
+            max(next_edge.minute_from_start - edge.minute_from_start, 0) * 60,
+        )
+        stops, edge = stops + 1, next_edge
+    return stops, seconds
+
+
+def project_arrivals(
+    network: BusNetwork,
+    times: TravelTimes,
+    arrivals: Iterable[BusRealtime],
+    stop_id: int,
+) -> list[BusRealtime]:
+    """Projects arrivals at an upstream stop onto ``stop_id`` further along the same route."""
+    projected = []
+    for arrival in arrivals:
+        travel = travel_seconds(network, times, arrival.route_id, arrival.stop_id, stop_id)
+        if travel is None:
+            continue
+        stops, seconds = travel
+        projected.append(
+            BusRealtime(
+                stop_id=stop_id,
+                route_id=arrival.route_id,
+                sequence=arrival.sequence,
+                stops=arrival.stops + stops,
+                seats=arrival.seats,
+                time=arrival.time + datetime.timedelta(seconds=round(seconds)),
+                low_floor=arrival.low_floor,
+                updated_at=arrival.updated_at,
+            ),
+        )
+    return projected
+
+
+async def project_realtime(
+    loaded: dict[tuple[int, int], list[BusRealtime]],
+    keys: Iterable[tuple[int, int]],
+) -> dict[tuple[int, int], list[BusRealtime]]:
+    """Fills (stop, route) pairs without their own feed from the nearest upstream stop that has one."""
+    network, times = await bus_network.get(), await travel_times.get()
+    result = {}
+    for stop_id, route_id in keys:
+        edge = network.edge(route_id, stop_id)
+        if edge is None:
+            continue
+        upstream = [
+            item for item in network.route_stops(route_id)
+            if item.sequence < edge.sequence and loaded.get((item.stop_id, route_id))
+        ]
+        if upstream:
+            source = loaded[(upstream[-1].stop_id, route_id)]
+            result[(stop_id, route_id)] = project_arrivals(network, times, source, stop_id)
+    return result
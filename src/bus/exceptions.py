@@ -39,3 +39,7 @@ class TimetableNotFound(NotFound):
 
 class RealtimeNotFound(NotFound):
     DETAIL = "REALTIME_NOT_FOUND"
+
+
+class DuplicateRealtime(Conflict):
+    DETAIL = "DUPLICATE_REALTIME"
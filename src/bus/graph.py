@@ -0,0 +1,149 @@
+import datetime
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from cache import TTLCache
+from config import settings
+from database import fetch_rows
+from model.bus import BusRoute, BusRouteStop, BusStop
+
+
+class BusStopNode(NamedTuple):
+    id_: int
+    name: str
+    district: int
+    region: str
+    mobile_no: str
+    latitude: float
+    longitude: float
+
+
+class BusRouteNode(NamedTuple):
+    id_: int
+    name: str
+    type_code: str
+    type_name: str
+    company_id: int
+    company_name: str
+    company_telephone: str
+    district: int
+    up_first_time: datetime.time
+    up_last_time: datetime.time
+    down_first_time: datetime.time
+    down_last_time: datetime.time
+    start_stop_id: int
+    end_stop_id: int
+
+
+class BusRouteStopEdge(NamedTuple):
+    route_id: int
+    stop_id: int
+    sequence: int
+    start_stop_id: int
+    minute_from_start: int
+
+
+class BusNetwork:
+    """Immutable snapshot of the bus stops, routes and the stops each route visits.
+
+    Edges are kept sorted by ``sequence`` per route and by ``route_id`` per stop.
+    """
+
+    def __init__(
+        self,
+        stops: dict[int, BusStopNode],
+        routes: dict[int, BusRouteNode],
+        edges: list[BusRouteStopEdge],
+    ) -> None:
+        self.stops = stops
+        self.routes = routes
+        route_stops: dict[int, list[BusRouteStopEdge]] = {}
+        stop_routes: dict[int, list[BusRouteStopEdge]] = {}
+        for edge in edges:
+            route_stops.setdefault(edge.route_id, []).append(edge)
+            stop_routes.setdefault(edge.stop_id, []).append(edge)
+        self._route_stops = {
+            route_id: tuple(sorted(items, key=lambda x: x.sequence))
+            for route_id, items in route_stops.items()
+        }
+        self._stop_routes = {
+            stop_id: tuple(sorted(items, key=lambda x: x.route_id))
+            for stop_id, items in stop_routes.items()
+        }
+        self._positions = {
+            (edge.route_id, edge.stop_id): index
+            for items in self._route_stops.values()
+            for index, edge in enumerate(items)
+        }
+
+    def route_stops(self, route_id: int) -> tuple[BusRouteStopEdge, ...]:
+        return self._route_stops.get(route_id, ())
+
+    def stop_routes(self, stop_id: int) -> tuple[BusRouteStopEdge, ...]:
+        return self._stop_routes.get(stop_id, ())
+
+    def edge(self, route_id: int, stop_id: int) -> BusRouteStopEdge | None:
+        position = self._positions.get((route_id, stop_id))
+        return None if position is None else self._route_stops[route_id][position]
+
+    def next_stop(self, route_id: int, stop_id: int) -> BusRouteStopEdge | None:
+        position = self._positions.get((route_id, stop_id))
+        if position is None or position + 1 >= len(self._route_stops[route_id]):
+            return None
+        return self._route_stops[route_id][position + 1]
+
+    def minutes_between(self, route_id: int, from_stop_id: int, to_stop_id: int) -> int | None:
+        departure, arrival = self.edge(route_id, from_stop_id), self.edge(route_id, to_stop_id)
+        if departure is None or arrival is None or arrival.sequence < departure.sequence:
+            return None
+        return arrival.minute_from_start - departure.minute_from_start
+
+
+async def load_network() -> BusNetwork:
+    stop_rows = await fetch_rows(
+        select(
+            BusStop.id_,
+            BusStop.name,
+            BusStop.district,
+            BusStop.region,
+            BusStop.mobile_no,
+            BusStop.latitude,
+            BusStop.longitude,
+        ),
+    )
+    route_rows = await fetch_rows(
+        select(
+            BusRoute.id_,
+            BusRoute.name,
+            BusRoute.type_code,
+            BusRoute.type_name,
+            BusRoute.company_id,
+            BusRoute.company_name,
+            BusRoute.company_telephone,
+            BusRoute.district,
+            BusRoute.up_first_time,
+            BusRoute.up_last_time,
+            BusRoute.down_first_time,
+            BusRoute.down_last_time,
+            BusRoute.start_stop_id,
+            BusRoute.end_stop_id,
+        ),
+    )
+    edge_rows = await fetch_rows(
+        select(
+            BusRouteStop.route_id,
+            BusRouteStop.stop_id,
+            BusRouteStop.sequence,
+            BusRouteStop.start_stop_id,
+            BusRouteStop.minute_from_start,
+        ),
+    )
+    return BusNetwork(
+        stops={row[0]: BusStopNode(*row) for row in stop_rows},
+        routes={row[0]: BusRouteNode(*row) for row in route_rows},
+        edges=[BusRouteStopEdge(*row) for row in edge_rows],
+    )
+
+
+bus_network = TTLCache(load_network, ttl=settings.BUS_NETWORK_TTL)
@@ -0,0 +1,159 @@
+import asyncio
+import datetime
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from bus.statistics import aggregate_statistics
+from config import settings
+from database import engine
+from utils import KST
+
+logger = logging.getLogger(__name__)
+PARTITION_PREFIX = "bus_departure_log_p"
+PARTITION_PATTERN = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})(\d{{2}})$")
+DEFAULT_PARTITION = "bus_departure_log_default"
+MAINTENANCE_LOCK_ID = 0x627573  # pg_advisory_xact_lock key shared by every worker
+
+
+def month_start(value: datetime.date) -> datetime.date:
+    return value.replace(day=1)
+
+
+def next_month(value: datetime.date) -> datetime.date:
+    return (value.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+async def list_partitions(conn: AsyncConnection) -> dict[datetime.date, str]:
+    rows = await conn.execute(
+        text(
+            "select c.relname from pg_inherits i "
+            "join pg_class c on c.oid = i.inhrelid "
+            "where i.inhparent = 'bus_departure_log'::regclass",
+        ),
+    )
+    partitions = {}
+    for (name,) in rows:
+        matched = PARTITION_PATTERN.match(name)
+        if matched:
+            partitions[datetime.date(int(matched[1]), int(matched[2]), 1)] = name
+    return partitions
+
+
+async def create_partition(conn: AsyncConnection, month: datetime.date) -> None:
+    name, bounds = partition_name(month), {"start": month, "end": next_month(month)}
+    # 기본 파티션에 들어간 같은 달의 기록을 새 파티션으로 옮긴 뒤 연결한다.
+    await conn.execute(text(f"create table {name} (like bus_departure_log including defaults)"))
+    await conn.execute(
+        text(
+            f"with moved as (delete from {DEFAULT_PARTITION} "
+            "where departure_date >= :start and departure_date < :end returning *) "
+            f"insert into {name} select * from moved",
+        ),
+        bounds,
+    )
+    await conn.execute(
+        text(
+            f"alter table bus_departure_log attach partition {name} "
+            f"for values from ('{bounds['start']}') to ('{bounds['end']}')",
+        ),
+    )
+
+
+async def rollup(conn: AsyncConnection, table: str, cutoff: datetime.date) -> int:
+    result = await conn.execute(
+        text(
+            "insert into bus_departure_log_daily "
+            "select stop_id, route_id, departure_date, min(departure_time), max(departure_time), count(*) "
+            f"from {table} where departure_date < :cutoff "
+            "group by stop_id, route_id, departure_date "
+            "on conflict (stop_id, route_id, departure_date) do update set "
+            "first_departure_time = excluded.first_departure_time, "
+            "last_departure_time = excluded.last_departure_time, "
+            "departure_count = excluded.departure_count",
+        ),
+        {"cutoff": cutoff},
+    )
+    return result.rowcount
+
+
+async def maintain_partitions(today: datetime.date | None = None) -> tuple[list[str], list[str]]:
+    """Creates upcoming monthly partitions and rolls up and drops the expired ones.
+
+    A partition is dropped only once every date in it is older than the retention window.
+    """
+    if today is None:
+        today = datetime.datetime.now(tz=KST).date()
+    cutoff = today - datetime.timedelta(days=settings.BUS_DEPARTURE_LOG_RETENTION_DAYS)
+    created: list[str] = []
+    dropped: list[str] = []
+    async with engine.begin() as conn:
+        await conn.execute(text("select pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_ID})
+        partitions = await list_partitions(conn)
+        month = month_start(today)
+        for _ in range(settings.BUS_DEPARTURE_LOG_PARTITIONS_AHEAD + 1):
+            if month not in partitions:
+                await create_partition(conn, month)
+                created.append(partition_name(month))
+            month = next_month(month)
+        for month, name in sorted(partitions.items()):
+            if next_month(month) > cutoff:
+                continue
+            await rollup(conn, name, cutoff)
+            await conn.execute(text(f"drop table {name}"))
+            dropped.append(name)
+        # 파티션 범위를 벗어나 기본 파티션에 남은 오래된 기록도 요약 후 삭제한다.
+        await rollup(conn, DEFAULT_PARTITION, cutoff)
+        await conn.execute(
+            text(f"delete from {DEFAULT_PARTITION} where departure_date < :cutoff"),
+            {"cutoff": cutoff},
+        )
+    return created, dropped
+
+
+class BusDepartureLogMaintainer:
+    """Runs the log maintenance once at startup and then every ``interval`` seconds.
+
+    Statistics are aggregated first so that expired partitions are counted before they are dropped.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # 통계 집계가 실패해도 다음 달 파티션은 만들어야 하므로 따로 처리한다.
+            try:
+                await aggregate_statistics()
+            except Exception:
+                logger.exception("Failed to aggregate bus departure statistics")
+            try:
+                created, dropped = await maintain_partitions()
+                if created or dropped:
+                    logger.info("Bus departure log partitions created=%s dropped=%s", created, dropped)
+            except Exception:
+                logger.exception("Failed to maintain bus departure log partitions")
+            await asyncio.sleep(self._interval)
+
+
+log_maintainer = BusDepartureLogMaintainer(interval=settings.BUS_DEPARTURE_LOG_MAINTENANCE_INTERVAL)
@@ -1,15 +1,25 @@
 import datetime
-from typing import Callable
+from typing import Iterable
 
 import holidays
 import pytz
 import strawberry
-from pytz import timezone
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload, load_only, joinedload
+from sqlalchemy import select, or_, tuple_, case
+from sqlalchemy.orm import load_only
 
+from bus import cache as realtime_cache
+from bus.graph import BusNetwork, BusRouteStopEdge, BusStopNode, bus_network
+from bus.statistics import summarize
+from config import settings
 from database import fetch_all
-from model.bus import BusStop, BusRouteStop, BusTimetable, BusRealtime, BusRoute, BusDepartureLog
+from model.bus import (
+    BusStop,
+    BusTimetable,
+    BusRealtime,
+    BusDepartureLog,
+    BusDepartureStatistics,
+)
+from search import text_search
 from utils import KST
 
 
@@ -113,11 +123,66 @@ class BusStopRouteQuery:
     log: list[BusDepartureLogQuery] = strawberry.field(description="Log")
 
 
+@strawberry.type
+class BusStatisticsQuery:
+    route_id: int = strawberry.field(description="Route ID", name="routeID")
+    stop_id: int = strawberry.field(description="Stop ID", name="stopID")
+    weekdays: str = strawberry.field(description="Weekdays")
+    hour: int = strawberry.field(description="Departure hour")
+    count: int = strawberry.field(description="Departure count")
+    headway: float | None = strawberry.field(description="Mean headway (minutes)")
+    deviation: float | None = strawberry.field(description="Mean deviation from timetable (minutes)")
+    early: float | None = strawberry.field(description="Early departure ratio")
+    late: float | None = strawberry.field(description="Late departure ratio")
+    p10: int | None = strawberry.field(description="10th percentile deviation (minutes)")
+    p50: int | None = strawberry.field(description="Median deviation (minutes)")
+    p90: int | None = strawberry.field(description="90th percentile deviation (minutes)")
+
+
 @strawberry.type
 class StopQuery(BusStopItem):
     routes: list[BusStopRouteQuery] = strawberry.field(description="Routes")
 
 
+def build_stop_item(stop: BusStopNode) -> BusStopItem:
+    return BusStopItem(
+        id_=stop.id_,
+        name=stop.name,
+        district_code=stop.district,
+        region_name=stop.region,
+        mobile_number=stop.mobile_no,
+        latitude=stop.latitude,
+        longitude=stop.longitude,
+    )
+
+
+def build_route_query(network: BusNetwork, route_id: int) -> BusRouteQuery:
+    route = network.routes[route_id]
+    return BusRouteQuery(
+        id_=route.id_,
+        name=route.name,
+        type_=BusRouteTypeQuery(code=route.type_code, name=route.type_name),
+        company=BusRouteCompanyQuery(
+            id_=route.company_id,
+            name=route.company_name,
+            telephone=route.company_telephone,
+        ),
+        district_code=route.district,
+        running_time=BusRunningListQuery(
+            up=BusRunningTimeQuery(
+                first=route.up_first_time.strftime("%H:%M:%S"),
+                last=route.up_last_time.strftime("%H:%M:%S"),
+            ),
+            down=BusRunningTimeQuery(
+                first=route.down_first_time.strftime("%H:%M:%S"),
+                last=route.down_last_time.strftime("%H:%M:%S"),
+            ),
+        ),
+        start_stop=build_stop_item(network.stops[route.start_stop_id]),
+        end_stop=build_stop_item(network.stops[route.end_stop_id]),
+    )
+
+
 async def resolve_bus(
     id_: list[int] | None = None,
     name: str | None = None,
@@ -130,80 +195,40 @@ async def resolve_bus(
     end: datetime.time | None = None,
     end_str: str | None = None,
 ) -> list[StopQuery]:
-    stop_conditions = []
+    stop_conditions, stop_order = [], []
     if id_:
         stop_conditions.append(BusStop.id_.in_(id_))
     if name:
-        stop_conditions.append(BusStop.name.like(f"%{name}%"))
-
-    stop_query = (
-        select(BusStop)
-        .options(
-            selectinload(BusStop.routes).options(
-                load_only(BusRouteStop.sequence, BusRouteStop.minute_from_start),
-                selectinload(BusRouteStop.timetable).options(
-                    load_only(BusTimetable.weekday, BusTimetable.departure_time),
-                ),
-                selectinload(BusRouteStop.realtime).options(
-                    load_only(
-                        BusRealtime.sequence,
-                        BusRealtime.stops,
-                        BusRealtime.time,
-                        BusRealtime.seats,
-                        BusRealtime.low_floor,
-                        BusRealtime.updated_at,
-                    ),
-                ),
-                selectinload(BusRouteStop.log).options(
-                    load_only(
-                        BusDepartureLog.date,
-                        BusDepartureLog.time,
-                        BusDepartureLog.vehicle_id,
-                    ),
-                ),
-                joinedload(BusRouteStop.route).options(
-                    load_only(
-                        BusRoute.company_id,
-                        BusRoute.company_name,
-                        BusRoute.company_telephone,
-                        BusRoute.district,
-                        BusRoute.up_first_time,
-                        BusRoute.up_last_time,
-                        BusRoute.down_first_time,
-                        BusRoute.down_last_time,
-                        BusRoute.id_,
-                        BusRoute.name,
-                        BusRoute.type_code,
-                        BusRoute.type_name,
-                    ),
-                    joinedload(BusRoute.start_stop).options(
-                        load_only(
-                            BusStop.id_,
-                            BusStop.name,
-                            BusStop.district,
-                            BusStop.region,
-                            BusStop.mobile_no,
-                            BusStop.latitude,
-                            BusStop.longitude,
-                        ),
-                    ),
-                    joinedload(BusRoute.end_stop).options(
-                        load_only(
-                            BusStop.id_,
-                            BusStop.name,
-                            BusStop.district,
-                            BusStop.region,
-                            BusStop.mobile_no,
-                            BusStop.latitude,
-                            BusStop.longitude,
-                        ),
-                    ),
-                ),
-            ),
+        name_search = await text_search(BusStop.name, name)
+        stop_conditions.append(name_search.condition)
+        stop_order.append(name_search.rank.desc())
+
+    if log_date is None:
+        # 날짜가 지정되지 않으면 최근 출발 기록만 조회한다.
+        today = datetime.datetime.now(tz=KST).date()
+        log_condition = BusDepartureLog.date >= today - datetime.timedelta(
+            days=settings.BUS_DEPARTURE_LOG_DAYS - 1,
         )
-        .filter(*stop_conditions)
-    )
+    else:
+        log_condition = BusDepartureLog.date.in_(log_date)
+
+    stop_query = select(BusStop).filter(*stop_conditions).order_by(*stop_order, BusStop.id_)
     stops = await fetch_all(stop_query)
+    # 노선과 정류장 구성은 메모리의 버스 노선망에서 읽는다.
+    network = await bus_network.get()
+    stop_routes: dict[int, list[BusRouteStopEdge]] = {
+        stop.id_: sorted(
+            (
+                edge for edge in network.stop_routes(stop.id_)
+                if (route_id is not None and edge.route_id == route_id)
+                or (routes is not None and edge.route_id in routes)
+                or (route_id is None and routes is None)
+            ),
+            key=lambda x: x.sequence,
+        )
+        for stop in stops
+    }
+    route_stop_edges = [edge for edges in stop_routes.values() for edge in edges]
     result: list[StopQuery] = []
     now = datetime.datetime.now(tz=pytz.timezone("Asia/Seoul"))
     if weekdays is None:
@@ -225,27 +250,60 @@ async def resolve_bus(
         end_value = end.replace(tzinfo=KST)
     else:
         end_value = None
-    timetable_filter: Callable[[BusTimetable], bool] = lambda x: (
-        x.weekday in weekdays
-        and (
-            start_value is None
-            or (
-                x.departure_time.replace(tzinfo=KST) >= start_value or
-                x.departure_time.replace(tzinfo=KST) < datetime.time(4, 0, 0).replace(tzinfo=KST)
+    # 운행일 기준으로 04:00 이전 출발은 전날 시간표의 마지막으로 취급한다.
+    after_midnight = BusTimetable.departure_time < datetime.time(4, 0, 0, tzinfo=KST)
+    timetable_conditions = [BusTimetable.weekday.in_(weekdays)]
+    if start_value is not None:
+        timetable_conditions.append(or_(BusTimetable.departure_time >= start_value, after_midnight))
+    if end_value is not None:
+        timetable_conditions.append(BusTimetable.departure_time <= end_value)
+    route_stop_keys = {(edge.route_id, edge.start_stop_id) for edge in route_stop_edges}
+    timetables: dict[tuple[int, int], list[BusTimetable]] = {}
+    if route_stop_keys:
+        timetable_query = (
+            select(BusTimetable)
+            .options(
+                load_only(
+                    BusTimetable.route_id,
+                    BusTimetable.start_stop_id,
+                    BusTimetable.weekday,
+                    BusTimetable.departure_time,
+                ),
+            )
+            .where(
+                tuple_(BusTimetable.route_id, BusTimetable.start_stop_id).in_(route_stop_keys),
+                *timetable_conditions,
             )
-            if start_value is not None
-            else True
+            .order_by(case((after_midnight, 1), else_=0), BusTimetable.departure_time)
         )
-        and (
-            end_value is None
-            or (x.departure_time.replace(tzinfo=KST) <= end_value.replace(tzinfo=KST))
-            if end_value is not None
-            else True
+        for timetable in await fetch_all(timetable_query):
+            timetables.setdefault((timetable.route_id, timetable.start_stop_id), []).append(timetable)
+    logs: dict[tuple[int, int], list[BusDepartureLog]] = {}
+    if route_stop_edges:
+        log_query = (
+            select(BusDepartureLog)
+            .options(
+                load_only(
+                    BusDepartureLog.date,
+                    BusDepartureLog.time,
+                    BusDepartureLog.vehicle_id,
+                ),
+            )
+            .where(
+                tuple_(BusDepartureLog.stop_id, BusDepartureLog.route_id).in_(
+                    {(edge.stop_id, edge.route_id) for edge in route_stop_edges},
+                ),
+                log_condition,
+            )
+            .order_by(BusDepartureLog.date)
         )
-    )
-    realtime_filter: Callable[[BusRealtime], bool] = lambda x: (
-        x.updated_at.astimezone(timezone("Asia/Seoul")) >= now - x.time
-    )
+        for log in await fetch_all(log_query):
+            logs.setdefault((log.stop_id, log.route_id), []).append(log)
+    # 실시간 도착 정보는 Redis 캐시에서 읽고, 없는 정류장-노선만 데이터베이스에서 읽는다.
+    realtime_map = await realtime_cache.get_realtime((edge.stop_id, edge.route_id) for edge in route_stop_edges)
+    route_info: dict[int, BusRouteQuery] = {
+        key: build_route_query(network, key) for key in {edge.route_id for edge in route_stop_edges}
+    }
     for stop in stops:
         result.append(
             StopQuery(
@@ -260,54 +318,7 @@ async def resolve_bus(
                     BusStopRouteQuery(
                         sequence=route.sequence,
                         minute_from_start=route.minute_from_start,
-                        info=BusRouteQuery(
-                            id_=route.route.id_,
-                            name=route.route.name,
-                            type_=BusRouteTypeQuery(
-                                code=route.route.type_code,
-                                name=route.route.type_name,
-                            ),
-                            company=BusRouteCompanyQuery(
-                                id_=route.route.company_id,
-                                name=route.route.company_name,
-                                telephone=route.route.company_telephone,
-                            ),
-                            district_code=route.route.district,
-                            running_time=BusRunningListQuery(
-                                up=BusRunningTimeQuery(
-                                    first=route.route.up_first_time.strftime(
-                                        "%H:%M:%S",
-                                    ),
-                                    last=route.route.up_last_time.strftime("%H:%M:%S"),
-                                ),
-                                down=BusRunningTimeQuery(
-                                    first=route.route.down_first_time.strftime(
-                                        "%H:%M:%S",
-                                    ),
-                                    last=route.route.down_last_time.strftime(
-                                        "%H:%M:%S",
-                                    ),
-                                ),
-                            ),
-                            start_stop=BusStopItem(
-                                id_=route.route.start_stop.id_,
-                                name=route.route.start_stop.name,
-                                district_code=route.route.start_stop.district,
-                                region_name=route.route.start_stop.region,
-                                mobile_number=route.route.start_stop.mobile_no,
-                                latitude=route.route.start_stop.latitude,
-                                longitude=route.route.start_stop.longitude,
-                            ),
-                            end_stop=BusStopItem(
-                                id_=route.route.end_stop.id_,
-                                name=route.route.end_stop.name,
-                                district_code=route.route.end_stop.district,
-                                region_name=route.route.end_stop.region,
-                                mobile_number=route.route.end_stop.mobile_no,
-                                latitude=route.route.end_stop.latitude,
-                                longitude=route.route.end_stop.longitude,
-                            ),
-                        ),
+                        info=route_info[route.route_id],
                         timetable=[
                             BusTimetableQuery(
                                 weekdays=timetable.weekday,
@@ -320,29 +331,9 @@ async def resolve_bus(
                                 ),
                                 departure_minute=timetable.departure_time.minute,
                             )
-                            for timetable in sorted(
-                                list(filter(timetable_filter, route.timetable)),
-                                key=lambda x: convert_time_after_midnight(x.departure_time),
-                            )
-                        ],
-                        realtime=[
-                            BusRealtimeQuery(
-                                sequence=realtime.sequence,
-                                stop=realtime.stops,
-                                time=calculate_remaining_time(
-                                    realtime.updated_at, realtime.time,
-                                ),
-                                seat=realtime.seats,
-                                low_floor=realtime.low_floor,
-                                updated_at=realtime.updated_at.astimezone(
-                                    timezone("Asia/Seoul"),
-                                ),
-                            )
-                            for realtime in sorted(
-                                list(filter(realtime_filter, route.realtime)),
-                                key=lambda x: x.sequence,
-                            )
+                            for timetable in timetables.get((route.route_id, route.start_stop_id), [])
                         ],
+                        realtime=build_realtime_query(realtime_map.get((route.stop_id, route.route_id), []), now),
                         log=[
                             BusDepartureLogQuery(
                                 departure_date=log.date,
@@ -351,37 +342,35 @@ async def resolve_bus(
                                 departure_minute=log.time.minute,
                                 vehicle_id=log.vehicle_id,
                             )
-                            for log in sorted(
-                                list(
-                                    filter(
-                                        lambda x: log_date is None or x.date in log_date,
-                                        route.log,
-                                    ),
-                                ), key=lambda x: x.date,
-                            )
+                            for log in logs.get((route.stop_id, route.route_id), [])
                         ],
                     )
-                    for route in sorted(
-                        list(
-                            filter(
-                                lambda x: (
-                                    route_id is not None and x.route.id_ == route_id
-                                ) or (
-                                    routes is not None and x.route.id_ in routes
-                                ) or (
-                                    route_id is None and routes is None
-                                ),
-                                stop.routes,
-                            ),
-                        ),
-                        key=lambda x: x.sequence,
-                    )
+                    for route in stop_routes[stop.id_]
                 ],
             ),
         )
     return result
 
 
+def build_realtime_query(
+    arrivals: Iterable[BusRealtime],
+    now: datetime.datetime,
+) -> list[BusRealtimeQuery]:
+    # 이미 지나간 도착 정보는 제외한다.
+    return [
+        BusRealtimeQuery(
+            sequence=realtime.sequence,
+            stop=realtime.stops,
+            time=calculate_remaining_time(realtime.updated_at, realtime.time),
+            seat=realtime.seats,
+            low_floor=realtime.low_floor,
+            updated_at=realtime.updated_at.astimezone(KST),
+        )
+        for realtime in sorted(arrivals, key=lambda x: x.sequence)
+        if realtime.updated_at.astimezone(KST) >= now - realtime.time
+    ]
+
+
 def calculate_remaining_time(
     updated_at: datetime.datetime,
     time: datetime.timedelta,
@@ -397,3 +386,31 @@ def convert_time_after_midnight(
     if time.replace(tzinfo=KST) < datetime.time(4, 0, 0).replace(tzinfo=KST):
         return f'{24 + time.hour}:{time.strftime("%M:%S")}'
     return time.strftime("%H:%M:%S")
+
+
+async def resolve_bus_statistics(
+    route_id: list[int] | None = None,
+    stop_id: list[int] | None = None,
+    weekdays: list[str] | None = None,
+    hour: list[int] | None = None,
+) -> list[BusStatisticsQuery]:
+    conditions = []
+    if route_id:
+        conditions.append(BusDepartureStatistics.route_id.in_(route_id))
+    if stop_id:
+        conditions.append(BusDepartureStatistics.stop_id.in_(stop_id))
+    if weekdays:
+        conditions.append(BusDepartureStatistics.weekday.in_(weekdays))
+    if hour:
+        conditions.append(BusDepartureStatistics.hour.in_(hour))
+    statistics_query = (
+        select(BusDepartureStatistics)
+        .where(*conditions)
+        .order_by(
+            BusDepartureStatistics.route_id,
+            BusDepartureStatistics.stop_id,
+            BusDepartureStatistics.weekday,
+            BusDepartureStatistics.hour,
+        )
+    )
+    return [BusStatisticsQuery(**summarize(item)) for item in await fetch_all(statistics_query)]
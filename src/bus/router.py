@@ -1,10 +1,14 @@
 import datetime
+import time
 from typing import Callable
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from starlette import status
 
 from bus import service
+from bus.statistics import summarize
+from bus.stream import realtime_broadcaster
 from bus.dependancies import (
     get_valid_route,
     get_valid_stop,
@@ -12,6 +16,9 @@ from bus.dependancies import (
     create_valid_stop,
     create_valid_route_stop,
     create_valid_timetable,
+    create_valid_realtime_snapshot,
+    iter_valid_timetable_import,
+    get_valid_stream_stops,
 )
 from bus.exceptions import (
     RouteNotFound,
@@ -36,7 +43,11 @@ from bus.schemas import (
     UpdateBusRouteStopRequest,
     BusTimetableListResponse,
     BusTimetableDetailResponse,
+    BusTimetableImportResponse,
     BusRealtimeListResponse,
+    BusRealtimeIngestResponse,
+    BusRealtimeSnapshotRequest,
+    BusStatisticsListResponse,
 )
 from exceptions import DetailedHTTPException
 from model.bus import BusRoute, BusStop, BusRouteStop, BusTimetable, BusRealtime
@@ -475,6 +486,25 @@ async def create_bus_timetable(
     }
 
 
+@router.post(
+    "/timetable/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BusTimetableImportResponse,
+)
+async def import_bus_timetable(
+    request: Request,
+    _: str = Depends(parse_jwt_user_data),
+):
+    # CSV, NDJSON 또는 JSON 배열로 받은 시간표를 배치 단위로 추가한다.
+    started = time.monotonic()
+    inserted, skipped = await service.import_timetable(iter_valid_timetable_import(request))
+    return {
+        "inserted": inserted,
+        "skipped": skipped,
+        "elapsed": (time.monotonic() - started) * 1000,
+    }
+
+
 @router.delete(
     "/timetable/{route_id}/{start_stop_id}/{weekday}/{departure_time}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -516,7 +546,9 @@ async def get_bus_realtime_list(
     if stop_id is None and route_id is None:
         realtime_list = await service.list_realtime()
     else:
-        realtime_list = await service.list_realtime_filter(stop_id, route_id)
+        realtime_list = await service.list_realtime_filter(
+            route_id=route_id, stop_id=stop_id,
+        )
     mapping_func: Callable[
         [BusRealtime],
         dict[str, int | str | float],
@@ -531,3 +563,64 @@ async def get_bus_realtime_list(
         "updatedAt": datetime_to_str(x.updated_at.astimezone(KST)),
     }
     return {"data": map(mapping_func, realtime_list)}
+
+
+@router.get("/realtime/stream")
+async def stream_bus_realtime(
+    request: Request,
+    stop_ids: set[int] = Depends(get_valid_stream_stops),
+):
+    # GraphQL 질의처럼 인증 없이 공개한다.
+    # 정류장별 도착 정보를 처음 한 번 보내고, 이후에는 바뀐 정류장만 보낸다.
+    return StreamingResponse(
+        realtime_broadcaster.stream(stop_ids, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/realtime",
+    status_code=status.HTTP_201_CREATED,
+    response_model=BusRealtimeIngestResponse,
+)
+async def ingest_bus_realtime(
+    snapshot: list[BusRealtimeSnapshotRequest] = Depends(create_valid_realtime_snapshot),
+    _: str = Depends(parse_jwt_user_data),
+):
+    started = time.monotonic()
+    stop_ids, deleted, inserted = await service.replace_realtime(snapshot)
+    return {
+        "stop": stop_ids,
+        "deleted": deleted,
+        "inserted": inserted,
+        "elapsed": (time.monotonic() - started) * 1000,
+    }
+
+
+@router.get("/statistics", response_model=BusStatisticsListResponse)
+async def get_bus_statistics_list(
+    route_id: int | None = None,
+    stop_id: int | None = None,
+    weekdays: str | None = None,
+    _: str = Depends(parse_jwt_user_data),
+):
+    statistics_list = await service.list_statistics(route_id, stop_id, weekdays)
+    mapping_func: Callable[
+        [dict[str, int | str | float | None]],
+        dict[str, int | str | float | None],
+    ] = lambda x: {
+        "routeID": x["route_id"],
+        "stopID": x["stop_id"],
+        "weekdays": x["weekdays"],
+        "hour": x["hour"],
+        "count": x["count"],
+        "headway": x["headway"],
+        "deviation": x["deviation"],
+        "early": x["early"],
+        "late": x["late"],
+        "p10": x["p10"],
+        "p50": x["p50"],
+        "p90": x["p90"],
+    }
+    return {"data": map(mapping_func, map(summarize, statistics_list))}
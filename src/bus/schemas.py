@@ -205,6 +205,12 @@ class CreateBusTimetableRequest(BaseModel):
         }
 
 
+class BusTimetableImportResponse(BaseModel):
+    inserted: Annotated[int, Field(alias="inserted", ge=0)]
+    skipped: Annotated[int, Field(alias="skipped", ge=0)]
+    elapsed: Annotated[float, Field(alias="elapsed", ge=0)]  # milliseconds
+
+
 class BusRouteFirstLastTimeResponse(BaseModel):
     first_time: Annotated[datetime.time, Field(alias="first")]
     last_time: Annotated[datetime.time, Field(alias="last")]
@@ -301,3 +307,70 @@ class BusRealtimeListItemResponse(BaseModel):
 
 class BusRealtimeListResponse(BaseModel):
     data: Annotated[list[BusRealtimeListItemResponse], Field(alias="data")]
+
+
+class BusRealtimeArrivalRequest(BaseModel):
+    sequence: Annotated[int, Field(alias="sequence", ge=1)]
+    remaining_stop: Annotated[int, Field(alias="stop", ge=0)]
+    remaining_time: Annotated[int, Field(alias="time", ge=0)]  # seconds
+    remaining_seat: Annotated[int, Field(alias="seat", ge=-1)]
+    low_floor: Annotated[bool, Field(alias="lowFloor")]
+    updated_at: Annotated[Optional[datetime.datetime], Field(alias="updatedAt")] = None
+
+
+class BusRealtimeSnapshotRequest(BaseModel):
+    stop_id: Annotated[int, Field(alias="stopID", ge=1)]
+    route_id: Annotated[int, Field(alias="routeID", ge=1)]
+    arrivals: Annotated[list[BusRealtimeArrivalRequest], Field(alias="arrivals")]
+
+
+class BusRealtimeIngestRequest(BaseModel):
+    data: Annotated[list[BusRealtimeSnapshotRequest], Field(alias="data")]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "data": [
+                    {
+                        "stopID": 1,
+                        "routeID": 1,
+                        "arrivals": [
+                            {
+                                "sequence": 1,
+                                "stop": 3,
+                                "time": 240,
+                                "seat": 41,
+                                "lowFloor": False,
+                                "updatedAt": "2024-01-01T00:00:00+09:00",
+                            },
+                        ],
+                    },
+                ],
+            },
+        }
+
+
+class BusRealtimeIngestResponse(BaseModel):
+    stop_id: Annotated[list[int], Field(alias="stop")]
+    deleted: Annotated[int, Field(alias="deleted", ge=0)]
+    inserted: Annotated[int, Field(alias="inserted", ge=0)]
+    elapsed: Annotated[float, Field(alias="elapsed", ge=0)]  # milliseconds
+
+
+class BusStatisticsItemResponse(BaseModel):
+    route_id: Annotated[int, Field(alias="routeID", ge=1)]
+    stop_id: Annotated[int, Field(alias="stopID", ge=1)]
+    weekdays: Annotated[str, Field(alias="weekdays")]
+    hour: Annotated[int, Field(alias="hour", ge=0, le=23)]
+    count: Annotated[int, Field(alias="count", ge=0)]
+    headway: Annotated[Optional[float], Field(alias="headway")]  # minutes
+    deviation: Annotated[Optional[float], Field(alias="deviation")]  # minutes
+    early: Annotated[Optional[float], Field(alias="early", ge=0, le=1)]
+    late: Annotated[Optional[float], Field(alias="late", ge=0, le=1)]
+    p10: Annotated[Optional[int], Field(alias="p10")]
+    p50: Annotated[Optional[int], Field(alias="p50")]
+    p90: Annotated[Optional[int], Field(alias="p90")]
+
+
+class BusStatisticsListResponse(BaseModel):
+    data: Annotated[list[BusStatisticsItemResponse], Field(alias="data")]
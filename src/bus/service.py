@@ -1,7 +1,13 @@
 import datetime
+from typing import AsyncIterator
 
-from sqlalchemy import select, insert, delete, update
+from sqlalchemy import select, insert, delete, update, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from bus import cache as realtime_cache
+from bus.graph import bus_network
+from bus.stream import realtime_broadcaster
 from bus.schemas import (
     CreateBusRouteRequest,
     UpdateBusRouteRequest,
@@ -10,9 +16,11 @@ from bus.schemas import (
     CreateBusRouteStopRequest,
     UpdateBusRouteStopRequest,
     CreateBusTimetableRequest,
+    BusRealtimeSnapshotRequest,
 )
-from database import fetch_all, fetch_one, execute_query
-from model.bus import BusRoute, BusStop, BusRouteStop, BusTimetable, BusRealtime
+from database import engine, fetch_all, fetch_one, fetch_rows, execute_query
+from model.bus import BusRoute, BusStop, BusRouteStop, BusTimetable, BusRealtime, BusDepartureStatistics
+from search import invalidate_index
 from utils import KST
 
 
@@ -65,6 +73,7 @@ async def create_route(new_route: CreateBusRouteRequest) -> BusRoute | None:
         )
     )
     await execute_query(insert_query)
+    bus_network.invalidate()
     select_query = select(BusRoute).where(BusRoute.id_ == new_route.id_)
     return await fetch_one(select_query)
 
@@ -143,6 +152,7 @@ async def update_route(
         )
     )
     await execute_query(update_query)
+    bus_network.invalidate()
     select_query = select(BusRoute).where(BusRoute.id_ == route_id)
     return await fetch_one(select_query)
 
@@ -150,6 +160,7 @@ async def update_route(
 async def delete_route(route_id: int) -> None:
     delete_query = delete(BusRoute).where(BusRoute.id_ == route_id)
     await execute_query(delete_query)
+    bus_network.invalidate()
 
 
 async def list_stops() -> list[BusStop]:
@@ -183,6 +194,8 @@ async def create_stop(new_stop: CreateBusStopRequest) -> BusStop | None:
         )
     )
     await execute_query(insert_query)
+    invalidate_index(BusStop.name)
+    bus_network.invalidate()
     select_query = select(BusStop).where(BusStop.id_ == new_stop.id_)
     return await fetch_one(select_query)
 
@@ -226,6 +239,8 @@ async def update_stop(
         )
     )
     await execute_query(update_query)
+    invalidate_index(BusStop.name)
+    bus_network.invalidate()
     select_query = select(BusStop).where(BusStop.id_ == stop_id)
     return await fetch_one(select_query)
 
@@ -233,6 +248,8 @@ async def update_stop(
 async def delete_stop(stop_id: int) -> None:
     delete_query = delete(BusStop).where(BusStop.id_ == stop_id)
     await execute_query(delete_query)
+    invalidate_index(BusStop.name)
+    bus_network.invalidate()
 
 
 async def list_route_stops(route_id: int | None = None) -> list[BusRouteStop]:
@@ -267,6 +284,7 @@ async def create_route_stop(
         )
     )
     await execute_query(insert_query)
+    bus_network.invalidate()
     select_query = select(BusRouteStop).where(
         BusRouteStop.route_id == route_id,
         BusRouteStop.stop_id == new_route_stop.stop_id,
@@ -306,6 +324,7 @@ async def update_route_stop(
         )
     )
     await execute_query(update_query)
+    bus_network.invalidate()
     select_query = select(BusRouteStop).where(
         BusRouteStop.route_id == route_id,
         BusRouteStop.stop_id == stop_id,
@@ -319,6 +338,7 @@ async def delete_route_stop(route_id: int, stop_id: int) -> None:
         BusRouteStop.stop_id == stop_id,
     )
     await execute_query(delete_query)
+    bus_network.invalidate()
 
 
 async def list_timetable() -> list[BusTimetable]:
@@ -403,18 +423,144 @@ async def delete_timetable(
 
 
 async def list_realtime() -> list[BusRealtime]:
-    select_query = select(BusRealtime)
-    return await fetch_all(select_query)
+    return await realtime_cache.list_realtime()
 
 
 async def list_realtime_filter(
     route_id: int | None = None,
     stop_id: int | None = None,
 ) -> list[BusRealtime]:
+    return await realtime_cache.list_realtime(stop_id=stop_id, route_id=route_id)
+
+
+async def list_route_stop_keys(keys: set[tuple[int, int]]) -> set[tuple[int, int]]:
+    select_query = select(BusRouteStop.stop_id, BusRouteStop.route_id).where(
+        tuple_(BusRouteStop.stop_id, BusRouteStop.route_id).in_(keys),
+    )
+    return {(row.stop_id, row.route_id) for row in await fetch_rows(select_query)}
+
+
+async def replace_realtime(
+    snapshot: list[BusRealtimeSnapshotRequest],
+) -> tuple[list[int], int, int]:
+    # 스냅샷에 포함된 정류장의 도착 정보 전체를 한 트랜잭션에서 교체한다.
+    stop_ids = sorted({item.stop_id for item in snapshot})
+    now = datetime.datetime.now(tz=KST)
+    realtime_list = [
+        BusRealtime(
+            stop_id=item.stop_id,
+            route_id=item.route_id,
+            sequence=arrival.sequence,
+            stops=arrival.remaining_stop,
+            seats=arrival.remaining_seat,
+            time=datetime.timedelta(seconds=arrival.remaining_time),
+            low_floor=arrival.low_floor,
+            updated_at=arrival.updated_at or now,
+        )
+        for item in snapshot
+        for arrival in item.arrivals
+    ]
+    async with AsyncSession(engine) as session:
+        async with session.begin():
+            delete_result = await session.execute(
+                delete(BusRealtime)
+                .where(BusRealtime.stop_id.in_(stop_ids))
+                .returning(BusRealtime.stop_id, BusRealtime.route_id),
+            )
+            deleted_keys = [(row.stop_id, row.route_id) for row in delete_result.all()]
+            if realtime_list:
+                await session.execute(
+                    insert(BusRealtime),
+                    [
+                        {
+                            "stop_id": realtime.stop_id,
+                            "route_id": realtime.route_id,
+                            "sequence": realtime.sequence,
+                            "stops": realtime.stops,
+                            "seats": realtime.seats,
+                            "time": realtime.time,
+                            "low_floor": realtime.low_floor,
+                            "updated_at": realtime.updated_at,
+                        }
+                        for realtime in realtime_list
+                    ],
+                )
+    # 이번 스냅샷에서 사라진 노선도 빈 목록으로 덮어써서 캐시에 남지 않게 한다.
+    entries: dict[tuple[int, int], list[BusRealtime]] = {key: [] for key in deleted_keys}
+    entries.update({(item.stop_id, item.route_id): [] for item in snapshot})
+    entries.update(realtime_cache.group_realtime(realtime_list))
+    await realtime_cache.write_realtime(entries)
+    await realtime_cache.update_realtime_index(
+        set(deleted_keys),
+        {(item.stop_id, item.route_id) for item in realtime_list},
+    )
+    # 상류 정류장의 도착 정보로 추정하는 하류 정류장의 구독자에게도 알린다.
+    network = await bus_network.get()
+    await realtime_broadcaster.publish(
+        set(stop_ids) | {edge.stop_id for _, route_id in entries for edge in network.route_stops(route_id)},
+    )
+    return stop_ids, len(deleted_keys), len(realtime_list)
+
+
+async def list_statistics(
+    route_id: int | None = None,
+    stop_id: int | None = None,
+    weekdays: str | None = None,
+) -> list[BusDepartureStatistics]:
     conditions = []
     if route_id is not None:
-        conditions.append(BusRealtime.route_id == route_id)
+        conditions.append(BusDepartureStatistics.route_id == route_id)
     if stop_id is not None:
-        conditions.append(BusRealtime.stop_id == stop_id)
-    select_query = select(BusRealtime).where(*conditions)
+        conditions.append(BusDepartureStatistics.stop_id == stop_id)
+    if weekdays is not None:
+        conditions.append(BusDepartureStatistics.weekday == weekdays)
+    select_query = (
+        select(BusDepartureStatistics)
+        .where(*conditions)
+        .order_by(
+            BusDepartureStatistics.route_id,
+            BusDepartureStatistics.stop_id,
+            BusDepartureStatistics.weekday,
+            BusDepartureStatistics.hour,
+        )
+    )
     return await fetch_all(select_query)
+
+
+async def list_route_ids(route_ids: set[int]) -> set[int]:
+    select_query = select(BusRoute.id_).where(BusRoute.id_.in_(route_ids))
+    return set(await fetch_all(select_query))
+
+
+async def list_stop_ids(stop_ids: set[int]) -> set[int]:
+    select_query = select(BusStop.id_).where(BusStop.id_.in_(stop_ids))
+    return set(await fetch_all(select_query))
+
+
+async def import_timetable(
+    batches: AsyncIterator[list[CreateBusTimetableRequest]],
+) -> tuple[int, int]:
+    # 배치마다 여러 행을 한 번에 넣고, 이미 있는 출발 시간은 건너뛴다.
+    received = inserted = 0
+    async with AsyncSession(engine) as session:
+        async with session.begin():
+            async for batch in batches:
+                received += len(batch)
+                insert_query = (
+                    pg_insert(BusTimetable)
+                    .values(
+                        [
+                            {
+                                "route_id": item.route_id,
+                                "start_stop_id": item.start_stop_id,
+                                "weekday": item.weekdays,
+                                "departure_time": item.departure_time.replace(tzinfo=KST),
+                            }
+                            for item in batch
+                        ],
+                    )
+                    .on_conflict_do_nothing()
+                    .returning(BusTimetable.route_id)
+                )
+                inserted += len((await session.execute(insert_query)).all())
+    return inserted, received - inserted
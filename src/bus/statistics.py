@@ -0,0 +1,220 @@
+import datetime
+from bisect import bisect_left
+from typing import Iterable
+
+import holidays
+from sqlalchemy import and_, extract, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import engine
+from model.bus import (
+    BusDepartureLog,
+    BusDepartureStatistics,
+    BusDepartureStatisticsState,
+    BusRouteStop,
+    BusTimetable,
+)
+from utils import KST
+
+kr_holidays = holidays.country_holidays("KR")
+HISTOGRAM_MIN = -30  # minutes
+HISTOGRAM_MAX = 30  # minutes
+EARLY_THRESHOLD = -60  # seconds
+LATE_THRESHOLD = 3 * 60  # seconds
+SERVICE_DAY_START = 4  # hour
+STATISTICS_LOCK_ID = 0x62757374  # pg_advisory_xact_lock key shared by every worker
+
+StatisticsKey = tuple[int, int, str, int]  # (route_id, stop_id, weekday, hour)
+
+
+def service_weekday(date: datetime.date) -> str:
+    if date in kr_holidays or date.weekday() == 6:
+        return "sunday"
+    elif date.weekday() == 5:
+        return "saturday"
+    return "weekdays"
+
+
+def service_seconds(value: datetime.time) -> int:
+    # 04:00 이전 출발은 전날 운행의 연장으로 본다.
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    if value.hour < SERVICE_DAY_START:
+        seconds += 24 * 3600
+    return seconds
+
+
+def histogram_index(deviation: float) -> int:
+    minute = min(max(round(deviation / 60), HISTOGRAM_MIN), HISTOGRAM_MAX)
+    return minute - HISTOGRAM_MIN
+
+
+def percentile(histogram: list[int], q: float) -> int | None:
+    total = sum(histogram)
+    if total == 0:
+        return None
+    threshold, cumulative = q * total, 0
+    for index, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= threshold:
+            return index + HISTOGRAM_MIN
+    return HISTOGRAM_MAX
+
+
+def summarize(item: BusDepartureStatistics) -> dict[str, int | str | float | None]:
+    return {
+        "route_id": item.route_id,
+        "stop_id": item.stop_id,
+        "weekdays": item.weekday,
+        "hour": item.hour,
+        "count": item.count,
+        "headway": item.headway_sum / item.headway_count / 60 if item.headway_count else None,
+        "deviation": item.deviation_sum / item.deviation_count / 60 if item.deviation_count else None,
+        "early": item.early_count / item.deviation_count if item.deviation_count else None,
+        "late": item.late_count / item.deviation_count if item.deviation_count else None,
+        "p10": percentile(item.histogram, 0.1),
+        "p50": percentile(item.histogram, 0.5),
+        "p90": percentile(item.histogram, 0.9),
+    }
+
+
+def accumulate(
+    buckets: dict[StatisticsKey, BusDepartureStatistics],
+    route_id: int,
+    stop_id: int,
+    weekday: str,
+    departures: Iterable[datetime.time],
+    scheduled: list[int],
+) -> None:
+    previous = None
+    for departure_time in sorted(departures, key=service_seconds):
+        departure = service_seconds(departure_time)
+        key = (route_id, stop_id, weekday, departure_time.hour)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = BusDepartureStatistics(
+                route_id=route_id, stop_id=stop_id, weekday=weekday, hour=departure_time.hour,
+                count=0, headway_count=0, headway_sum=0, deviation_count=0, deviation_sum=0,
+                early_count=0, late_count=0, histogram=[0] * (HISTOGRAM_MAX - HISTOGRAM_MIN + 1),
+            )
+        bucket.count += 1
+        if previous is not None:
+            bucket.headway_count += 1
+            bucket.headway_sum += departure - previous
+        previous = departure
+        if not scheduled:
+            continue
+        # 가장 가까운 시간표 출발 시각과의 차이를 편차로 본다.
+        index = bisect_left(scheduled, departure)
+        nearest = min(scheduled[max(index - 1, 0):index + 1], key=lambda x: abs(x - departure))
+        deviation = departure - nearest
+        bucket.deviation_count += 1
+        bucket.deviation_sum += deviation
+        bucket.early_count += deviation < EARLY_THRESHOLD
+        bucket.late_count += deviation > LATE_THRESHOLD
+        histogram = list(bucket.histogram)
+        histogram[histogram_index(deviation)] += 1
+        bucket.histogram = histogram
+
+
+def service_date(date: datetime.date, value: datetime.time) -> datetime.date:
+    # 04:00 이전 출발은 전날 운행으로 집계한다.
+    return date - datetime.timedelta(days=1) if value.hour < SERVICE_DAY_START else date
+
+
+async def aggregate_statistics(today: datetime.date | None = None) -> int:
+    """Folds departure logs of every completed service day since the last run into the statistics table.
+
+    A service day runs from 04:00 to 04:00 of the next calendar day. Days are
+    processed ``BUS_STATISTICS_CHUNK_DAYS`` at a time, one transaction each.
+    Returns the number of departure logs aggregated.
+    """
+    if today is None:
+        now = datetime.datetime.now(tz=KST)
+        today = service_date(now.date(), now.time())
+    end = today - datetime.timedelta(days=1)
+    total = 0
+    while True:
+        async with AsyncSession(engine) as session:
+            async with session.begin():
+                await session.execute(text("select pg_advisory_xact_lock(:key)"), {"key": STATISTICS_LOCK_ID})
+                state = await session.get(BusDepartureStatisticsState, 1)
+                if state is None:
+                    first_date = await session.scalar(
+                        select(BusDepartureLog.date).order_by(BusDepartureLog.date).limit(1),
+                    )
+                    # 첫 기록일 새벽 출발은 그 전날 운행이다.
+                    state = BusDepartureStatisticsState(id_=1, date=(first_date or today) - datetime.timedelta(days=2))
+                    session.add(state)
+                start = state.date + datetime.timedelta(days=1)
+                if start > end:
+                    return total
+                chunk_end = min(end, start + datetime.timedelta(days=settings.BUS_STATISTICS_CHUNK_DAYS - 1))
+                total += await aggregate_days(session, start, chunk_end)
+                state.date = chunk_end
+
+
+async def aggregate_days(session: AsyncSession, start: datetime.date, end: datetime.date) -> int:
+    next_day = datetime.timedelta(days=1)
+    early = extract("hour", BusDepartureLog.time) < SERVICE_DAY_START
+    logs = (
+        await session.execute(
+            select(
+                BusDepartureLog.route_id,
+                BusDepartureLog.stop_id,
+                BusDepartureLog.date,
+                BusDepartureLog.time,
+            )
+            .where(
+                or_(
+                    and_(BusDepartureLog.date >= start, BusDepartureLog.date <= end, ~early),
+                    and_(BusDepartureLog.date >= start + next_day, BusDepartureLog.date <= end + next_day, early),
+                ),
+            ),
+        )
+    ).all()
+    if not logs:
+        return 0
+    route_stops = {
+        (row.route_id, row.stop_id): (row.start_stop_id, row.minute_from_start)
+        for row in await session.execute(
+            select(
+                BusRouteStop.route_id,
+                BusRouteStop.stop_id,
+                BusRouteStop.start_stop_id,
+                BusRouteStop.minute_from_start,
+            ),
+        )
+    }
+    timetables: dict[tuple[int, int, str], list[int]] = {}
+    for row in await session.execute(
+        select(
+            BusTimetable.route_id,
+            BusTimetable.start_stop_id,
+            BusTimetable.weekday,
+            BusTimetable.departure_time,
+        ),
+    ):
+        timetables.setdefault(
+            (row.route_id, row.start_stop_id, row.weekday), [],
+        ).append(service_seconds(row.departure_time))
+    for departures in timetables.values():
+        departures.sort()
+    daily: dict[tuple[int, int, datetime.date], list[datetime.time]] = {}
+    for row in logs:
+        date = row.date.date() if isinstance(row.date, datetime.datetime) else row.date
+        daily.setdefault((row.route_id, row.stop_id, service_date(date, row.time)), []).append(row.time)
+    buckets = {
+        (item.route_id, item.stop_id, item.weekday, item.hour): item
+        for item in await session.scalars(select(BusDepartureStatistics))
+    }
+    for (route_id, stop_id, date), departures in daily.items():
+        weekday = service_weekday(date)
+        start_stop_id, minute_from_start = route_stops.get((route_id, stop_id), (None, 0))
+        scheduled = [
+            departure + minute_from_start * 60
+            for departure in timetables.get((route_id, start_stop_id, weekday), [])
+        ]
+        accumulate(buckets, route_id, stop_id, weekday, departures, scheduled)
+    session.add_all(buckets.values())
+    return len(logs)
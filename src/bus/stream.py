@@ -0,0 +1,42 @@
+import datetime
+
+from broadcast import RealtimeBroadcaster, graphql_payload
+from bus import cache as realtime_cache
+from bus.graph import bus_network
+from bus.query import build_realtime_query, build_route_query
+from utils import KST
+
+
+async def load_realtime(stop_ids: set[int]) -> dict[int, list[dict]]:
+    """Realtime arrivals per stop in the shape of ``bus { routes { sequence info realtime } }``.
+
+    Arrivals are read like the GraphQL resolver: from the Redis cache, projected
+    from upstream stops when a pair has no feed of its own, and without buses
+    that have already arrived.
+    """
+    network = await bus_network.get()
+    stop_routes = {
+        stop_id: sorted(network.stop_routes(stop_id), key=lambda x: x.sequence)
+        for stop_id in stop_ids
+    }
+    realtime_map = await realtime_cache.get_realtime(
+        (edge.stop_id, edge.route_id) for edges in stop_routes.values() for edge in edges
+    )
+    now = datetime.datetime.now(tz=KST)
+    return {
+        stop_id: [
+            {
+                "sequence": edge.sequence,
+                "minuteFromStart": edge.minute_from_start,
+                "info": graphql_payload(build_route_query(network, edge.route_id)),
+                "realtime": graphql_payload(
+                    build_realtime_query(realtime_map.get((edge.stop_id, edge.route_id), []), now),
+                ),
+            }
+            for edge in edges
+        ]
+        for stop_id, edges in stop_routes.items()
+    }
+
+
+realtime_broadcaster: RealtimeBroadcaster[int] = RealtimeBroadcaster("bus:realtime:updates", load_realtime)
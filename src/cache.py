@@ -0,0 +1,43 @@
+# Per-worker caches of data compiled from database tables.
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class TTLCache(Generic[T]):
+    """Per-worker copy of data compiled from the database.
+
+    The data is loaded lazily, rebuilt when a write invalidates it and reloaded
+    after ``ttl`` seconds so that writes handled by other workers are
+    eventually picked up.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[T]], ttl: int) -> None:
+        self._loader = loader
+        self._ttl = ttl
+        self._compiled: T | None = None
+        self._compiled_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._compiled is not None and time.monotonic() - self._compiled_at < self._ttl
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._compiled = None
+
+    async def get(self) -> T:
+        if self._is_fresh():
+            return self._compiled  # type: ignore
+        async with self._lock:
+            if self._is_fresh():
+                return self._compiled  # type: ignore
+            generation = self._generation
+            compiled = await self._loader()
+            if generation == self._generation:
+                self._compiled = compiled
+                self._compiled_at = time.monotonic()
+            return compiled
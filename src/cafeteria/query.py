@@ -7,6 +7,7 @@ from sqlalchemy.orm import joinedload
 
 from database import fetch_all
 from model.cafeteria import Menu, Cafeteria
+from search import text_search
 
 
 @strawberry.type
@@ -54,14 +55,16 @@ async def resolve_menu(
     date_str: Optional[str] = None,
     type_: Optional[list[str]] = None,
 ) -> list[CafeteriaQuery]:
-    cafeteria_conditions = []
+    cafeteria_conditions, cafeteria_order = [], []
     if campus_id is not None:
         cafeteria_conditions.append(Cafeteria.campus_id == campus_id)
     if id_ is not None:
         cafeteria_conditions.append(Cafeteria.id_ == id_)
     if name is not None:
-        cafeteria_conditions.append(Cafeteria.name.like(f"%{name}%"))
-    select_query = select(Cafeteria).where(*cafeteria_conditions)
+        name_search = await text_search(Cafeteria.name, name)
+        cafeteria_conditions.append(name_search.condition)
+        cafeteria_order.append(name_search.rank.desc())
+    select_query = select(Cafeteria).where(*cafeteria_conditions).order_by(*cafeteria_order, Cafeteria.id_)
     cafeteria_list: list[Cafeteria] = await fetch_all(select_query)
 
     menu_conditions = [
@@ -10,6 +10,7 @@ from cafeteria.schemas import (
 )
 from database import fetch_all, fetch_one, execute_query
 from model.cafeteria import Cafeteria, Menu
+from search import invalidate_index
 
 
 async def list_cafeteria() -> list[Cafeteria]:
@@ -43,6 +44,7 @@ async def create_cafeteria(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(Cafeteria.name)
     select_query = select(Cafeteria).where(Cafeteria.id_ == new_cafeteria.id_)
     return await fetch_one(select_query)
 
@@ -75,6 +77,7 @@ async def update_cafeteria(
         .values(update_data)
     )
     await execute_query(update_query)
+    invalidate_index(Cafeteria.name)
     select_query = select(Cafeteria).where(Cafeteria.id_ == cafeteria_id)
     return await fetch_one(select_query)
 
@@ -82,6 +85,7 @@ async def update_cafeteria(
 async def delete_cafeteria(cafeteria_id: int) -> None:
     delete_query = delete(Cafeteria).where(Cafeteria.id_ == cafeteria_id)
     await execute_query(delete_query)
+    invalidate_index(Cafeteria.name)
 
 
 async def get_list_menu() -> list[Menu]:
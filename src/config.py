@@ -32,6 +32,33 @@ class Config(BaseSettings):
 
     APP_VERSION: str = "1"
 
+    SEARCH_CANDIDATE_LIMIT: int = 500
+    SEARCH_INDEX_TTL: int = 60 * 5  # 5 minutes
+
+    BUS_DEPARTURE_LOG_DAYS: int = 7  # days
+    BUS_DEPARTURE_LOG_RETENTION_DAYS: int = 180  # days
+    BUS_DEPARTURE_LOG_PARTITIONS_AHEAD: int = 1  # months
+    BUS_DEPARTURE_LOG_MAINTENANCE_INTERVAL: int = 60 * 60 * 6  # 6 hours
+    BUS_NETWORK_TTL: int = 60 * 60  # 1 hour
+    BUS_REALTIME_CACHE_TTL: int = 30  # seconds
+    BUS_REALTIME_INDEX_TTL: int = 60 * 5  # 5 minutes
+    BUS_STATISTICS_CHUNK_DAYS: int = 7  # days
+    BUS_TIMETABLE_IMPORT_BATCH_SIZE: int = 500
+    BUS_TRAVEL_TIME_DAYS: int = 28  # days
+    BUS_TRAVEL_TIME_MIN_SAMPLES: int = 3
+    BUS_TRAVEL_TIME_TTL: int = 60 * 60  # 1 hour
+    REALTIME_STREAM_KEEPALIVE: float = 15.0  # seconds
+    REALTIME_STREAM_QUEUE_SIZE: int = 16
+    REALTIME_STREAM_RETRY_INTERVAL: float = 5.0  # seconds
+    SHUTTLE_CACHE_TTL: int = 60 * 5  # 5 minutes
+    SHUTTLE_QUERY_CONCURRENCY: int = 4
+    SHUTTLE_SERVICE_DAY_WINDOW: int = 60  # days
+    SHUTTLE_VIEW_REFRESH_DELAY: float = 1.0  # seconds
+    SUBWAY_ESTIMATE_COUNT: int = 4
+    SUBWAY_ESTIMATE_MAX_AGE: int = 60 * 30  # 30 minutes
+    SUBWAY_ESTIMATE_TTL: int = 30  # seconds
+    SUBWAY_TIMETABLE_CACHE_TTL: int = 60 * 60  # 1 hour
+
 
 settings = Config()
 
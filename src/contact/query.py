@@ -6,6 +6,7 @@ from sqlalchemy.orm import joinedload, load_only
 
 from database import fetch_all
 from model.contact import PhoneBook, PhoneBookVersion, PhoneBookCategory
+from search import text_search
 
 
 @strawberry.type
@@ -36,17 +37,19 @@ async def resolve_contacts(
     category_id: Optional[int] = None,
     name: Optional[str] = None,
 ) -> list[ContactItemQuery]:
-    contact_conditions = []
+    contact_conditions, contact_order = [], []
     if category_id is not None:
         contact_conditions.append(PhoneBook.category_id == category_id)
     if name is not None:
-        contact_conditions.append(PhoneBook.name.like(f"%{name}%"))
+        name_search = await text_search(PhoneBook.name, name)
+        contact_conditions.append(name_search.condition)
+        contact_order.append(name_search.rank.desc())
     if campus_id is not None:
         contact_conditions.append(PhoneBook.campus_id == campus_id)
     select_query = (
         select(PhoneBook)
         .where(*contact_conditions)
-        .order_by(PhoneBook.id_)
+        .order_by(*contact_order, PhoneBook.id_)
         .options(
             joinedload(PhoneBook.category).options(
                 load_only(PhoneBookCategory.id_, PhoneBookCategory.name),
@@ -10,6 +10,7 @@ from contact.schemas import (
     CreateContactRequest,
     UpdateContactRequest,
 )
+from search import invalidate_index
 
 
 async def list_contact_category() -> list[PhoneBookCategory]:
@@ -57,6 +58,7 @@ async def delete_contact_category(contact_category_id: int) -> None:
         PhoneBookCategory.id_ == contact_category_id,
     )
     await execute_query(delete_query)
+    invalidate_index(PhoneBook.name)
 
 
 async def get_contact_list(contact_category_id: int) -> list[PhoneBook]:
@@ -110,6 +112,7 @@ async def create_contact(
     )
     await execute_query(insert_version_query)
     await execute_query(insert_query)
+    invalidate_index(PhoneBook.name)
     select_query = select(PhoneBook).where(
         PhoneBook.category_id == category_id,
         PhoneBook.name == new_contact.name,
@@ -126,6 +129,7 @@ async def delete_contact(
         PhoneBook.id_ == contact_id,
     )
     await execute_query(delete_query)
+    invalidate_index(PhoneBook.name)
     delete_version_query = delete(PhoneBookVersion)
     await execute_query(delete_version_query)
     now = datetime.datetime.now(tz=pytz.timezone("Asia/Seoul"))
@@ -178,6 +182,7 @@ async def update_contact(
     )
     await execute_query(insert_version_query)
     await execute_query(update_query)
+    invalidate_index(PhoneBook.name)
     select_query = select(PhoneBook).where(
         PhoneBook.category_id == contact_category_id,
         PhoneBook.id_ == contact_id,
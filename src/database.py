@@ -41,6 +41,12 @@ async def fetch_all(query: Select):
         return [item[0] for item in query_result.all()]
 
 
+async def fetch_rows(query: Select):
+    async with AsyncSession(engine) as session:
+        query_result = await session.execute(query)
+        return query_result.all()
+
+
 async def execute_query(query: Insert | Update | Delete):
     async with AsyncSession(engine) as session:
         await session.execute(query)
@@ -7,6 +7,7 @@ from sqlalchemy.orm import joinedload, load_only
 
 from database import fetch_all
 from model.calendar import Calendar, CalendarVersion, CalendarCategory
+from search import text_search
 
 
 @strawberry.type
@@ -43,15 +44,17 @@ async def resolve_events(
     category_id: Optional[int] = None,
     title: Optional[str] = None,
 ) -> list[EventQuery]:
-    calendar_conditions = []
+    calendar_conditions, calendar_order = [], []
     if category_id is not None:
         calendar_conditions.append(Calendar.category_id == category_id)
     if title is not None:
-        calendar_conditions.append(Calendar.title.like(f"%{title}%"))
+        title_search = await text_search(Calendar.title, title)
+        calendar_conditions.append(title_search.condition)
+        calendar_order.append(title_search.rank.desc())
     select_query = (
         select(Calendar)
         .where(*calendar_conditions)
-        .order_by(Calendar.id_)
+        .order_by(*calendar_order, Calendar.id_)
         .options(
             joinedload(Calendar.category).options(
                 load_only(CalendarCategory.id_, CalendarCategory.name),
@@ -10,6 +10,7 @@ from event.schemas import (
     CreateCalendarReqeust,
     UpdateCalendarRequest,
 )
+from search import invalidate_index
 
 
 async def list_calendar_category() -> list[CalendarCategory]:
@@ -77,6 +78,7 @@ async def delete_calendar_category(calendar_category_id: int) -> None:
         CalendarCategory.id_ == calendar_category_id,
     )
     await execute_query(delete_query)
+    invalidate_index(Calendar.title)
 
 
 async def get_calendar_list(calendar_category_id: int) -> list[Calendar]:
@@ -131,6 +133,7 @@ async def create_calendar(
     )
     await execute_query(insert_version_query)
     await execute_query(insert_query)
+    invalidate_index(Calendar.title)
     select_query = select(Calendar).where(
         Calendar.category_id == category_id,
         Calendar.title == new_calendar.title,
@@ -150,6 +153,7 @@ async def delete_calendar(
         Calendar.id_ == calendar_id,
     )
     await execute_query(delete_query)
+    invalidate_index(Calendar.title)
     delete_version_query = delete(CalendarVersion)
     await execute_query(delete_version_query)
     now = datetime.datetime.now(tz=pytz.timezone("Asia/Seoul"))
@@ -203,6 +207,7 @@ async def update_calendar(
     )
     await execute_query(insert_version_query)
     await execute_query(update_query)
+    invalidate_index(Calendar.title)
     select_query = select(Calendar).where(
         Calendar.category_id == calendar_category_id,
         Calendar.id_ == calendar_id,
@@ -16,6 +16,11 @@ class PermissionDenied(DetailedHTTPException):
     DETAIL = "PERMISSION_DENIED"
 
 
+class NotModified(DetailedHTTPException):
+    STATUS_CODE = status.HTTP_304_NOT_MODIFIED
+    DETAIL = "NOT_MODIFIED"
+
+
 class NotFound(DetailedHTTPException):
     STATUS_CODE = status.HTTP_404_NOT_FOUND
 
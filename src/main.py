@@ -8,7 +8,10 @@ from starlette.middleware.cors import CORSMiddleware
 
 import database
 from building.router import router as building_router
+from bus.graph import bus_network
+from bus.partition import log_maintainer
 from bus.router import router as bus_router
+from bus.stream import realtime_broadcaster as bus_realtime_broadcaster
 from cafeteria.router import router as cafeteria_router
 from campus.router import router as campus_router
 from commute_shuttle.router import router as commute_shuttle_router
@@ -19,6 +22,7 @@ from notice.router import router as notice_router
 from reading_room.router import router as reading_room_router
 from shuttle.router import router as shuttle_router
 from subway.router import router as subway_router
+from subway.stream import realtime_broadcaster as subway_realtime_broadcaster
 from user.router import router as auth_router
 
 
@@ -31,12 +35,21 @@ async def lifespan(_application: FastAPI) -> AsyncGenerator:
         max_connections=100,
     )
     database.redis_client = Redis(connection_pool=redis_pool)
+    if not settings.ENVIRONMENT.is_testing:
+        # 첫 요청 전에 버스 노선망을 메모리에 올려 둔다.
+        await bus_network.get()
+        log_maintainer.start()
+        bus_realtime_broadcaster.start()
+        subway_realtime_broadcaster.start()
     yield
 
     if settings.ENVIRONMENT.is_testing:
         return
 
     # Shutdown
+    await log_maintainer.stop()
+    await bus_realtime_broadcaster.stop()
+    await subway_realtime_broadcaster.stop()
     await redis_pool.disconnect()
 
 
@@ -2,7 +2,9 @@ import datetime
 from typing import List
 
 from sqlalchemy import (
+    ARRAY,
     Boolean,
+    Date,
     DateTime,
     Float,
     Integer,
@@ -46,6 +48,68 @@ class BusDepartureLog(Base):
     vehicle_id: Mapped[str] = mapped_column("vehicle_id", String(20))
 
 
+class BusDepartureLogDaily(Base):
+    __tablename__ = "bus_departure_log_daily"
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "stop_id",
+            "route_id",
+            "departure_date",
+            name="pk_bus_departure_log_daily",
+        ),
+        ForeignKeyConstraint(
+            ["stop_id", "route_id"],
+            ["bus_route_stop.stop_id", "bus_route_stop.route_id"],
+            name="fk_bus_departure_log_daily_stop_id",
+        ),
+    )
+
+    stop_id: Mapped[int] = mapped_column("stop_id", Integer)
+    route_id: Mapped[int] = mapped_column("route_id", Integer)
+    date: Mapped[datetime.date] = mapped_column("departure_date", Date)
+    first_time: Mapped[datetime.time] = mapped_column("first_departure_time", Time(timezone=True))
+    last_time: Mapped[datetime.time] = mapped_column("last_departure_time", Time(timezone=True))
+    count: Mapped[int] = mapped_column("departure_count", Integer)
+
+
+class BusDepartureStatistics(Base):
+    __tablename__ = "bus_departure_statistics"
+    __table_args__ = (
+        PrimaryKeyConstraint(
+            "route_id",
+            "stop_id",
+            "weekday",
+            "departure_hour",
+            name="pk_bus_departure_statistics",
+        ),
+        ForeignKeyConstraint(
+            ["stop_id", "route_id"],
+            ["bus_route_stop.stop_id", "bus_route_stop.route_id"],
+            name="fk_bus_departure_statistics_stop_id",
+        ),
+    )
+
+    route_id: Mapped[int] = mapped_column("route_id", Integer)
+    stop_id: Mapped[int] = mapped_column("stop_id", Integer)
+    weekday: Mapped[str] = mapped_column("weekday", String(10))
+    hour: Mapped[int] = mapped_column("departure_hour", Integer)
+    count: Mapped[int] = mapped_column("departure_count", Integer, default=0)
+    headway_count: Mapped[int] = mapped_column("headway_count", Integer, default=0)
+    headway_sum: Mapped[float] = mapped_column("headway_sum", Float, default=0)
+    deviation_count: Mapped[int] = mapped_column("deviation_count", Integer, default=0)
+    deviation_sum: Mapped[float] = mapped_column("deviation_sum", Float, default=0)
+    early_count: Mapped[int] = mapped_column("early_count", Integer, default=0)
+    late_count: Mapped[int] = mapped_column("late_count", Integer, default=0)
+    histogram: Mapped[list[int]] = mapped_column("deviation_histogram", ARRAY(Integer))
+
+
+class BusDepartureStatisticsState(Base):
+    __tablename__ = "bus_departure_statistics_state"
+
+    id_: Mapped[int] = mapped_column("state_id", Integer, primary_key=True, default=1)
+    date: Mapped[datetime.date] = mapped_column("aggregated_date", Date)
+
+
 class BusTimetable(Base):
     __tablename__ = "bus_timetable"
     __table_args__ = (
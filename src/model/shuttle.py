@@ -2,6 +2,7 @@ import datetime
 from typing import List
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     Float,
@@ -273,3 +274,11 @@ class ShuttleTimetableGroupedView(Base):
         uselist=True,
         viewonly=True,
     )
+
+
+class ShuttleVersion(Base):
+    __tablename__ = "shuttle_version"
+
+    id_: Mapped[int] = mapped_column("version_id", BigInteger, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column("version_name", String(30))
+    created_at: Mapped[datetime.datetime] = mapped_column("created_at", DateTime(timezone=True))
@@ -2,6 +2,7 @@ import datetime
 from typing import List
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     DateTime,
     Integer,
@@ -147,3 +148,11 @@ class SubwayRealtime(Base):
         "SubwayRouteStation",
         primaryjoin="SubwayRealtime.terminal_station_id == SubwayRouteStation.id_",
     )
+
+
+class SubwayRealtimeVersion(Base):
+    __tablename__ = "subway_realtime_version"
+
+    id_: Mapped[int] = mapped_column("version_id", BigInteger, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column("version_name", String(30))
+    created_at: Mapped[datetime.datetime] = mapped_column("created_at", DateTime(timezone=True))
@@ -8,6 +8,7 @@ from sqlalchemy.orm import joinedload, load_only
 
 from database import fetch_all
 from model.notice import Notice, NoticeCategory
+from search import text_search
 
 
 @strawberry.type
@@ -39,12 +40,15 @@ async def resolve_notice(
     ]
     if category_id is not None:
         notice_conditions.append(Notice.category_id == category_id)
+    notice_order = []
     if title is not None:
-        notice_conditions.append(Notice.title.like(f"%{title}%"))
+        title_search = await text_search(Notice.title, title)
+        notice_conditions.append(title_search.condition)
+        notice_order.append(title_search.rank.desc())
     select_query = (
         select(Notice)
         .where(*notice_conditions)
-        .order_by(Notice.id_)
+        .order_by(*notice_order, Notice.id_)
         .options(
             joinedload(Notice.category).options(
                 load_only(NoticeCategory.id_, NoticeCategory.name),
@@ -9,6 +9,7 @@ from notice.schemas import (
     CreateNoticeReqeust,
     UpdateNoticeRequest,
 )
+from search import invalidate_index
 
 
 async def list_notice_category() -> list[NoticeCategory]:
@@ -56,6 +57,7 @@ async def delete_notice_category(notice_category_id: int) -> None:
         NoticeCategory.id_ == notice_category_id,
     )
     await execute_query(delete_query)
+    invalidate_index(Notice.title)
 
 
 async def get_notice_list(notice_category_id: int) -> list[Notice]:
@@ -97,6 +99,7 @@ async def create_notice(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(Notice.title)
     select_query = select(Notice).where(
         Notice.category_id == category_id,
         Notice.title == new_notice.title,
@@ -115,6 +118,7 @@ async def delete_notice(
         Notice.id_ == notice_id,
     )
     await execute_query(delete_query)
+    invalidate_index(Notice.title)
 
 
 async def update_notice(
@@ -141,6 +145,7 @@ async def update_notice(
         .values(update_data)
     )
     await execute_query(update_query)
+    invalidate_index(Notice.title)
     select_query = select(Notice).where(
         Notice.category_id == notice_category_id,
         Notice.id_ == notice_id,
@@ -1,7 +1,7 @@
 import strawberry
 
 from building.query import BuildingQuery, resolve_building, RoomQuery, resolve_room
-from bus.query import StopQuery, resolve_bus
+from bus.query import StopQuery, resolve_bus, BusStatisticsQuery, resolve_bus_statistics
 from cafeteria.query import CafeteriaQuery, resolve_menu
 from contact.query import ContactQuery, resolve_contact
 from event.query import CalendarQuery, resolve_calendar
@@ -42,6 +42,11 @@ class Query:
         resolver=resolve_bus,
         description="Bus stop query",
     )
+    bus_statistics: list[BusStatisticsQuery] = strawberry.field(
+        resolver=resolve_bus_statistics,
+        description="Bus headway and punctuality statistics",
+        name="busStatistics",
+    )
     shuttle: ShuttleQuery = strawberry.field(
         resolver=resolve_shuttle,
         description="Shuttle query",
@@ -5,6 +5,7 @@ from sqlalchemy import true, select, false
 
 from database import fetch_all
 from model.reading_room import ReadingRoom
+from search import text_search
 
 
 @strawberry.type
@@ -42,17 +43,19 @@ async def resolve_reading_room(
     name: Optional[str] = None,
     is_active: Optional[bool] = None,
 ) -> list[ReadingRoomQuery]:
-    room_conditions = []
+    room_conditions, room_order = [], []
     if campus_id:
         room_conditions.append(ReadingRoom.campus_id == campus_id)
     if name:
-        room_conditions.append(ReadingRoom.name.like(f"%{name}%"))
+        name_search = await text_search(ReadingRoom.name, name)
+        room_conditions.append(name_search.condition)
+        room_order.append(name_search.rank.desc())
     if is_active is None or is_active is True:
         room_conditions.append(ReadingRoom.active.is_(true()))
     else:
         room_conditions.append(ReadingRoom.active.is_(false()))
     room_select_query = (
-        select(ReadingRoom).filter(*room_conditions).order_by(ReadingRoom.name)
+        select(ReadingRoom).filter(*room_conditions).order_by(*room_order, ReadingRoom.name)
     )
     room_list = await fetch_all(room_select_query)
     reading_room_mapping_func: Callable[[ReadingRoom], ReadingRoomQuery] = (
@@ -3,6 +3,7 @@ from sqlalchemy import select, insert, update, delete
 from database import fetch_all, fetch_one, execute_query
 from model.reading_room import ReadingRoom
 from reading_room.schemas import CreateReadingRoomRequest, UpdateReadingRoomRequest
+from search import invalidate_index
 
 
 async def list_reading_room() -> list[ReadingRoom]:
@@ -35,6 +36,7 @@ async def create_reading_room(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(ReadingRoom.name)
     select_query = select(ReadingRoom).where(ReadingRoom.id_ == new_reading_room.id_)
     return await fetch_one(select_query)
 
@@ -64,6 +66,7 @@ async def update_reading_room(
         .values(payload)
     )
     await execute_query(update_query)
+    invalidate_index(ReadingRoom.name)
     select_query = select(ReadingRoom).where(ReadingRoom.id_ == room_id)
     return await fetch_one(select_query)
 
@@ -71,3 +74,4 @@ async def update_reading_room(
 async def delete_reading_room(room_id: int) -> None:
     delete_query = delete(ReadingRoom).where(ReadingRoom.id_ == room_id)
     await execute_query(delete_query)
+    invalidate_index(ReadingRoom.name)
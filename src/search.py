@@ -0,0 +1,159 @@
+# Substring search on name/title columns.
+import asyncio
+import time
+from typing import NamedTuple
+
+from sqlalchemy import case, false, func, literal, select, text
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.elements import ColumnElement
+
+from config import settings
+from database import fetch_all, fetch_one
+
+NGRAM_SIZE = 3
+_trigram_available: bool | None = None
+_trigram_lock = asyncio.Lock()
+
+
+class TextSearch(NamedTuple):
+    condition: ColumnElement[bool]
+    rank: ColumnElement[float]  # 유사도가 높을수록 큰 값
+
+
+def ngrams(value: str, n: int = NGRAM_SIZE) -> set[str]:
+    # pg_trgm과 같이 앞뒤에 공백을 붙여 짧은 문자열도 n-gram을 갖도록 한다.
+    padded = f"  {value.lower()} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def similarity(left: set[str], right: set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+class NgramIndex:
+    """In-process n-gram index over the distinct values of a column.
+
+    Used when the pg_trgm extension is not installed. The index is rebuilt
+    from the database once it is older than ``ttl`` seconds.
+    """
+
+    def __init__(self, column: InstrumentedAttribute[str], ttl: float) -> None:
+        self._column = column
+        self._ttl = ttl
+        self._values: list[str] = []
+        self._grams: list[set[str]] = []
+        self._postings: dict[str, set[int]] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def _load(self) -> None:
+        async with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self._ttl:
+                return
+            values = [value for value in await fetch_all(select(self._column).distinct()) if value is not None]
+            grams = [ngrams(value) for value in values]
+            postings: dict[str, set[int]] = {}
+            for index, value_grams in enumerate(grams):
+                for gram in value_grams:
+                    postings.setdefault(gram, set()).add(index)
+            self._values, self._grams, self._postings = values, grams, postings
+            self._loaded_at = time.monotonic()
+
+    async def search(self, term: str, limit: int | None = None) -> list[tuple[str, float]] | None:
+        """Returns every value containing ``term`` (case-insensitive) ordered by similarity.
+
+        Returns None without scoring when more than ``limit`` values match.
+        """
+        await self._load()
+        needle = term.lower()
+        # 검색어 내부의 n-gram(앞뒤 공백 제외)을 모두 가진 값만 후보로 삼는다.
+        inner = {needle[i:i + NGRAM_SIZE] for i in range(len(needle) - NGRAM_SIZE + 1)}
+        if inner:
+            candidates = set.intersection(*(self._postings.get(gram, set()) for gram in inner))
+        else:
+            candidates = set(range(len(self._values)))
+        matched = [index for index in candidates if needle in self._values[index].lower()]
+        if limit is not None and len(matched) > limit:
+            return None
+        term_grams = ngrams(term)
+        scored = [(self._values[index], similarity(term_grams, self._grams[index])) for index in matched]
+        return sorted(scored, key=lambda item: (-item[1], item[0]))
+
+
+_indexes: dict[str, NgramIndex] = {}
+
+
+def index_key(column: InstrumentedAttribute[str]) -> str:
+    return f"{column.class_.__tablename__}.{column.key}"
+
+
+def get_ngram_index(column: InstrumentedAttribute[str]) -> NgramIndex:
+    key = index_key(column)
+    if key not in _indexes:
+        _indexes[key] = NgramIndex(column, ttl=settings.SEARCH_INDEX_TTL)
+    return _indexes[key]
+
+
+def invalidate_index(*columns: InstrumentedAttribute[str]) -> None:
+    # 값이 바뀐 열의 색인만 다음 검색 때 다시 만든다.
+    for column in columns:
+        index = _indexes.get(index_key(column))
+        if index is not None:
+            index.invalidate()
+    invalidate_trigram()
+
+
+def invalidate_indexes() -> None:
+    for index in _indexes.values():
+        index.invalidate()
+    invalidate_trigram()
+
+
+def invalidate_trigram() -> None:
+    # pg_trgm이 나중에 설치되거나 삭제될 수 있으므로 다음 검색 때 다시 확인한다.
+    global _trigram_available
+    _trigram_available = None
+
+
+async def trigram_available() -> bool:
+    global _trigram_available
+    if _trigram_available is None:
+        async with _trigram_lock:
+            if _trigram_available is None:
+                _trigram_available = bool(
+                    await fetch_one(
+                        select(text("exists (select 1 from pg_extension where extname = 'pg_trgm')")),
+                    ),
+                )
+    return _trigram_available
+
+
+async def text_search(column: InstrumentedAttribute[str], term: str) -> TextSearch:
+    """Builds a case-insensitive substring filter on ``column`` and a similarity rank for ordering.
+
+    With pg_trgm the filter is an ILIKE served by the trigram GIN index; otherwise
+    matching values are looked up in an in-process n-gram index. When more than
+    ``SEARCH_CANDIDATE_LIMIT`` values match, the fallback filters with a plain
+    ILIKE and does not rank, so callers keep their own ordering.
+    """
+    if await trigram_available():
+        return TextSearch(
+            condition=column.icontains(term, autoescape=True),
+            rank=func.similarity(column, term),
+        )
+    # 큰 테이블에서 IN 목록과 CASE 식이 커지지 않도록 후보가 많으면 ILIKE로 찾는다.
+    matched = await get_ngram_index(column).search(term, limit=settings.SEARCH_CANDIDATE_LIMIT)
+    if matched is None:
+        return TextSearch(condition=column.icontains(term, autoescape=True), rank=literal(0.0))
+    if not matched:
+        return TextSearch(condition=false(), rank=literal(0.0))
+    return TextSearch(
+        condition=column.in_([value for value, _ in matched]),
+        rank=case(dict(matched), value=column, else_=0.0),
+    )
@@ -0,0 +1,324 @@
+import datetime
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby, islice
+from typing import Iterator, NamedTuple
+
+import holidays
+from korean_lunar_calendar import KoreanLunarCalendar
+from sqlalchemy import select
+
+from cache import TTLCache
+from config import settings
+from database import fetch_rows
+from model.shuttle import ShuttleHoliday, ShuttlePeriod, ShuttleTimetableGroupedView, ShuttleTimetableView
+from utils import KST, time_to_seconds
+
+kr_holidays = holidays.country_holidays("KR")
+
+
+class ShuttleTimetableEntry(NamedTuple):
+    seq: int
+    period: str
+    is_weekdays: bool
+    route_name: str
+    route_tag: str
+    stop_name: str
+    departure: int  # seconds from midnight (KST)
+
+
+class ShuttleTimetableBucket:
+    """Departures of a single (period, weekday, stop, route tag) key, sorted by departure time."""
+
+    __slots__ = ("departure", "seq", "route")
+
+    def __init__(self) -> None:
+        self.departure = array("I")
+        self.seq = array("I")
+        self.route = array("H")
+
+
+class CompiledShuttleTimetable:
+    def __init__(self, rows) -> None:
+        self.routes: list[str] = []
+        self.buckets: dict[tuple[str, bool, str, str], ShuttleTimetableBucket] = {}
+        self._route_index: dict[str, int] = {}
+        via: dict[int, list[tuple[str, int]]] = {}
+        entries = sorted(
+            (tuple(row[:6]) + (time_to_seconds(row[6]),) for row in rows),
+            key=lambda x: (x[6], x[0]),
+        )
+        for seq, period, is_weekdays, route_name, route_tag, stop_name, departure in entries:
+            if route_name not in self._route_index:
+                self._route_index[route_name] = len(self.routes)
+                self.routes.append(route_name)
+            key = (period, is_weekdays, stop_name, route_tag)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = ShuttleTimetableBucket()
+            bucket.departure.append(departure)
+            bucket.seq.append(seq)
+            bucket.route.append(self._route_index[route_name])
+            via.setdefault(seq, []).append((stop_name, departure))
+        self.via: dict[int, tuple[tuple[str, int], ...]] = {
+            seq: tuple(stops) for seq, stops in via.items()
+        }
+
+    def search(
+        self,
+        period: list[str] | None = None,
+        weekdays: bool | None = None,
+        route_name: list[str] | None = None,
+        route_tag: list[str] | None = None,
+        stop_name: list[str] | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[ShuttleTimetableEntry]:
+        route_ids = None
+        if route_name:
+            route_ids = {self._route_index[x] for x in route_name if x in self._route_index}
+        streams = []
+        for key, bucket in self.buckets.items():
+            bucket_period, bucket_weekdays, bucket_stop, bucket_tag = key
+            if period and bucket_period not in period:
+                continue
+            if weekdays is not None and bucket_weekdays != weekdays:
+                continue
+            if stop_name and bucket_stop not in stop_name:
+                continue
+            if route_tag and bucket_tag not in route_tag:
+                continue
+            lower = 0 if start is None else bisect_left(bucket.departure, start)
+            upper = len(bucket.departure) if end is None else bisect_right(bucket.departure, end)
+            if lower < upper:
+                streams.append(self._iterate(key, bucket, lower, upper, route_ids))
+        return list(heapq.merge(*streams, key=lambda x: (x.departure, x.seq)))
+
+    def _iterate(
+        self,
+        key: tuple[str, bool, str, str],
+        bucket: ShuttleTimetableBucket,
+        lower: int,
+        upper: int,
+        route_ids: set[int] | None,
+    ) -> Iterator[ShuttleTimetableEntry]:
+        period, is_weekdays, stop_name, route_tag = key
+        for index in range(lower, upper):
+            route_id = bucket.route[index]
+            if route_ids is not None and route_id not in route_ids:
+                continue
+            yield ShuttleTimetableEntry(
+                seq=bucket.seq[index],
+                period=period,
+                is_weekdays=is_weekdays,
+                route_name=self.routes[route_id],
+                route_tag=route_tag,
+                stop_name=stop_name,
+                departure=bucket.departure[index],
+            )
+
+
+class ShuttleDepartureEntry(NamedTuple):
+    seq: int
+    period: str
+    is_weekdays: bool
+    route_name: str
+    route_tag: str
+    stop_name: str
+    destination_group: str
+    date: datetime.date
+    departure: int  # seconds from midnight (KST)
+
+
+class CompiledShuttleDepartures:
+    """Departures of the grouped timetable keyed by (period, weekday, stop, destination group)."""
+
+    def __init__(self, rows) -> None:
+        self.routes: list[str] = []
+        self.route_tags: list[str] = []
+        self.buckets: dict[tuple[str, bool, str, str], ShuttleTimetableBucket] = {}
+        self.groups: dict[str, list[str]] = {}
+        route_index: dict[str, int] = {}
+        entries = sorted(
+            (tuple(row[:7]) + (time_to_seconds(row[7]),) for row in rows),
+            key=lambda x: (x[7], x[0]),
+        )
+        for seq, period, is_weekdays, route_name, route_tag, stop_name, group, departure in entries:
+            if route_name not in route_index:
+                route_index[route_name] = len(self.routes)
+                self.routes.append(route_name)
+                self.route_tags.append(route_tag)
+            key = (period, is_weekdays, stop_name, group)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = ShuttleTimetableBucket()
+                if group not in self.groups.setdefault(stop_name, []):
+                    self.groups[stop_name].append(group)
+            bucket.departure.append(departure)
+            bucket.seq.append(seq)
+            bucket.route.append(route_index[route_name])
+        for groups in self.groups.values():
+            groups.sort()
+
+    def next(
+        self,
+        calendar: "CompiledServiceCalendar",
+        stop_name: list[str] | None,
+        timestamp: datetime.datetime,
+        count: int,
+        days: int = 7,
+        group: str = "destination",
+    ) -> list[ShuttleDepartureEntry]:
+        # 오늘 남은 출발이 부족하면 다음 운행일의 시간표에서 이어서 찾는다.
+        remaining = {
+            (stop, destination): count
+            for stop in (stop_name if stop_name else self.groups.keys())
+            for destination in self.groups.get(stop, [])
+        }
+        result: list[ShuttleDepartureEntry] = []
+        for offset in range(days):
+            if not remaining:
+                break
+            date = timestamp.date() + datetime.timedelta(days=offset)
+            service_day = calendar.at(timestamp) if offset == 0 else calendar.get(date)
+            if service_day.period is None or service_day.day_type == "halt":
+                continue
+            is_weekdays = service_day.day_type == "weekdays"
+            start = time_to_seconds(timestamp.time()) if offset == 0 else 0
+            for (stop, destination), left in list(remaining.items()):
+                bucket = self.buckets.get((service_day.period, is_weekdays, stop, destination))
+                if bucket is None:
+                    continue
+                lower = bisect_left(bucket.departure, start)
+                upper = min(lower + left, len(bucket.departure))
+                for index in range(lower, upper):
+                    route_id = bucket.route[index]
+                    result.append(
+                        ShuttleDepartureEntry(
+                            seq=bucket.seq[index],
+                            period=service_day.period,
+                            is_weekdays=is_weekdays,
+                            route_name=self.routes[route_id],
+                            route_tag=self.route_tags[route_id],
+                            stop_name=stop,
+                            destination_group=destination,
+                            date=date,
+                            departure=bucket.departure[index],
+                        ),
+                    )
+                if upper - lower == left:
+                    del remaining[(stop, destination)]
+                else:
+                    remaining[(stop, destination)] = left - (upper - lower)
+        if group == "time":
+            # 정류장별로 행선지와 관계없이 가장 빠른 출발만 남긴다.
+            result.sort(key=lambda x: (x.stop_name, x.date, x.departure))
+            result = [
+                item
+                for _, items in groupby(result, key=lambda x: x.stop_name)
+                for item in islice(items, count)
+            ]
+        result.sort(key=lambda x: (x.stop_name, x.destination_group, x.date, x.departure))
+        return result
+
+
+class ShuttleServiceDay(NamedTuple):
+    period: str | None
+    day_type: str  # weekdays, weekends, halt
+
+
+class CompiledServiceCalendar:
+    def __init__(
+        self,
+        periods: list[tuple[datetime.datetime, datetime.datetime, str]],
+        holidays: list[tuple[datetime.date, str, str]],
+        window_start: datetime.date,
+        window_days: int,
+    ) -> None:
+        # 여러 운행 기간이 겹치는 경우 기간 종류의 역순으로 우선한다.
+        self._periods = sorted(periods, key=lambda x: x[2], reverse=True)
+        self._holidays: dict[tuple[str, datetime.date], set[str]] = {}
+        for date, holiday_type, calendar_type in holidays:
+            self._holidays.setdefault((calendar_type, date), set()).add(holiday_type)
+        self._lunar_calendar = KoreanLunarCalendar()
+        self._day_types: dict[datetime.date, str] = {}
+        for offset in range(window_days):
+            date = window_start + datetime.timedelta(days=offset)
+            self._day_types[date] = self._compute_day_type(date)
+
+    def get(self, date: datetime.date) -> ShuttleServiceDay:
+        return self.at(datetime.datetime.combine(date, datetime.time.min, tzinfo=KST))
+
+    def at(self, timestamp: datetime.datetime) -> ShuttleServiceDay:
+        # 운행 기간은 날짜가 아니라 조회 시각을 기준으로 판단한다. (기간이 하루 중간에 바뀌는 경우)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=KST)
+        date = timestamp.astimezone(KST).date()
+        period = next(
+            (period_type for start, end, period_type in self._periods if start <= timestamp <= end),
+            None,
+        )
+        # 미리 계산된 범위를 벗어난 날짜는 저장하지 않고 바로 계산한다.
+        day_type = self._day_types.get(date)
+        if day_type is None:
+            day_type = self._compute_day_type(date)
+        return ShuttleServiceDay(period=period, day_type=day_type)
+
+    def _compute_day_type(self, date: datetime.date) -> str:
+        holiday_types = set(self._holidays.get(("solar", date), set()))
+        self._lunar_calendar.setSolarDate(date.year, date.month, date.day)
+        try:
+            lunar_date = datetime.date.fromisoformat(self._lunar_calendar.LunarIsoFormat())
+            holiday_types |= self._holidays.get(("lunar", lunar_date), set())
+        except ValueError:
+            pass
+        if "halt" in holiday_types:
+            return "halt"
+        elif "weekends" in holiday_types or date in kr_holidays or date.weekday() >= 5:
+            return "weekends"
+        return "weekdays"
+
+
+async def load_timetable() -> CompiledShuttleTimetable:
+    select_query = select(
+        ShuttleTimetableView.id_,
+        ShuttleTimetableView.period,
+        ShuttleTimetableView.is_weekdays,
+        ShuttleTimetableView.route_name,
+        ShuttleTimetableView.route_tag,
+        ShuttleTimetableView.stop_name,
+        ShuttleTimetableView.departure_time,
+    )
+    return CompiledShuttleTimetable(await fetch_rows(select_query))
+
+
+async def load_departures() -> CompiledShuttleDepartures:
+    select_query = select(
+        ShuttleTimetableGroupedView.id_,
+        ShuttleTimetableGroupedView.period,
+        ShuttleTimetableGroupedView.is_weekdays,
+        ShuttleTimetableGroupedView.route_name,
+        ShuttleTimetableGroupedView.route_tag,
+        ShuttleTimetableGroupedView.stop_name,
+        ShuttleTimetableGroupedView.destination_group,
+        ShuttleTimetableGroupedView.departure_time,
+    )
+    return CompiledShuttleDepartures(await fetch_rows(select_query))
+
+
+async def load_service_calendar() -> CompiledServiceCalendar:
+    periods = await fetch_rows(select(ShuttlePeriod.start, ShuttlePeriod.end, ShuttlePeriod.type_id))
+    holidays = await fetch_rows(select(ShuttleHoliday.date, ShuttleHoliday.type_, ShuttleHoliday.calendar))
+    today = datetime.datetime.now(tz=KST).date()
+    return CompiledServiceCalendar(
+        periods=[tuple(period) for period in periods],
+        holidays=[tuple(holiday) for holiday in holidays],
+        window_start=today - datetime.timedelta(days=1),
+        window_days=settings.SHUTTLE_SERVICE_DAY_WINDOW,
+    )
+
+
+timetable_index = TTLCache(load_timetable, ttl=settings.SHUTTLE_CACHE_TTL)
+departure_index = TTLCache(load_departures, ttl=settings.SHUTTLE_CACHE_TTL)
+service_calendar = TTLCache(load_service_calendar, ttl=settings.SHUTTLE_CACHE_TTL)
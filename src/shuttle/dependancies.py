@@ -1,4 +1,11 @@
+import csv
 import datetime
+import io
+import json
+
+from fastapi import Depends, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
 
 from shuttle import service
 from shuttle.exceptions import (
@@ -11,6 +18,7 @@ from shuttle.exceptions import (
     DuplicateRouteName,
     DuplicatePeriod,
     DuplicateTimetable,
+    PeriodTypeNotFound,
 )
 from shuttle.schemas import (
     CreateShuttleHolidayRequest,
@@ -20,6 +28,8 @@ from shuttle.schemas import (
     CreateShuttleRouteStopRequest,
     CreateShuttleTimetableRequest,
 )
+from shuttle.version import shuttle_version
+from user.jwt import parse_jwt_user_data
 from utils import KST
 
 
@@ -109,7 +119,40 @@ async def create_valid_timetable(
     return new_timetable
 
 
+async def create_valid_timetable_import(request: Request) -> list[CreateShuttleTimetableRequest]:
+    body = (await request.body()).decode("utf-8-sig")
+    try:
+        if request.headers.get("content-type", "").startswith("text/csv"):
+            rows = list(csv.DictReader(io.StringIO(body)))
+        else:
+            rows = json.loads(body)
+        timetable = TypeAdapter(list[CreateShuttleTimetableRequest]).validate_python(rows)
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body", e.pos), "msg": e.msg}])
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    for period_type in {item.period_type for item in timetable}:
+        if await service.get_period_type(period_type) is None:
+            raise PeriodTypeNotFound()
+    for route_name in {item.route_name for item in timetable}:
+        if await service.get_route(route_name) is None:
+            raise RouteNotFound()
+    keys = [(item.period_type, item.is_weekdays, item.route_name, item.departure_time) for item in timetable]
+    if len(set(keys)) != len(keys):
+        raise DuplicateTimetable()
+    return timetable
+
+
 async def get_valid_timetable(seq: int) -> int:
     if await service.get_timetable(seq) is None:
         raise TimetableNotFound()
     return seq
+
+
+async def check_shuttle_version(
+    request: Request,
+    response: Response,
+    _: str = Depends(parse_jwt_user_data),
+) -> int:
+    # 인증을 통과한 요청에만 304 응답을 보낸다.
+    return await shuttle_version.check(request, response)
@@ -17,6 +17,10 @@ class PeriodNotFound(NotFound):
     DETAIL = "PERIOD_NOT_FOUND"
 
 
+class PeriodTypeNotFound(NotFound):
+    DETAIL = "PERIOD_TYPE_NOT_FOUND"
+
+
 class DuplicateRouteName(Conflict):
     DETAIL = "DUPLICATE_ROUTE_NAME"
 
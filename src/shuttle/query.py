@@ -1,27 +1,33 @@
+import asyncio
 import datetime
+from typing import Awaitable, TypeVar
 
-import holidays
 import pytz
 import strawberry
-from korean_lunar_calendar import KoreanLunarCalendar
 from pytz import timezone
-from sqlalchemy import select, and_, true, false, or_, ColumnElement, func
+from sqlalchemy import select, and_, true, false, ColumnElement, func
 from sqlalchemy.orm import load_only, selectinload, joinedload, aliased
 
-from database import fetch_one, fetch_all
+from config import settings
+from database import fetch_all
 from model.shuttle import (
-    ShuttleTimetableView,
     ShuttlePeriod,
     ShuttleHoliday,
     ShuttleStop,
     ShuttleRouteStop,
     ShuttleRoute, ShuttleTimetableGroupedView,
 )
+from shuttle.cache import (
+    ShuttleServiceDay,
+    departure_index,
+    service_calendar,
+    timetable_index,
+)
 from shuttle.exceptions import PeriodNotFound
-from utils import KST
+from shuttle.version import get_version
+from utils import KST, seconds_to_str, time_to_seconds
 
-lunar_calendar = KoreanLunarCalendar()
-kr_holidays = holidays.country_holidays("KR")
+T = TypeVar("T")
 
 
 @strawberry.type
@@ -43,7 +49,20 @@ class ShuttleTimetableQuery:
     departure_time: str = strawberry.field(name="time")
     departure_hour: int = strawberry.field(name="hour")
     departure_minute: int = strawberry.field(name="minute")
-    via: list[ShuttleViaQuery] = strawberry.field(name="via")
+    via_stops: strawberry.Private[tuple[tuple[str, int], ...]] = ()
+
+    @strawberry.field(name="via")
+    def via(self) -> list[ShuttleViaQuery]:
+        # 경유 정류장은 선택된 경우에만 미리 정렬된 목록에서 만든다.
+        return [
+            ShuttleViaQuery(
+                stop=via_stop,
+                departure_time=seconds_to_str(via_departure),
+                departure_hour=via_departure // 3600,
+                departure_minute=via_departure % 3600 // 60,
+            )
+            for via_stop, via_departure in self.via_stops
+        ]
 
 
 @strawberry.type
@@ -60,6 +79,21 @@ class ShuttleTimetableGroupedQuery:
     departure_minute: int = strawberry.field(name="minute")
 
 
+@strawberry.type
+class ShuttleNextDepartureQuery:
+    id_: int = strawberry.field(name="id")
+    period: str = strawberry.field(name="period")
+    is_weekdays: bool = strawberry.field(name="weekdays")
+    route_name: str = strawberry.field(name="route")
+    route_tag: str = strawberry.field(name="tag")
+    stop_name: str = strawberry.field(name="stop")
+    destination_group: str = strawberry.field(name="destination")
+    date: datetime.date = strawberry.field(name="date")
+    departure_time: str = strawberry.field(name="time")
+    departure_hour: int = strawberry.field(name="hour")
+    departure_minute: int = strawberry.field(name="minute")
+
+
 @strawberry.type
 class ShuttlePeriodQuery:
     start: datetime.datetime = strawberry.field(name="start")
@@ -111,12 +145,133 @@ class ShuttleStopQuery:
 
 @strawberry.type
 class ShuttleQuery:
-    period: list[ShuttlePeriodQuery] = strawberry.field(name="period")
-    holiday: list[ShuttleHolidayQuery] = strawberry.field(name="holiday")
-    stop: list[ShuttleStopQuery] = strawberry.field(name="stop")
-    route: list[ShuttleRouteQuery] = strawberry.field(name="route")
-    timetable: list[ShuttleTimetableQuery] = strawberry.field(name="timetable")
-    grouped_timetable: list[ShuttleTimetableGroupedQuery] = strawberry.field(name="groupedTimetable")
+    limiter: strawberry.Private[asyncio.Semaphore]
+    timestamp: strawberry.Private[datetime.datetime | None] = None
+    period_type: strawberry.Private[list[str] | None] = None
+    weekdays: strawberry.Private[list[bool] | None] = None
+    route_name: strawberry.Private[list[str] | None] = None
+    route_tag: strawberry.Private[list[str] | None] = None
+    route_start: strawberry.Private[list[str] | None] = None
+    route_end: strawberry.Private[list[str] | None] = None
+    stop_name: strawberry.Private[list[str] | None] = None
+    start: strawberry.Private[datetime.time | None] = None
+    end: strawberry.Private[datetime.time | None] = None
+    period_current: strawberry.Private[bool | None] = None
+    period_start: strawberry.Private[datetime.date | None] = None
+    period_end: strawberry.Private[datetime.date | None] = None
+    timestamp_str: strawberry.Private[str | None] = None
+    start_str: strawberry.Private[str | None] = None
+    end_str: strawberry.Private[str | None] = None
+    count: strawberry.Private[int] = 3
+    group: strawberry.Private[str] = "destination"
+    known_version: strawberry.Private[int | None] = None
+    current_version: strawberry.Private[int | None] = None
+
+    async def _limit(self, resolver: Awaitable[T]) -> T:
+        async with self.limiter:
+            return await resolver
+
+    def _unchanged(self) -> bool:
+        return self.known_version is not None and self.known_version == self.current_version
+
+    @strawberry.field(name="version")
+    async def version(self) -> int:
+        if self.current_version is None:
+            self.current_version = await self._limit(get_version())
+        return self.current_version
+
+    @strawberry.field(name="notModified")
+    def not_modified(self) -> bool:
+        return self._unchanged()
+
+    @strawberry.field(name="period")
+    async def period(self) -> list[ShuttlePeriodQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(
+            resolve_shuttle_period(
+                start=self.period_start,
+                end=self.period_end,
+                current=self.period_current,
+            ),
+        )
+
+    @strawberry.field(name="holiday")
+    async def holiday(self) -> list[ShuttleHolidayQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(resolve_shuttle_holiday())
+
+    @strawberry.field(name="stop")
+    async def stop(self) -> list[ShuttleStopQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(resolve_shuttle_stop(stop_name=self.stop_name))
+
+    @strawberry.field(name="route")
+    async def route(self) -> list[ShuttleRouteQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(
+            resolve_shuttle_route(
+                route_name=self.route_name,
+                route_tag=self.route_tag,
+                start_stop=self.route_start,
+                end_stop=self.route_end,
+            ),
+        )
+
+    @strawberry.field(name="timetable")
+    async def timetable(self) -> list[ShuttleTimetableQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(
+            resolve_shuttle_timetable(
+                timestamp=self.timestamp,
+                period=self.period_type,
+                weekdays=self.weekdays,
+                route_name=self.route_name,
+                route_tag=self.route_tag,
+                stop_name=self.stop_name,
+                start=self.start,
+                end=self.end,
+            ),
+        )
+
+    @strawberry.field(name="groupedTimetable")
+    async def grouped_timetable(self) -> list[ShuttleTimetableGroupedQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(
+            resolve_shuttle_grouped_timetable(
+                timestamp=self.timestamp,
+                count=self.count,
+                group=self.group,
+                period=self.period_type,
+                weekdays=self.weekdays,
+                route_name=self.route_name,
+                route_tag=self.route_tag,
+                stop_name=self.stop_name,
+                start=self.start,
+                end=self.end,
+                timestamp_str=self.timestamp_str,
+                start_str=self.start_str,
+                end_str=self.end_str,
+            ),
+        )
+
+    @strawberry.field(name="nextDepartures")
+    async def next_departures(self) -> list[ShuttleNextDepartureQuery]:
+        if self._unchanged():
+            return []
+        return await self._limit(
+            resolve_shuttle_next_departures(
+                timestamp=self.timestamp,
+                stop_name=self.stop_name,
+                count=self.count,
+                group=self.group,
+            ),
+        )
 
 
 async def resolve_shuttle(
@@ -138,57 +293,41 @@ async def resolve_shuttle(
     end_str: str | None = None,
     count: int = 3,
     group: str = "destination",
+    version: int | None = None,
 ) -> ShuttleQuery:
+    # 클라이언트가 가진 버전이 최신이면 시간표 등을 다시 보내지 않는다. (notModified)
+    current_version = await get_version() if version is not None else None
+    # 하위 필드는 선택된 경우에만 조회하며, 선택된 필드는 동시에 조회한다.
     return ShuttleQuery(
-        period=(
-            await resolve_shuttle_period(
-                start=period_start,
-                end=period_end,
-                current=period_current,
-            )
-        ),
-        holiday=(await resolve_shuttle_holiday()),
-        stop=(await resolve_shuttle_stop(stop_name=stop_name)),
-        route=(
-            await resolve_shuttle_route(
-                route_name=route_name,
-                route_tag=route_tag,
-                start_stop=route_start,
-                end_stop=route_end,
-            )
-        ),
-        timetable=(
-            await resolve_shuttle_timetable(
-                timestamp=timestamp,
-                period=period,
-                weekdays=weekdays,
-                route_name=route_name,
-                route_tag=route_tag,
-                stop_name=stop_name,
-                start=start,
-                end=end,
-            )
-        ),
-        grouped_timetable=(
-            await resolve_shuttle_grouped_timetable(
-                timestamp=timestamp,
-                count=count,
-                group=group,
-                period=period,
-                weekdays=weekdays,
-                route_name=route_name,
-                route_tag=route_tag,
-                stop_name=stop_name,
-                start=start,
-                end=end,
-                timestamp_str=timestamp_str,
-                start_str=start_str,
-                end_str=end_str,
-            )
-        )
+        limiter=asyncio.Semaphore(settings.SHUTTLE_QUERY_CONCURRENCY),
+        timestamp=timestamp,
+        period_type=period,
+        weekdays=weekdays,
+        route_name=route_name,
+        route_tag=route_tag,
+        route_start=route_start,
+        route_end=route_end,
+        stop_name=stop_name,
+        start=start,
+        end=end,
+        period_current=period_current,
+        period_start=period_start,
+        period_end=period_end,
+        timestamp_str=timestamp_str,
+        start_str=start_str,
+        end_str=end_str,
+        count=count,
+        group=group,
+        known_version=version,
+        current_version=current_version,
     )
 
 
+async def resolve_service_day(timestamp: datetime.datetime) -> ShuttleServiceDay:
+    calendar = await service_calendar.get()
+    return calendar.at(timestamp)
+
+
 async def resolve_shuttle_timetable(
     timestamp: datetime.datetime | None = datetime.datetime.now(tz=pytz.timezone("Asia/Seoul")),
     period: list[str] | None = None,
@@ -199,143 +338,47 @@ async def resolve_shuttle_timetable(
     start: datetime.time | None = None,
     end: datetime.time | None = None,
 ) -> list[ShuttleTimetableQuery]:
-    timetable_condition: list[ColumnElement[bool] | ColumnElement[bool]] = []
+    period_filter: list[str] | None = None
+    weekdays_filter: bool | None = None
+    service_day = await resolve_service_day(timestamp) if timestamp else None
     if period:
-        timetable_condition.append(ShuttleTimetableView.period.in_(period))
-    elif timestamp:
-        select_period_query = (
-            select(ShuttlePeriod)
-            .options(load_only(ShuttlePeriod.type_id))
-            .where(
-                and_(
-                    ShuttlePeriod.start <= timestamp,
-                    ShuttlePeriod.end >= timestamp,
-                ),
-            )
-            .order_by(ShuttlePeriod.type_id.desc())
-        )
-        current_period = await fetch_one(select_period_query)
-        if current_period is None:
+        period_filter = period
+    elif service_day:
+        if service_day.period is None:
             raise PeriodNotFound()
-        timetable_condition.append(
-            ShuttleTimetableView.period == current_period.type_id,
-        )
+        period_filter = [service_day.period]
     if weekdays == [True]:
-        timetable_condition.append(ShuttleTimetableView.is_weekdays.is_(true()))
+        weekdays_filter = True
     elif weekdays == [False]:
-        timetable_condition.append(ShuttleTimetableView.is_weekdays.is_(false()))
-    elif weekdays is None and timestamp:
-        lunar_calendar.setSolarDate(timestamp.year, timestamp.month, timestamp.day)
-        lunar_date = lunar_calendar.LunarIsoFormat()
-        try:
-            formatted_lunar_date = datetime.date.fromisoformat(lunar_date)
-            select_holiday_query = (
-                select(ShuttleHoliday)
-                .options(load_only(ShuttleHoliday.type_))
-                .where(
-                    or_(
-                        and_(
-                            ShuttleHoliday.date == timestamp.date(),
-                            ShuttleHoliday.calendar == "solar",
-                        ),
-                        and_(
-                            ShuttleHoliday.date == formatted_lunar_date,
-                            ShuttleHoliday.calendar == "lunar",
-                        ),
-                    ),
-                )
-            )
-        except ValueError:
-            select_holiday_query = (
-                select(ShuttleHoliday)
-                .options(load_only(ShuttleHoliday.type_))
-                .where(
-                    and_(
-                        ShuttleHoliday.date == timestamp.date(),
-                        ShuttleHoliday.calendar == "solar",
-                    ),
-                )
-            )
-
-        holiday = await fetch_one(select_holiday_query)
-        if holiday is not None:
-            if holiday.type_ == "weekends":
-                timetable_condition.append(
-                    ShuttleTimetableView.is_weekdays.is_(false()),
-                )
-            elif holiday.type_ == "halt":
-                return []
-        else:
-            if timestamp.isoformat() in kr_holidays:
-                timetable_condition.append(
-                    ShuttleTimetableView.is_weekdays.is_(false()))
-            elif timestamp.weekday() >= 5:
-                timetable_condition.append(ShuttleTimetableView.is_weekdays.is_(false()))
-            else:
-                timetable_condition.append(ShuttleTimetableView.is_weekdays.is_(true()))
-    if route_name:
-        timetable_condition.append(ShuttleTimetableView.route_name.in_(route_name))
-    if route_tag:
-        timetable_condition.append(ShuttleTimetableView.route_tag.in_(route_tag))
-    if stop_name:
-        timetable_condition.append(ShuttleTimetableView.stop_name.in_(stop_name))
-    if start:
-        timetable_condition.append(
-            ShuttleTimetableView.departure_time >= start.replace(
-                tzinfo=KST,
-            ),
-        )
-    if end:
-        timetable_condition.append(
-            ShuttleTimetableView.departure_time <= end.replace(
-                tzinfo=KST,
-            ),
-        )
-    select_query = (
-        select(ShuttleTimetableView)
-        .options(
-            load_only(
-                ShuttleTimetableView.id_,
-                ShuttleTimetableView.period,
-                ShuttleTimetableView.is_weekdays,
-                ShuttleTimetableView.route_name,
-                ShuttleTimetableView.route_tag,
-                ShuttleTimetableView.stop_name,
-                ShuttleTimetableView.departure_time,
-            ),
-            selectinload(ShuttleTimetableView.via).options(
-                load_only(
-                    ShuttleTimetableView.stop_name,
-                    ShuttleTimetableView.departure_time,
-                ),
-            ),
-        )
-        .where(and_(*timetable_condition))
-        .order_by(ShuttleTimetableView.departure_time)
+        weekdays_filter = False
+    elif weekdays is None and service_day:
+        if service_day.day_type == "halt":
+            return []
+        weekdays_filter = service_day.day_type == "weekdays"
+    timetable = await timetable_index.get()
+    timetable_list = timetable.search(
+        period=period_filter,
+        weekdays=weekdays_filter,
+        route_name=route_name,
+        route_tag=route_tag,
+        stop_name=stop_name,
+        start=time_to_seconds(start) if start else None,
+        end=time_to_seconds(end) if end else None,
     )
-    timetable_list = await fetch_all(select_query)
     return [
         ShuttleTimetableQuery(
-            id_=timetable.id_,
-            period=timetable.period,
-            is_weekdays=timetable.is_weekdays,
-            route_name=timetable.route_name,
-            route_tag=timetable.route_tag,
-            stop_name=timetable.stop_name,
-            departure_time=timetable.departure_time.strftime("%H:%M:%S"),
-            departure_hour=timetable.departure_time.hour,
-            departure_minute=timetable.departure_time.minute,
-            via=[
-                ShuttleViaQuery(
-                    stop=via.stop_name,
-                    departure_time=via.departure_time.strftime("%H:%M:%S"),
-                    departure_hour=via.departure_time.hour,
-                    departure_minute=via.departure_time.minute
-                )
-                for via in sorted(timetable.via, key=lambda x: x.departure_time)
-            ],
+            id_=item.seq,
+            period=item.period,
+            is_weekdays=item.is_weekdays,
+            route_name=item.route_name,
+            route_tag=item.route_tag,
+            stop_name=item.stop_name,
+            departure_time=seconds_to_str(item.departure),
+            departure_hour=item.departure // 3600,
+            departure_minute=item.departure % 3600 // 60,
+            via_stops=timetable.via[item.seq],
         )
-        for timetable in timetable_list
+        for item in timetable_list
     ]
 
 
@@ -361,79 +404,25 @@ async def resolve_shuttle_grouped_timetable(
         timestamp_value = datetime.datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
     else:
         timestamp_value = None
+    service_day = await resolve_service_day(timestamp_value) if timestamp_value else None
     if period:
         timetable_condition.append(ShuttleTimetableGroupedView.period.in_(period))
-    elif timestamp_value:
-        select_period_query = (
-            select(ShuttlePeriod)
-            .options(load_only(ShuttlePeriod.type_id))
-            .where(
-                and_(
-                    ShuttlePeriod.start <= timestamp_value,
-                    ShuttlePeriod.end >= timestamp_value,
-                ),
-            )
-            .order_by(ShuttlePeriod.type_id.desc())
-        )
-        current_period = await fetch_one(select_period_query)
-        if current_period is None:
+    elif service_day:
+        if service_day.period is None:
             raise PeriodNotFound()
         timetable_condition.append(
-            ShuttleTimetableGroupedView.period == current_period.type_id,
+            ShuttleTimetableGroupedView.period == service_day.period,
         )
     if weekdays == [True]:
         timetable_condition.append(ShuttleTimetableGroupedView.is_weekdays.is_(true()))
     elif weekdays == [False]:
         timetable_condition.append(ShuttleTimetableGroupedView.is_weekdays.is_(false()))
-    elif weekdays is None and timestamp_value:
-        lunar_calendar.setSolarDate(timestamp_value.year, timestamp_value.month, timestamp_value.day)
-        lunar_date = lunar_calendar.LunarIsoFormat()
-        try:
-            formatted_lunar_date = datetime.date.fromisoformat(lunar_date)
-            select_holiday_query = (
-                select(ShuttleHoliday)
-                .options(load_only(ShuttleHoliday.type_))
-                .where(
-                    or_(
-                        and_(
-                            ShuttleHoliday.date == timestamp_value.date(),
-                            ShuttleHoliday.calendar == "solar",
-                        ),
-                        and_(
-                            ShuttleHoliday.date == formatted_lunar_date,
-                            ShuttleHoliday.calendar == "lunar",
-                        ),
-                    ),
-                )
-            )
-        except ValueError:
-            select_holiday_query = (
-                select(ShuttleHoliday)
-                .options(load_only(ShuttleHoliday.type_))
-                .where(
-                    and_(
-                        ShuttleHoliday.date == timestamp_value.date(),
-                        ShuttleHoliday.calendar == "solar",
-                    ),
-                )
-            )
-
-        holiday = await fetch_one(select_holiday_query)
-        if holiday is not None:
-            if holiday.type_ == "weekends":
-                timetable_condition.append(
-                    ShuttleTimetableGroupedView.is_weekdays.is_(false()),
-                )
-            elif holiday.type_ == "halt":
-                return []
-        else:
-            if timestamp_value.isoformat() in kr_holidays:
-                timetable_condition.append(
-                    ShuttleTimetableGroupedView.is_weekdays.is_(false()))
-            elif timestamp_value.weekday() >= 5:
-                timetable_condition.append(ShuttleTimetableGroupedView.is_weekdays.is_(false()))
-            else:
-                timetable_condition.append(ShuttleTimetableGroupedView.is_weekdays.is_(true()))
+    elif weekdays is None and service_day:
+        if service_day.day_type == "halt":
+            return []
+        timetable_condition.append(
+            ShuttleTimetableGroupedView.is_weekdays.is_(service_day.day_type == "weekdays"),
+        )
     if route_name:
         timetable_condition.append(ShuttleTimetableGroupedView.route_name.in_(route_name))
     if route_tag:
@@ -537,6 +526,36 @@ async def resolve_shuttle_grouped_timetable(
     ]
 
 
+async def resolve_shuttle_next_departures(
+    timestamp: datetime.datetime | None = None,
+    stop_name: list[str] | None = None,
+    count: int = 3,
+    group: str = "destination",
+) -> list[ShuttleNextDepartureQuery]:
+    if timestamp is None:
+        timestamp = datetime.datetime.now(tz=KST)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=KST)
+    calendar = await service_calendar.get()
+    departures = await departure_index.get()
+    return [
+        ShuttleNextDepartureQuery(
+            id_=item.seq,
+            period=item.period,
+            is_weekdays=item.is_weekdays,
+            route_name=item.route_name,
+            route_tag=item.route_tag,
+            stop_name=item.stop_name,
+            destination_group=item.destination_group,
+            date=item.date,
+            departure_time=seconds_to_str(item.departure),
+            departure_hour=item.departure // 3600,
+            departure_minute=item.departure % 3600 // 60,
+        )
+        for item in departures.next(calendar, stop_name, timestamp.astimezone(KST), count, group=group)
+    ]
+
+
 async def resolve_shuttle_period(
     start: datetime.date | None = None,
     end: datetime.date | None = None,
@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from sqlalchemy import text
+
+from config import settings
+from database import engine
+from shuttle.cache import departure_index, timetable_index
+from shuttle.version import bump_version
+from utils import KST
+
+logger = logging.getLogger(__name__)
+SHUTTLE_VIEWS = ("shuttle_timetable_view", "shuttle_timetable_grouped_view")
+
+
+class ShuttleViewRefresher:
+    """Refreshes the shuttle materialized views after timetable writes.
+
+    Writes only mark the views dirty; a single background task waits
+    ``delay`` seconds so that a burst of edits results in one refresh.
+    ``REFRESH ... CONCURRENTLY`` keeps the views readable while they are rebuilt.
+    """
+
+    def __init__(self, delay: float) -> None:
+        self._delay = delay
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+        self.refreshed_at: datetime.datetime | None = None
+        self.duration: float | None = None
+
+    @property
+    def pending(self) -> bool:
+        return self._dirty or self._lock.locked()
+
+    def schedule(self) -> None:
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> None:
+        if self._task is not None:
+            await self._task
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            started = time.monotonic()
+            async with engine.begin() as conn:
+                for view in SHUTTLE_VIEWS:
+                    await conn.execute(text(f"refresh materialized view concurrently {view}"))
+            self.duration = time.monotonic() - started
+            self.refreshed_at = datetime.datetime.now(tz=KST)
+        # 시간표 인덱스는 뷰를 기준으로 만들어지므로 갱신이 끝난 뒤에 무효화한다.
+        timetable_index.invalidate()
+        departure_index.invalidate()
+        # 갱신된 뷰를 다시 받을 수 있도록 버전을 올린다.
+        await bump_version()
+
+    async def _run(self) -> None:
+        # 대기 중 또는 갱신 중에 들어온 변경은 다음 갱신에 함께 반영한다.
+        while self._dirty:
+            await asyncio.sleep(self._delay)
+            self._dirty = False
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh shuttle timetable views")
+                self._dirty = True
+
+
+view_refresher = ShuttleViewRefresher(delay=settings.SHUTTLE_VIEW_REFRESH_DELAY)
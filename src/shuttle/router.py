@@ -1,7 +1,7 @@
 import datetime
 from typing import Callable, Any
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
 from exceptions import DetailedHTTPException
@@ -15,12 +15,16 @@ from model.shuttle import (
     ShuttleHoliday,
 )
 from shuttle import service
+from shuttle.cache import ShuttleDepartureEntry
+from shuttle.refresh import view_refresher
 from shuttle.dependancies import (
+    check_shuttle_version,
     create_valid_route,
     get_valid_route,
     create_valid_stop,
     get_valid_stop,
     create_valid_timetable,
+    create_valid_timetable_import,
     create_valid_period,
     create_valid_holiday,
     get_valid_timetable,
@@ -47,6 +51,9 @@ from shuttle.schemas import (
     ShuttleTimetableItemResponse,
     CreateShuttleTimetableRequest,
     UpdateShuttleTimetableRequest,
+    ShuttleTimetableImportResponse,
+    ShuttleTimetableViewStatusResponse,
+    ShuttleNextDepartureListResponse,
     ShuttleTimetableViewResponse,
     ShuttlePeriodListResponse,
     ShuttlePeriodItemResponse,
@@ -60,7 +67,7 @@ from shuttle.schemas import (
     UpdateShuttleRouteStopRequest,
 )
 from user.jwt import parse_jwt_user_data
-from utils import timestamp_tz_to_datetime
+from utils import KST, seconds_to_str, timestamp_tz_to_datetime
 
 router = APIRouter()
 
@@ -392,6 +399,31 @@ async def update_stop(
     }
 
 
+@router.get("/stop/{stop_name}/departure", response_model=ShuttleNextDepartureListResponse)
+async def get_stop_next_departure(
+    stop_name: str = Depends(get_valid_stop),
+    _: str = Depends(parse_jwt_user_data),
+    count: int = Query(3, ge=1, le=20),
+    timestamp: datetime.datetime | None = None,
+):
+    if timestamp is None:
+        timestamp = datetime.datetime.now(tz=KST)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=KST)
+    data = await service.list_next_departures(stop_name, timestamp, count)
+    mapping_func: Callable[[ShuttleDepartureEntry], dict[str, Any]] = lambda x: {
+        "sequence": x.seq,
+        "route": x.route_name,
+        "tag": x.route_tag,
+        "period": x.period,
+        "weekdays": x.is_weekdays,
+        "destination": x.destination_group,
+        "date": x.date,
+        "time": seconds_to_str(x.departure),
+    }
+    return {"data": map(mapping_func, data)}
+
+
 @router.delete("/stop/{stop_name}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_stop(
     stop_name: str = Depends(get_valid_stop),
@@ -509,7 +541,11 @@ async def delete_route_stop(
     await service.delete_route_stop(route_name, stop_name)
 
 
-@router.get("/timetable", response_model=ShuttleTimetableListResponse)
+@router.get(
+    "/timetable",
+    response_model=ShuttleTimetableListResponse,
+    dependencies=[Depends(check_shuttle_version)],
+)
 async def get_timetable_list(
     _: str = Depends(parse_jwt_user_data),
     route: str | None = None,
@@ -557,6 +593,24 @@ async def create_timetable(
     }
 
 
+@router.post(
+    "/timetable/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=ShuttleTimetableImportResponse,
+)
+async def import_timetable(
+    timetable: list[CreateShuttleTimetableRequest] = Depends(create_valid_timetable_import),
+    _: str = Depends(parse_jwt_user_data),
+):
+    # 요청에 포함된 운행 기간의 시간표 전체를 교체한다. (JSON 또는 CSV)
+    period_types, deleted, inserted = await service.import_timetable(timetable)
+    return {
+        "period": period_types,
+        "deleted": deleted,
+        "inserted": inserted,
+    }
+
+
 @router.get(
     "/timetable/{seq}",
     response_model=ShuttleTimetableItemResponse,
@@ -606,7 +660,11 @@ async def delete_timetable(
     await service.delete_timetable(seq)
 
 
-@router.get("/timetable-view", response_model=ShuttleTimetableViewResponse)
+@router.get(
+    "/timetable-view",
+    response_model=ShuttleTimetableViewResponse,
+    dependencies=[Depends(check_shuttle_version)],
+)
 async def get_timetable_view(
     _: str = Depends(parse_jwt_user_data),
     route: str | None = None,
@@ -634,3 +692,30 @@ async def get_timetable_view(
         "time": timestamp_tz_to_datetime(x.departure_time),
     }
     return {"data": map(mapping_func, data)}
+
+
+@router.get("/timetable-view/status", response_model=ShuttleTimetableViewStatusResponse)
+async def get_timetable_view_status(
+    _: str = Depends(parse_jwt_user_data),
+):
+    return {
+        "refreshedAt": view_refresher.refreshed_at,
+        "duration": view_refresher.duration,
+        "pending": view_refresher.pending,
+    }
+
+
+@router.post(
+    "/timetable-view/refresh",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=ShuttleTimetableViewStatusResponse,
+)
+async def refresh_timetable_view(
+    _: str = Depends(parse_jwt_user_data),
+):
+    view_refresher.schedule()
+    return {
+        "refreshedAt": view_refresher.refreshed_at,
+        "duration": view_refresher.duration,
+        "pending": view_refresher.pending,
+    }
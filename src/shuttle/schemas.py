@@ -181,6 +181,33 @@ class UpdateShuttleTimetableRequest(BaseModel):
         }
 
 
+class ShuttleNextDepartureItemResponse(BaseModel):
+    sequence: Annotated[int, Field(alias="sequence", ge=1)]
+    route_name: Annotated[str, Field(max_length=15, alias="route")]
+    route_tag: Annotated[str, Field(max_length=10, alias="tag")]
+    period_type: Annotated[str, Field(alias="period", max_length=20)]
+    is_weekdays: Annotated[bool, Field(alias="weekdays")]
+    destination_group: Annotated[str, Field(alias="destination")]
+    date: Annotated[datetime.date, Field(alias="date")]
+    departure_time: Annotated[str, Field(alias="time")]
+
+
+class ShuttleNextDepartureListResponse(BaseModel):
+    data: Annotated[list["ShuttleNextDepartureItemResponse"], Field(alias="data")]
+
+
+class ShuttleTimetableViewStatusResponse(BaseModel):
+    refreshed_at: Annotated[Optional[datetime.datetime], Field(alias="refreshedAt")]
+    duration: Annotated[Optional[float], Field(alias="duration", ge=0)]
+    pending: Annotated[bool, Field(alias="pending")]
+
+
+class ShuttleTimetableImportResponse(BaseModel):
+    period_type: Annotated[list[str], Field(alias="period")]
+    deleted: Annotated[int, Field(alias="deleted", ge=0)]
+    inserted: Annotated[int, Field(alias="inserted", ge=0)]
+
+
 class ShuttleHolidayItemResponse(BaseModel):
     date: Annotated[datetime.date, Field(alias="date")]
     type_: Annotated[str, Field(alias="type", pattern=r"^(weekends|halt)$")]
@@ -1,17 +1,21 @@
 import datetime
 
 from sqlalchemy import select, insert, delete, update, true
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import fetch_one, fetch_all, execute_query
+from database import engine, fetch_one, fetch_all, execute_query
 from model.shuttle import (
     ShuttleHoliday,
     ShuttlePeriod,
+    ShuttlePeriodType,
     ShuttleRoute,
     ShuttleStop,
     ShuttleRouteStop,
     ShuttleTimetable,
     ShuttleTimetableView,
 )
+from shuttle.cache import ShuttleDepartureEntry, departure_index, service_calendar
+from shuttle.refresh import view_refresher
 from shuttle.schemas import (
     CreateShuttleHolidayRequest,
     CreateShuttlePeriodRequest,
@@ -24,6 +28,7 @@ from shuttle.schemas import (
     UpdateShuttleTimetableRequest,
     UpdateShuttleStopRequest,
 )
+from shuttle.version import bump_version
 from utils import KST, second_to_timedelta
 
 
@@ -74,6 +79,8 @@ async def create_holiday(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
+    service_calendar.invalidate()
     select_query = select(ShuttleHoliday).where(
         ShuttleHoliday.calendar == new_holiday.calendar,
         ShuttleHoliday.date == new_holiday.date,
@@ -87,6 +94,8 @@ async def delete_holiday(calendar_type: str, date: datetime.date) -> None:
         ShuttleHoliday.date == date,
     )
     await execute_query(delete_query)
+    await bump_version()
+    service_calendar.invalidate()
 
 
 async def list_period() -> list[ShuttlePeriod]:
@@ -109,6 +118,11 @@ async def list_period_filter(
     return await fetch_all(select_query)
 
 
+async def get_period_type(period_type: str) -> ShuttlePeriodType | None:
+    select_query = select(ShuttlePeriodType).where(ShuttlePeriodType.type_ == period_type)
+    return await fetch_one(select_query)
+
+
 async def get_period(
     period_type: str,
     start: datetime.datetime,
@@ -142,6 +156,8 @@ async def create_period(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
+    service_calendar.invalidate()
     select_query = select(ShuttlePeriod).where(
         ShuttlePeriod.type_id == new_period.type_,
         ShuttlePeriod.start == datetime.datetime.strptime(
@@ -175,6 +191,8 @@ async def delete_period(
         ShuttlePeriod.end == end_datetime,
     )
     await execute_query(delete_query)
+    await bump_version()
+    service_calendar.invalidate()
 
 
 async def list_route() -> list[ShuttleRoute]:
@@ -218,6 +236,8 @@ async def create_route(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleRoute).where(ShuttleRoute.name == new_route.name)
     return await fetch_one(select_query)
 
@@ -243,6 +263,8 @@ async def update_route(
         .values(payload)
     )
     await execute_query(update_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleRoute).where(ShuttleRoute.name == route_name)
     return await fetch_one(select_query)
 
@@ -250,6 +272,8 @@ async def update_route(
 async def delete_route(route_name: str) -> None:
     delete_query = delete(ShuttleRoute).where(ShuttleRoute.name == route_name)
     await execute_query(delete_query)
+    await bump_version()
+    view_refresher.schedule()
 
 
 async def list_stop() -> list[ShuttleStop]:
@@ -269,6 +293,16 @@ async def get_stop(stop_name: str) -> ShuttleStop | None:
     return await fetch_one(select_query)
 
 
+async def list_next_departures(
+    stop_name: str,
+    timestamp: datetime.datetime,
+    count: int,
+) -> list[ShuttleDepartureEntry]:
+    calendar = await service_calendar.get()
+    departures = await departure_index.get()
+    return departures.next(calendar, [stop_name], timestamp.astimezone(KST), count)
+
+
 async def create_stop(
     new_stop: CreateShuttleStopRequest,
 ) -> ShuttleStop | None:
@@ -283,6 +317,7 @@ async def create_stop(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
     select_query = select(ShuttleStop).where(ShuttleStop.name == new_stop.name)
     return await fetch_one(select_query)
 
@@ -302,6 +337,7 @@ async def update_stop(
         )
     )
     await execute_query(update_query)
+    await bump_version()
     select_query = select(ShuttleStop).where(ShuttleStop.name == stop_name)
     return await fetch_one(select_query)
 
@@ -309,6 +345,7 @@ async def update_stop(
 async def delete_stop(stop_name: str) -> None:
     delete_query = delete(ShuttleStop).where(ShuttleStop.name == stop_name)
     await execute_query(delete_query)
+    await bump_version()
 
 
 async def list_route_stop() -> list[ShuttleRouteStop]:
@@ -351,6 +388,8 @@ async def create_route_stop(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleRouteStop).where(
         ShuttleRouteStop.route_name == route_name,
         ShuttleRouteStop.stop_name == new_route_stop.stop_name,
@@ -377,6 +416,8 @@ async def update_route_stop(
         .values(payload)
     )
     await execute_query(update_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleRouteStop).where(
         ShuttleRouteStop.route_name == route_name,
         ShuttleRouteStop.stop_name == stop_name,
@@ -393,6 +434,8 @@ async def delete_route_stop(
         ShuttleRouteStop.stop_name == stop_name,
     )
     await execute_query(delete_query)
+    await bump_version()
+    view_refresher.schedule()
 
 
 async def list_timetable() -> list[ShuttleTimetable]:
@@ -462,6 +505,8 @@ async def create_timetable(
         )
     )
     await execute_query(insert_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleTimetable).where(
         ShuttleTimetable.route_name == new_timetable.route_name,
         ShuttleTimetable.period == new_timetable.period_type,
@@ -494,6 +539,8 @@ async def update_timetable(
         .values(payload)
     )
     await execute_query(update_query)
+    await bump_version()
+    view_refresher.schedule()
     select_query = select(ShuttleTimetable).where(ShuttleTimetable.id_ == seq)
     return await fetch_one(select_query)
 
@@ -501,6 +548,35 @@ async def update_timetable(
 async def delete_timetable(seq: int) -> None:
     delete_query = delete(ShuttleTimetable).where(ShuttleTimetable.id_ == seq)
     await execute_query(delete_query)
+    await bump_version()
+    view_refresher.schedule()
+
+
+async def import_timetable(
+    timetable: list[CreateShuttleTimetableRequest],
+) -> tuple[list[str], int, int]:
+    period_types = sorted({item.period_type for item in timetable})
+    async with AsyncSession(engine) as session:
+        async with session.begin():
+            delete_result = await session.execute(
+                delete(ShuttleTimetable).where(ShuttleTimetable.period.in_(period_types)),
+            )
+            if timetable:
+                await session.execute(
+                    insert(ShuttleTimetable),
+                    [
+                        {
+                            "period": item.period_type,
+                            "is_weekdays": item.is_weekdays,
+                            "route_name": item.route_name,
+                            "departure_time": item.departure_time.replace(tzinfo=KST),
+                        }
+                        for item in timetable
+                    ],
+                )
+    await bump_version()
+    await view_refresher.refresh()
+    return period_types, delete_result.rowcount, len(timetable)
 
 
 async def list_timetable_view() -> list[ShuttleTimetableView]:
@@ -0,0 +1,6 @@
+from model.shuttle import ShuttleVersion
+from version import DatasetVersion
+
+shuttle_version = DatasetVersion(ShuttleVersion, etag_prefix="shuttle")
+get_version = shuttle_version.get
+bump_version = shuttle_version.bump
@@ -0,0 +1,110 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import select
+
+from cache import TTLCache
+from config import settings
+from database import fetch_rows
+from model.subway import SubwayRouteStation, SubwayTimetable
+from utils import time_to_seconds
+
+
+class SubwayTimetableEntry(NamedTuple):
+    weekday: str
+    departure: int  # seconds from midnight (KST)
+    start_station_id: str
+    start_station_name: str
+    terminal_station_id: str
+    terminal_station_name: str
+
+
+class SubwayTimetableBucket:
+    """Departures of a single (station, heading, weekday) key, sorted by departure time."""
+
+    __slots__ = ("departure", "start", "terminal")
+
+    def __init__(self) -> None:
+        self.departure = array("I")
+        self.start = array("H")
+        self.terminal = array("H")
+
+
+class CompiledSubwayTimetable:
+    def __init__(self, stations, rows) -> None:
+        # 출발역과 종착역은 역 목록의 인덱스로만 저장한다.
+        self.stations: list[tuple[str, str]] = [tuple(row) for row in stations]
+        station_index = {station_id: index for index, (station_id, _) in enumerate(self.stations)}
+        self.buckets: dict[tuple[str, str, str], SubwayTimetableBucket] = {}
+        self.weekdays: dict[tuple[str, str], list[str]] = {}
+        entries = sorted(
+            (tuple(row[:3]) + (time_to_seconds(row[3]),) + tuple(row[4:]) for row in rows),
+            key=lambda x: x[3],
+        )
+        for station_id, heading, weekday, departure, start_station_id, terminal_station_id in entries:
+            key = (station_id, heading, weekday)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = SubwayTimetableBucket()
+                self.weekdays.setdefault((station_id, heading), []).append(weekday)
+            bucket.departure.append(departure)
+            bucket.start.append(station_index[start_station_id])
+            bucket.terminal.append(station_index[terminal_station_id])
+
+    def search(
+        self,
+        station_id: str,
+        heading: str,
+        weekdays: bool | None = None,
+        start: int | None = None,
+        end: int | None = None,
+    ) -> list[SubwayTimetableEntry]:
+        streams = []
+        for weekday in self.weekdays.get((station_id, heading), []):
+            if weekdays is not None and (weekday == "weekdays") != weekdays:
+                continue
+            bucket = self.buckets[(station_id, heading, weekday)]
+            lower = 0 if start is None else bisect_left(bucket.departure, start)
+            upper = len(bucket.departure) if end is None else bisect_right(bucket.departure, end)
+            if lower < upper:
+                streams.append(self._iterate(weekday, bucket, lower, upper))
+        return list(heapq.merge(*streams, key=lambda x: x.departure))
+
+    def _iterate(
+        self,
+        weekday: str,
+        bucket: SubwayTimetableBucket,
+        lower: int,
+        upper: int,
+    ) -> Iterator[SubwayTimetableEntry]:
+        for index in range(lower, upper):
+            start_station_id, start_station_name = self.stations[bucket.start[index]]
+            terminal_station_id, terminal_station_name = self.stations[bucket.terminal[index]]
+            yield SubwayTimetableEntry(
+                weekday=weekday,
+                departure=bucket.departure[index],
+                start_station_id=start_station_id,
+                start_station_name=start_station_name,
+                terminal_station_id=terminal_station_id,
+                terminal_station_name=terminal_station_name,
+            )
+
+
+async def load_timetable() -> CompiledSubwayTimetable:
+    stations = await fetch_rows(select(SubwayRouteStation.id_, SubwayRouteStation.name))
+    rows = await fetch_rows(
+        select(
+            SubwayTimetable.station_id,
+            SubwayTimetable.heading,
+            SubwayTimetable.is_weekdays,
+            SubwayTimetable.departure_time,
+            SubwayTimetable.start_station_id,
+            SubwayTimetable.terminal_station_id,
+        ),
+    )
+    return CompiledSubwayTimetable(stations, rows)
+
+
+subway_timetable = TTLCache(load_timetable, ttl=settings.SUBWAY_TIMETABLE_CACHE_TTL)
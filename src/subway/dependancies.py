@@ -1,3 +1,7 @@
+from typing import Annotated
+
+from fastapi import Depends, Query, Request, Response
+
 from subway import service
 from subway.exceptions import (
     DuplicateStationName,
@@ -7,13 +11,17 @@ from subway.exceptions import (
     DuplicateStationID,
     StationNotFound,
     DuplicateTimetable,
+    DuplicateRealtime,
 )
 from subway.schemas import (
     CreateSubwayStation,
     CreateSubwayRoute,
     CreateSubwayRouteStation,
     CreateSubwayTimetable,
+    SubwayRealtimeIngestRequest,
 )
+from subway.version import realtime_version
+from user.jwt import parse_jwt_user_data
 from utils import KST
 
 
@@ -80,3 +88,42 @@ async def create_valid_timetable(
         raise DuplicateTimetable()
 
     return new_timetable
+
+
+async def create_valid_realtime_snapshot(
+    snapshot: SubwayRealtimeIngestRequest,
+) -> SubwayRealtimeIngestRequest:
+    keys = [
+        (item.station_id, arrival.heading, arrival.sequence)
+        for item in snapshot.data
+        for arrival in item.arrivals
+    ]
+    if len(keys) != len(set(keys)):
+        raise DuplicateRealtime()
+    if snapshot.route_id is not None and await service.get_route(snapshot.route_id) is None:
+        raise RouteNotFound()
+    station_ids = {item.station_id for item in snapshot.data}
+    station_ids |= {arrival.terminal_station_id for item in snapshot.data for arrival in item.arrivals}
+    stations = await service.list_route_station_ids(station_ids)
+    if stations.keys() != station_ids:
+        raise StationNotFound()
+    # 노선 단위 교체에서는 해당 노선의 역만 받는다.
+    if snapshot.route_id is not None and any(stations[item.station_id] != snapshot.route_id for item in snapshot.data):
+        raise StationNotFound()
+    return snapshot
+
+
+async def check_realtime_version(
+    request: Request,
+    response: Response,
+    _: str = Depends(parse_jwt_user_data),
+) -> int:
+    # 인증을 통과한 요청에만 304 응답을 보낸다.
+    return await realtime_version.check(request, response)
+
+
+async def get_valid_stream_stations(station_id: Annotated[list[str], Query()]) -> set[str]:
+    station_ids = set(station_id)
+    if (await service.list_route_station_ids(station_ids)).keys() != station_ids:
+        raise StationNotFound()
+    return station_ids
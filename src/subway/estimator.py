@@ -0,0 +1,200 @@
+import datetime
+from typing import NamedTuple
+
+import holidays
+from sqlalchemy import select
+
+from cache import TTLCache
+from config import settings
+from database import fetch_rows
+from model.subway import SubwayRealtime, SubwayRouteStation
+from subway.cache import CompiledSubwayTimetable
+from utils import KST, time_to_seconds
+
+kr_holidays = holidays.country_holidays("KR")
+TIMETABLE_HEADING = {"true": "up", "false": "down"}  # 실시간 정보와 시간표의 방면 표기
+
+
+class SubwayStationNode(NamedTuple):
+    route_id: int
+    name: str
+    sequence: int
+    cumulative: float  # seconds
+
+
+class SubwayTrainPosition(NamedTuple):
+    station_id: str
+    heading: str
+    arrival: datetime.datetime  # 마지막으로 알려진 해당 역 도착 예정 시각
+    location: str
+    stop: int
+    train_number: str
+    terminal_station_id: str
+    is_express: bool
+    is_last: bool
+    status: int
+
+
+class SubwayEstimate(NamedTuple):
+    sequence: int
+    location: str
+    stop: int
+    arrival: datetime.datetime
+    train_number: str
+    terminal_station_id: str
+    terminal_station_name: str
+    is_express: bool
+    is_last: bool
+    status: int
+
+
+def is_weekdays(date: datetime.date) -> bool:
+    return date not in kr_holidays and date.weekday() < 5
+
+
+class SubwayArrivalModel:
+    """Last known train positions and station offsets used to estimate arrivals during feed outages.
+
+    Trains are extrapolated along the line with ``cumulative_time``; departures
+    from the timetable fill in after the last extrapolated train.
+    """
+
+    def __init__(self, stations, realtime) -> None:
+        self.stations: dict[str, SubwayStationNode] = {
+            station_id: SubwayStationNode(route_id, name, sequence, cumulative.total_seconds())
+            for station_id, route_id, name, sequence, cumulative in stations
+        }
+        self.trains: dict[tuple[int, str], list[SubwayTrainPosition]] = {}
+        for row in realtime:
+            station = self.stations.get(row.station_id)
+            if station is None:
+                continue
+            self.trains.setdefault((station.route_id, row.heading), []).append(
+                SubwayTrainPosition(
+                    station_id=row.station_id,
+                    heading=row.heading,
+                    arrival=row.updated_at + row.time,
+                    location=row.location,
+                    stop=row.stop,
+                    train_number=row.train_number,
+                    terminal_station_id=row.terminal_station_id,
+                    is_express=row.is_express,
+                    is_last=row.is_last,
+                    status=row.status,
+                ),
+            )
+
+    def extrapolate(
+        self,
+        station_id: str,
+        heading: str,
+        now: datetime.datetime,
+    ) -> list[SubwayEstimate]:
+        target = self.stations.get(station_id)
+        if target is None:
+            return []
+        max_age = datetime.timedelta(seconds=settings.SUBWAY_ESTIMATE_MAX_AGE)
+        nearest: dict[str, tuple[float, SubwayTrainPosition]] = {}
+        for position in self.trains.get((target.route_id, heading), []):
+            source, terminal = self.stations[position.station_id], self.stations.get(position.terminal_station_id)
+            if terminal is None or terminal.cumulative == source.cumulative or position.arrival < now - max_age:
+                continue
+            # 종착역 방향으로 출발역과 종착역 사이에 있는 역만 지나간다.
+            direction = 1 if terminal.cumulative > source.cumulative else -1
+            offset = (target.cumulative - source.cumulative) * direction
+            if offset < 0 or (terminal.cumulative - target.cumulative) * direction < 0:
+                continue
+            # 같은 열차가 여러 역에서 보이면 가장 가까운 역의 정보를 쓴다.
+            if position.train_number not in nearest or offset < nearest[position.train_number][0]:
+                nearest[position.train_number] = (offset, position)
+        estimates = []
+        for offset, position in nearest.values():
+            arrival = position.arrival + datetime.timedelta(seconds=offset)
+            if arrival < now:
+                continue
+            source = self.stations[position.station_id]
+            estimates.append(
+                SubwayEstimate(
+                    sequence=0,
+                    location=position.location,
+                    stop=position.stop + abs(target.sequence - source.sequence),
+                    arrival=arrival,
+                    train_number=position.train_number,
+                    terminal_station_id=position.terminal_station_id,
+                    terminal_station_name=self.stations[position.terminal_station_id].name,
+                    is_express=position.is_express,
+                    is_last=position.is_last,
+                    status=position.status,
+                ),
+            )
+        return sorted(estimates, key=lambda x: x.arrival)
+
+    def estimate(
+        self,
+        timetable: CompiledSubwayTimetable,
+        station_id: str,
+        heading: str,
+        now: datetime.datetime,
+        count: int,
+    ) -> list[SubwayEstimate]:
+        estimates = self.extrapolate(station_id, heading, now)[:count]
+        target = self.stations.get(station_id)
+        now = now.astimezone(KST)
+        start = (now if not estimates else estimates[-1].arrival + datetime.timedelta(minutes=1)).astimezone(KST)
+        # 시간표는 오늘 남은 출발만 이어 붙인다.
+        if target is not None and len(estimates) < count and start.date() == now.date():
+            midnight = datetime.datetime.combine(now.date(), datetime.time.min, tzinfo=KST)
+            departures = timetable.search(
+                station_id,
+                TIMETABLE_HEADING.get(heading, heading),
+                weekdays=is_weekdays(now.date()),
+                start=time_to_seconds(start.time()),
+            )
+            for departure in departures[:count - len(estimates)]:
+                origin = self.stations.get(departure.start_station_id)
+                estimates.append(
+                    SubwayEstimate(
+                        sequence=0,
+                        location=departure.start_station_name,
+                        stop=abs(target.sequence - origin.sequence) if origin is not None else 0,
+                        arrival=midnight + datetime.timedelta(seconds=departure.departure),
+                        train_number="",
+                        terminal_station_id=departure.terminal_station_id,
+                        terminal_station_name=departure.terminal_station_name,
+                        is_express=False,
+                        is_last=False,
+                        status=0,
+                    ),
+                )
+        return [estimate._replace(sequence=index) for index, estimate in enumerate(estimates, start=1)]
+
+
+async def load_model() -> SubwayArrivalModel:
+    stations = await fetch_rows(
+        select(
+            SubwayRouteStation.id_,
+            SubwayRouteStation.route_id,
+            SubwayRouteStation.name,
+            SubwayRouteStation.sequence,
+            SubwayRouteStation.cumulative_time,
+        ),
+    )
+    realtime = await fetch_rows(
+        select(
+            SubwayRealtime.station_id,
+            SubwayRealtime.heading,
+            SubwayRealtime.location,
+            SubwayRealtime.stop,
+            SubwayRealtime.time,
+            SubwayRealtime.train_number,
+            SubwayRealtime.terminal_station_id,
+            SubwayRealtime.is_express,
+            SubwayRealtime.is_last,
+            SubwayRealtime.status,
+            SubwayRealtime.updated_at,
+        ),
+    )
+    return SubwayArrivalModel(stations, realtime)
+
+
+arrival_model = TTLCache(load_model, ttl=settings.SUBWAY_ESTIMATE_TTL)
@@ -31,3 +31,7 @@ class DuplicateTimetable(Conflict):
 
 class TimetableNotFound(NotFound):
     DETAIL = "TIMETABLE_NOT_FOUND"
+
+
+class DuplicateRealtime(Conflict):
+    DETAIL = "DUPLICATE_REALTIME"
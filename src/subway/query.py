@@ -1,14 +1,18 @@
 import datetime
-from typing import Callable
+from typing import Iterable
 
 import strawberry
 from pytz import timezone
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload, load_only, joinedload
 
+from config import settings
 from database import fetch_all
-from model.subway import SubwayRouteStation, SubwayTimetable, SubwayRealtime
-from utils import KST
+from model.subway import SubwayRouteStation, SubwayRealtime
+from search import text_search
+from subway.cache import CompiledSubwayTimetable, subway_timetable
+from subway.estimator import SubwayArrivalModel, SubwayEstimate, arrival_model
+from utils import KST, seconds_to_str, time_to_seconds
 
 
 @strawberry.type
@@ -57,6 +61,11 @@ class RealtimeQuery:
         description="Updated at",
         name="updatedAt",
     )
+    is_estimated: bool = strawberry.field(
+        description="Is estimated from the last known positions and the timetable",
+        name="estimated",
+        default=False,
+    )
 
 
 @strawberry.type
@@ -84,47 +93,20 @@ async def resolve_subway(
     end: datetime.time | None = None,
     end_str: str | None = None,
 ) -> list[StationQuery]:
-    station_conditions = []
+    station_conditions, station_order = [], []
     if id_:
         station_conditions.append(SubwayRouteStation.id_.in_(id_))
     if name:
-        station_conditions.append(SubwayRouteStation.name.like(f"%{name}%"))
+        name_search = await text_search(SubwayRouteStation.name, name)
+        station_conditions.append(name_search.condition)
+        station_order.append(name_search.rank.desc())
 
     station_query = (
         select(SubwayRouteStation)
         .filter(*station_conditions)
-        .order_by(SubwayRouteStation.id_)
+        .order_by(*station_order, SubwayRouteStation.id_)
         .options(
-            selectinload(SubwayRouteStation.timetable).options(
-                load_only(
-                    SubwayTimetable.heading,
-                    SubwayTimetable.is_weekdays,
-                    SubwayTimetable.departure_time,
-                ),
-                joinedload(SubwayTimetable.start_station).options(
-                    load_only(SubwayRouteStation.id_, SubwayRouteStation.name),
-                ),
-                joinedload(SubwayTimetable.terminal_station).options(
-                    load_only(SubwayRouteStation.id_, SubwayRouteStation.name),
-                ),
-            ),
-            selectinload(SubwayRouteStation.realtime).options(
-                load_only(
-                    SubwayRealtime.heading,
-                    SubwayRealtime.sequence,
-                    SubwayRealtime.location,
-                    SubwayRealtime.stop,
-                    SubwayRealtime.time,
-                    SubwayRealtime.train_number,
-                    SubwayRealtime.is_express,
-                    SubwayRealtime.is_last,
-                    SubwayRealtime.status,
-                    SubwayRealtime.updated_at,
-                ),
-                joinedload(SubwayRealtime.terminal_station).options(
-                    load_only(SubwayRouteStation.id_, SubwayRouteStation.name),
-                ),
-            ),
+            realtime_load_option(),
             load_only(
                 SubwayRouteStation.id_,
                 SubwayRouteStation.route_id,
@@ -148,31 +130,13 @@ async def resolve_subway(
         end_value = datetime.datetime.strptime(end_str, "%H:%M").time().replace(tzinfo=KST)
     else:
         end_value = None
-    timetable_filter: Callable[[SubwayTimetable], bool] = lambda x: (
-        ((x.is_weekdays == "weekdays") == weekdays if weekdays is not None else True)
-        and (
-            start_value is None
-            or (x.departure_time.replace(tzinfo=KST) >= start_value)
-            if start_value is not None
-            else True
-        )
-        and (
-            end_value is None
-            or (x.departure_time.replace(tzinfo=KST) <= end_value)
-            if end_value is not None
-            else True
-        )
-    )
-    realtime_filter: Callable[[SubwayRealtime], bool] = lambda x: (
-        x.updated_at.astimezone(timezone("Asia/Seoul")) >= now - x.time
-    )
+    # 시간표는 프로세스 캐시에서 정류장, 방면, 요일별로 이분 탐색한다.
+    compiled = await subway_timetable.get()
+    start_seconds = time_to_seconds(start_value) if start_value is not None else None
+    end_seconds = time_to_seconds(end_value) if end_value is not None else None
+    # 실시간 정보가 없거나 오래된 방면은 마지막 열차 위치와 시간표로 추정한다.
+    model = await arrival_model.get()
     for station in stations:
-        timetable = list(filter(timetable_filter, station.timetable))
-        realtime = list(filter(realtime_filter, station.realtime))
-        up_timetable = list(filter(lambda x: x.heading == "up", timetable))
-        down_timetable = list(filter(lambda x: x.heading == "down", timetable))
-        up_realtime = list(filter(lambda x: x.heading == "true", realtime))
-        down_realtime = list(filter(lambda x: x.heading == "false", realtime))
         result.append(
             StationQuery(
                 id_=station.id_,
@@ -182,102 +146,136 @@ async def resolve_subway(
                 timetable=TimetableListQuery(
                     up=[
                         TimetableQuery(
-                            is_weekdays=timetable.is_weekdays == "weekdays",
-                            departure_time=timetable.departure_time.strftime(
-                                "%H:%M:%S",
-                            ),
-                            departure_hour=timetable.departure_time.hour,
-                            departure_minute=timetable.departure_time.minute,
+                            is_weekdays=timetable.weekday == "weekdays",
+                            departure_time=seconds_to_str(timetable.departure),
+                            departure_hour=timetable.departure // 3600,
+                            departure_minute=timetable.departure // 60 % 60,
                             start_station=TimetableStation(
-                                id_=timetable.start_station.id_,
-                                name=timetable.start_station.name,
+                                id_=timetable.start_station_id,
+                                name=timetable.start_station_name,
                             ),
                             terminal_station=TimetableStation(
-                                id_=timetable.terminal_station.id_,
-                                name=timetable.terminal_station.name,
+                                id_=timetable.terminal_station_id,
+                                name=timetable.terminal_station_name,
                             ),
                         )
-                        for timetable in sorted(
-                            up_timetable,
-                            key=lambda x: x.departure_time,
+                        for timetable in compiled.search(
+                            station.id_, "up", weekdays, start_seconds, end_seconds,
                         )
                     ],
                     down=[
                         TimetableQuery(
-                            is_weekdays=timetable.is_weekdays == "weekdays",
-                            departure_time=timetable.departure_time.strftime(
-                                "%H:%M:%S",
-                            ),
-                            departure_hour=timetable.departure_time.hour,
-                            departure_minute=timetable.departure_time.minute,
+                            is_weekdays=timetable.weekday == "weekdays",
+                            departure_time=seconds_to_str(timetable.departure),
+                            departure_hour=timetable.departure // 3600,
+                            departure_minute=timetable.departure // 60 % 60,
                             start_station=TimetableStation(
-                                id_=timetable.start_station.id_,
-                                name=timetable.start_station.name,
-                            ),
-                            terminal_station=TimetableStation(
-                                id_=timetable.terminal_station.id_,
-                                name=timetable.terminal_station.name,
-                            ),
-                        )
-                        for timetable in sorted(
-                            down_timetable,
-                            key=lambda x: x.departure_time,
-                        )
-                    ],
-                ),
-                realtime=RealtimeListQuery(
-                    up=[
-                        RealtimeQuery(
-                            sequence=realtime.sequence,
-                            location=realtime.location,
-                            stop=realtime.stop,
-                            time=calculate_remaining_time(
-                                realtime.updated_at,
-                                realtime.time,
+                                id_=timetable.start_station_id,
+                                name=timetable.start_station_name,
                             ),
-                            train_no=realtime.train_number,
-                            is_express=realtime.is_express,
-                            is_last=realtime.is_last,
-                            status=realtime.status,
                             terminal_station=TimetableStation(
-                                id_=realtime.terminal_station.id_,
-                                name=realtime.terminal_station.name,
-                            ),
-                            updated_at=realtime.updated_at.astimezone(
-                                timezone("Asia/Seoul"),
+                                id_=timetable.terminal_station_id,
+                                name=timetable.terminal_station_name,
                             ),
                         )
-                        for realtime in sorted(up_realtime, key=lambda x: x.sequence)
-                    ],
-                    down=[
-                        RealtimeQuery(
-                            sequence=realtime.sequence,
-                            location=realtime.location,
-                            stop=realtime.stop,
-                            time=calculate_remaining_time(
-                                realtime.updated_at,
-                                realtime.time,
-                            ),
-                            train_no=realtime.train_number,
-                            is_express=realtime.is_express,
-                            is_last=realtime.is_last,
-                            status=realtime.status,
-                            terminal_station=TimetableStation(
-                                id_=realtime.terminal_station.id_,
-                                name=realtime.terminal_station.name,
-                            ),
-                            updated_at=realtime.updated_at.astimezone(
-                                timezone("Asia/Seoul"),
-                            ),
+                        for timetable in compiled.search(
+                            station.id_, "down", weekdays, start_seconds, end_seconds,
                         )
-                        for realtime in sorted(down_realtime, key=lambda x: x.sequence)
                     ],
                 ),
+                realtime=build_realtime_list(station.id_, station.realtime, compiled, model, now),
             ),
         )
     return result
 
 
+def build_realtime_list(
+    station_id: str,
+    realtime: Iterable[SubwayRealtime],
+    compiled: CompiledSubwayTimetable,
+    model: SubwayArrivalModel,
+    now: datetime.datetime,
+) -> RealtimeListQuery:
+    # 이미 지나간 도착 정보는 빼고, 남은 정보가 없는 방면은 마지막 열차 위치와 시간표로 추정한다.
+    fresh = sorted(
+        (x for x in realtime if x.updated_at.astimezone(KST) >= now - x.time),
+        key=lambda x: x.sequence,
+    )
+    count = settings.SUBWAY_ESTIMATE_COUNT
+    return RealtimeListQuery(
+        up=[build_realtime_query(x) for x in fresh if x.heading == "true"] or [
+            build_estimate_query(estimate, now)
+            for estimate in model.estimate(compiled, station_id, "true", now, count)
+        ],
+        down=[build_realtime_query(x) for x in fresh if x.heading == "false"] or [
+            build_estimate_query(estimate, now)
+            for estimate in model.estimate(compiled, station_id, "false", now, count)
+        ],
+    )
+
+
+def realtime_load_option():
+    return selectinload(SubwayRouteStation.realtime).options(
+        load_only(
+            SubwayRealtime.heading,
+            SubwayRealtime.sequence,
+            SubwayRealtime.location,
+            SubwayRealtime.stop,
+            SubwayRealtime.time,
+            SubwayRealtime.train_number,
+            SubwayRealtime.is_express,
+            SubwayRealtime.is_last,
+            SubwayRealtime.status,
+            SubwayRealtime.updated_at,
+        ),
+        joinedload(SubwayRealtime.terminal_station).options(
+            load_only(SubwayRouteStation.id_, SubwayRouteStation.name),
+        ),
+    )
+
+
+def build_realtime_query(realtime: SubwayRealtime) -> RealtimeQuery:
+    return RealtimeQuery(
+        sequence=realtime.sequence,
+        location=realtime.location,
+        stop=realtime.stop,
+        time=calculate_remaining_time(
+            realtime.updated_at,
+            realtime.time,
+        ),
+        train_no=realtime.train_number,
+        is_express=realtime.is_express,
+        is_last=realtime.is_last,
+        status=realtime.status,
+        terminal_station=TimetableStation(
+            id_=realtime.terminal_station.id_,
+            name=realtime.terminal_station.name,
+        ),
+        updated_at=realtime.updated_at.astimezone(
+            timezone("Asia/Seoul"),
+        ),
+    )
+
+
+def build_estimate_query(estimate: SubwayEstimate, now: datetime.datetime) -> RealtimeQuery:
+    return RealtimeQuery(
+        sequence=estimate.sequence,
+        location=estimate.location,
+        stop=estimate.stop,
+        time=calculate_remaining_time(now, estimate.arrival - now),
+        train_no=estimate.train_number,
+        is_express=estimate.is_express,
+        is_last=estimate.is_last,
+        status=estimate.status,
+        terminal_station=TimetableStation(
+            id_=estimate.terminal_station_id,
+            name=estimate.terminal_station_name,
+        ),
+        updated_at=now,
+        is_estimated=True,
+    )
+
+
 def calculate_remaining_time(
     updated_at: datetime.datetime,
     time: datetime.timedelta,
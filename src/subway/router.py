@@ -1,6 +1,8 @@
 import datetime
+import time
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from starlette import status
 
 from exceptions import DetailedHTTPException
@@ -13,6 +15,9 @@ from subway.dependancies import (
     get_valid_route,
     create_valid_route_station,
     get_valid_route_station,
+    create_valid_realtime_snapshot,
+    check_realtime_version,
+    get_valid_stream_stations,
 )
 from subway.exceptions import (
     StationNameNotFound,
@@ -34,7 +39,10 @@ from subway.schemas import (
     SubwayTimetableItemResponse,
     SubwayRealtimeListResponse,
     CreateSubwayTimetable,
+    SubwayRealtimeIngestRequest,
+    SubwayRealtimeIngestResponse,
 )
+from subway.stream import realtime_broadcaster
 from user.jwt import parse_jwt_user_data
 from utils import timedelta_to_str, remove_timezone, KST
 
@@ -398,6 +406,7 @@ async def delete_route_station_timetable(
     "/realtime",
     status_code=status.HTTP_200_OK,
     response_model=SubwayRealtimeListResponse,
+    dependencies=[Depends(check_realtime_version)],
 )
 async def get_realtime(
     _: str = Depends(parse_jwt_user_data),
@@ -423,10 +432,45 @@ async def get_realtime(
     }
 
 
+@router.get("/realtime/stream")
+async def stream_realtime(
+    request: Request,
+    station_ids: set[str] = Depends(get_valid_stream_stations),
+):
+    # GraphQL 질의처럼 인증 없이 공개한다.
+    # 역별 도착 정보를 처음 한 번 보내고, 이후에는 바뀐 역만 보낸다.
+    return StreamingResponse(
+        realtime_broadcaster.stream(station_ids, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/realtime",
+    status_code=status.HTTP_201_CREATED,
+    response_model=SubwayRealtimeIngestResponse,
+)
+async def ingest_realtime(
+    snapshot: SubwayRealtimeIngestRequest = Depends(create_valid_realtime_snapshot),
+    _: str = Depends(parse_jwt_user_data),
+):
+    started = time.monotonic()
+    station_ids, deleted, inserted, version = await service.replace_realtime(snapshot)
+    return {
+        "station": station_ids,
+        "deleted": deleted,
+        "inserted": inserted,
+        "version": version,
+        "elapsed": (time.monotonic() - started) * 1000,
+    }
+
+
 @router.get(
     "/station/{station_id}/realtime",
     status_code=status.HTTP_200_OK,
     response_model=SubwayRealtimeListResponse,
+    dependencies=[Depends(check_realtime_version)],
 )
 async def get_route_station_realtime(
     station_id: str,
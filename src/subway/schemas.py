@@ -171,3 +171,61 @@ class SubwayRealtimeItemResponse(BaseModel):
 
 class SubwayRealtimeListResponse(BaseModel):
     data: Annotated[list[SubwayRealtimeItemResponse], Field(alias="data")]
+
+
+class SubwayRealtimeArrivalRequest(BaseModel):
+    sequence: Annotated[int, Field(alias="sequence", ge=0)]
+    current_station: Annotated[str, Field(alias="current", max_length=30)]
+    remaining_stations: Annotated[int, Field(alias="station", ge=0)]
+    remaining_time: Annotated[int, Field(alias="time", ge=0)]  # seconds
+    heading: Annotated[str, Field(alias="heading", max_length=10)]
+    train_number: Annotated[str, Field(alias="trainNumber", max_length=10)]
+    is_express: Annotated[bool, Field(alias="express")]
+    is_last: Annotated[bool, Field(alias="last")]
+    terminal_station_id: Annotated[str, Field(alias="terminalStationID", pattern=r"^K[0-9]{3}$")]
+    status: Annotated[int, Field(alias="status")]
+    updated_at: Annotated[Optional[datetime.datetime], Field(alias="updatedAt")] = None
+
+
+class SubwayRealtimeSnapshotRequest(BaseModel):
+    station_id: Annotated[str, Field(alias="stationID", pattern=r"^K[0-9]{3}$")]
+    arrivals: Annotated[list[SubwayRealtimeArrivalRequest], Field(alias="arrivals")]
+
+
+class SubwayRealtimeIngestRequest(BaseModel):
+    route_id: Annotated[Optional[int], Field(alias="routeID")] = None
+    data: Annotated[list[SubwayRealtimeSnapshotRequest], Field(alias="data")]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "routeID": 1004,
+                "data": [
+                    {
+                        "stationID": "K449",
+                        "arrivals": [
+                            {
+                                "sequence": 1,
+                                "current": "중앙",
+                                "station": 1,
+                                "time": 120,
+                                "heading": "true",
+                                "trainNumber": "4512",
+                                "express": False,
+                                "last": False,
+                                "terminalStationID": "K409",
+                                "status": 1,
+                            },
+                        ],
+                    },
+                ],
+            },
+        }
+
+
+class SubwayRealtimeIngestResponse(BaseModel):
+    station_id: Annotated[list[str], Field(alias="station")]
+    deleted: Annotated[int, Field(alias="deleted", ge=0)]
+    inserted: Annotated[int, Field(alias="inserted", ge=0)]
+    version: Annotated[int, Field(alias="version", ge=1)]
+    elapsed: Annotated[float, Field(alias="elapsed", ge=0)]  # milliseconds
@@ -1,8 +1,9 @@
 import datetime
 
-from sqlalchemy import insert, select, delete, update
+from sqlalchemy import insert, select, delete, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import fetch_one, fetch_all, execute_query
+from database import engine, fetch_one, fetch_all, fetch_rows, execute_query
 from model.subway import (
     SubwayStation,
     SubwayRoute,
@@ -10,7 +11,11 @@ from model.subway import (
     SubwayTimetable,
     SubwayRealtime,
 )
+from search import invalidate_index
+from subway.cache import subway_timetable
 from subway.dependancies import create_valid_timetable
+from subway.estimator import arrival_model
+from subway.stream import realtime_broadcaster
 from subway.schemas import (
     CreateSubwayStation,
     CreateSubwayRoute,
@@ -18,7 +23,9 @@ from subway.schemas import (
     UpdateSubwayRoute,
     UpdateSubwayRouteStation,
     CreateSubwayTimetable,
+    SubwayRealtimeIngestRequest,
 )
+from subway.version import bump_version
 from utils import KST
 
 
@@ -58,6 +65,9 @@ async def list_station_name_filter(station_name: str) -> list[SubwayStation]:
 async def delete_station_name(station_name: str) -> None:
     delete_query = delete(SubwayStation).where(SubwayStation.name == station_name)
     await execute_query(delete_query)
+    invalidate_index(SubwayRouteStation.name)
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
 
 
 async def create_route(
@@ -115,6 +125,9 @@ async def update_route(
 async def delete_route(route_id: int) -> None:
     delete_query = delete(SubwayRoute).where(SubwayRoute.id_ == route_id)
     await execute_query(delete_query)
+    invalidate_index(SubwayRouteStation.name)
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
 
 
 async def create_route_station(
@@ -133,6 +146,9 @@ async def create_route_station(
         )
     )
     await execute_query(insert_query)
+    invalidate_index(SubwayRouteStation.name)
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
     select_query = select(SubwayRouteStation).where(SubwayRouteStation.id_ == new_station.id_)
     return await fetch_one(select_query)
 
@@ -175,6 +191,9 @@ async def update_route_station(
         .values(new_data)
     )
     await execute_query(update_query)
+    invalidate_index(SubwayRouteStation.name)
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
     select_query = select(SubwayRouteStation).where(
         SubwayRouteStation.id_ == station_id,
     )
@@ -186,6 +205,9 @@ async def delete_route_station(station_id: str) -> None:
         SubwayRouteStation.id_ == station_id,
     )
     await execute_query(delete_query)
+    invalidate_index(SubwayRouteStation.name)
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
 
 
 async def get_timetable_by_station(
@@ -234,6 +256,7 @@ async def create_timetable(
         )
     )
     await execute_query(insert_query)
+    subway_timetable.invalidate()
     select_query = select(SubwayTimetable).where(
         SubwayTimetable.station_id == station_id,
         SubwayTimetable.start_station_id == new_timetable.start_station_id,
@@ -258,6 +281,7 @@ async def delete_timetable(
         SubwayTimetable.departure_time == departure_time,
     )
     await execute_query(delete_query)
+    subway_timetable.invalidate()
 
 
 async def get_realtime(station_id: str | None = None) -> list[SubwayRealtime]:
@@ -268,3 +292,63 @@ async def get_realtime(station_id: str | None = None) -> list[SubwayRealtime]:
         *condition,
     )
     return await fetch_all(select_query)
+
+
+async def list_route_station_ids(station_ids: set[str]) -> dict[str, int]:
+    select_query = select(SubwayRouteStation.id_, SubwayRouteStation.route_id).where(
+        SubwayRouteStation.id_.in_(station_ids),
+    )
+    return {row.id_: row.route_id for row in await fetch_rows(select_query)}
+
+
+async def replace_realtime(
+    snapshot: SubwayRealtimeIngestRequest,
+) -> tuple[list[str], int, int, int]:
+    # 역(또는 노선 전체)의 도착 정보를 한 트랜잭션에서 교체하고 스냅샷 버전을 올린다.
+    station_ids = sorted({item.station_id for item in snapshot.data})
+    now = datetime.datetime.now(tz=KST)
+    values = [
+        {
+            "station_id": item.station_id,
+            "heading": arrival.heading,
+            "sequence": arrival.sequence,
+            "location": arrival.current_station,
+            "stop": arrival.remaining_stations,
+            "time": datetime.timedelta(seconds=arrival.remaining_time),
+            "terminal_station_id": arrival.terminal_station_id,
+            "train_number": arrival.train_number,
+            "is_express": arrival.is_express,
+            "is_last": arrival.is_last,
+            "status": arrival.status,
+            "updated_at": arrival.updated_at or now,
+        }
+        for item in snapshot.data
+        for arrival in item.arrivals
+    ]
+    delete_condition = SubwayRealtime.station_id.in_(station_ids)
+    if snapshot.route_id is not None:
+        delete_condition = or_(
+            delete_condition,
+            SubwayRealtime.station_id.in_(
+                select(SubwayRouteStation.id_).where(SubwayRouteStation.route_id == snapshot.route_id),
+            ),
+        )
+    async with AsyncSession(engine) as session:
+        async with session.begin():
+            deleted_ids = (
+                await session.execute(
+                    delete(SubwayRealtime).where(delete_condition).returning(SubwayRealtime.station_id),
+                )
+            ).scalars().all()
+            if values:
+                await session.execute(insert(SubwayRealtime), values)
+            version = await bump_version(session)
+    # 추정 모델이 새 열차 위치를 쓰도록 다시 만든다.
+    arrival_model.invalidate()
+    # 추정 도착 정보는 같은 노선의 다른 역에서도 바뀌므로 노선의 역 전체에 알린다.
+    route_ids = set((await list_route_station_ids({*station_ids, *deleted_ids})).values())
+    select_query = select(SubwayRouteStation.id_).where(SubwayRouteStation.route_id.in_(route_ids))
+    await realtime_broadcaster.publish(
+        {*station_ids, *deleted_ids, *(row.id_ for row in await fetch_rows(select_query))},
+    )
+    return station_ids, len(deleted_ids), len(values), version
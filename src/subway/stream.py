@@ -0,0 +1,34 @@
+import datetime
+
+from sqlalchemy import select
+
+from broadcast import RealtimeBroadcaster, graphql_payload
+from database import fetch_all
+from model.subway import SubwayRouteStation
+from subway.cache import subway_timetable
+from subway.estimator import arrival_model
+from subway.query import build_realtime_list, realtime_load_option
+from utils import KST
+
+
+async def load_realtime(station_ids: set[str]) -> dict[str, dict]:
+    """Realtime arrivals per station in the shape of ``subway { realtime { up down } }``.
+
+    As in the GraphQL resolver, trains that have already arrived are dropped and
+    a heading without fresh arrivals is estimated from the last known positions.
+    """
+    select_query = (
+        select(SubwayRouteStation)
+        .where(SubwayRouteStation.id_.in_(station_ids))
+        .options(realtime_load_option())
+    )
+    stations = await fetch_all(select_query)
+    compiled, model = await subway_timetable.get(), await arrival_model.get()
+    now = datetime.datetime.now(tz=KST)
+    return {
+        station.id_: graphql_payload(build_realtime_list(station.id_, station.realtime, compiled, model, now))
+        for station in stations
+    }
+
+
+realtime_broadcaster: RealtimeBroadcaster[str] = RealtimeBroadcaster("subway:realtime:updates", load_realtime)
@@ -0,0 +1,7 @@
+from model.subway import SubwayRealtimeVersion
+from version import DatasetVersion
+
+# 스냅샷 교체와 같은 트랜잭션에서 버전을 올려 새 버전이 보이면 새 스냅샷도 보이게 한다.
+realtime_version = DatasetVersion(SubwayRealtimeVersion, etag_prefix="subway-realtime")
+get_version = realtime_version.get
+bump_version = realtime_version.bump
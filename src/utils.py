@@ -19,6 +19,16 @@ def timedelta_to_str(td: datetime.timedelta) -> str:
     return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
 
 
+def time_to_seconds(value: datetime.time) -> int:
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+def seconds_to_str(seconds: int) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
 def second_to_timedelta(seconds: int) -> datetime.timedelta:
     return datetime.timedelta(seconds=seconds)
 
@@ -0,0 +1,57 @@
+# Dataset versions kept in a version table and served as ETags.
+import datetime
+
+from fastapi import Request, Response
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import engine, fetch_one
+from exceptions import NotModified
+from utils import KST
+
+
+class DatasetVersion:
+    """Monotonic version of a dataset, stored as the latest row of ``model``.
+
+    ``model`` needs an auto-incrementing ``id_`` and ``name``/``created_at``
+    columns. Clients send the ETag back in ``If-None-Match`` to get a 304 while
+    the version is unchanged.
+    """
+
+    def __init__(self, model, etag_prefix: str) -> None:
+        self._model = model
+        self._etag_prefix = etag_prefix
+
+    async def get(self) -> int:
+        select_query = select(func.coalesce(func.max(self._model.id_), 0))
+        return await fetch_one(select_query)
+
+    async def bump(self, session: AsyncSession | None = None) -> int:
+        # 세션을 넘기면 호출한 쪽의 트랜잭션에서 버전을 올려 데이터와 함께 보이게 한다.
+        if session is None:
+            async with AsyncSession(engine) as session:
+                async with session.begin():
+                    return await self.bump(session)
+        now = datetime.datetime.now(tz=KST)
+        insert_query = (
+            insert(self._model)
+            .values(name=now.strftime("%Y-%m-%d %H:%M:%S"), created_at=now)
+            .returning(self._model.id_)
+        )
+        version = (await session.execute(insert_query)).scalar_one()
+        # 최신 버전만 남긴다.
+        await session.execute(delete(self._model).where(self._model.id_ < version))
+        return version
+
+    def etag(self, version: int) -> str:
+        return f'"{self._etag_prefix}-{version}"'
+
+    async def check(self, request: Request, response: Response) -> int:
+        """Raises ``NotModified`` when ``If-None-Match`` matches the current version."""
+        version = await self.get()
+        etag = self.etag(version)
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [x.strip() for x in if_none_match.split(",")]):
+            raise NotModified(headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return version
@@ -9,8 +9,16 @@ from async_asgi_testclient import TestClient
 from pytz import timezone
 from sqlalchemy import text
 
+from bus.cache import clear_realtime
+from bus.eta import travel_times
+from bus.graph import bus_network
+from bus.statistics import aggregate_statistics
 from database import engine
 from main import app
+from search import invalidate_indexes
+from shuttle.cache import departure_index, service_calendar, timetable_index
+from subway.cache import subway_timetable
+from subway.estimator import arrival_model
 from user.security import hash_password
 
 
@@ -36,6 +44,9 @@ async def client() -> AsyncGenerator[TestClient, None]:
 async def clean_db() -> None:
     async with engine.begin() as conn:
         await conn.execute(text("DELETE FROM bus_departure_log"))
+        await conn.execute(text("DELETE FROM bus_departure_log_daily"))
+        await conn.execute(text("DELETE FROM bus_departure_statistics"))
+        await conn.execute(text("DELETE FROM bus_departure_statistics_state"))
         await conn.execute(text("DELETE FROM bus_realtime"))
         await conn.execute(text("DELETE FROM bus_timetable"))
         await conn.execute(text("DELETE FROM bus_route_stop"))
@@ -69,12 +80,24 @@ async def clean_db() -> None:
         await conn.execute(text("DELETE FROM building"))
         await conn.execute(text("DELETE FROM campus"))
         await conn.execute(text("DELETE FROM subway_realtime"))
+        await conn.execute(text("DELETE FROM subway_realtime_version"))
         await conn.execute(text("DELETE FROM subway_timetable"))
         await conn.execute(text("DELETE FROM subway_route_station"))
         await conn.execute(text("DELETE FROM subway_route"))
         await conn.execute(text("DELETE FROM subway_station"))
         await conn.execute(text("DELETE FROM auth_refresh_token"))
         await conn.execute(text("DELETE FROM admin_user"))
+        await conn.execute(text("REFRESH MATERIALIZED VIEW shuttle_timetable_view"))
+        await conn.execute(text("REFRESH MATERIALIZED VIEW shuttle_timetable_grouped_view"))
+    timetable_index.invalidate()
+    departure_index.invalidate()
+    service_calendar.invalidate()
+    await clear_realtime()
+    invalidate_indexes()
+    bus_network.invalidate()
+    travel_times.invalidate()
+    subway_timetable.invalidate()
+    arrival_model.invalidate()
 
 
 @pytest_asyncio.fixture
@@ -174,6 +197,20 @@ async def create_test_bus_realtime(create_test_bus_route_stop) -> None:
         await conn.execute(text(insert_sql))
 
 
+@pytest_asyncio.fixture
+async def create_test_bus_statistics(create_test_bus_timetable) -> None:
+    # 2024-03-05(화) 1번 정류장 시간표: 06:01, 07:01, 08:01
+    insert_sql = (
+        "INSERT INTO bus_departure_log VALUES "
+        "(1, 1, '2024-03-05', '06:02:00+09:00', '2000001'), "
+        "(1, 1, '2024-03-05', '07:00:00+09:00', '2000002'), "
+        "(1, 1, '2024-03-05', '07:30:00+09:00', '2000003')"
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text(insert_sql))
+    await aggregate_statistics(datetime.date(2024, 3, 6))
+
+
 @pytest_asyncio.fixture
 async def create_test_bus_departure_log(create_test_bus_route_stop) -> None:
     values = ""
@@ -460,6 +497,30 @@ async def create_test_shuttle_timetable(
         )
 
 
+@pytest_asyncio.fixture
+async def create_test_shuttle_grouped_timetable(create_test_shuttle_period) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("INSERT INTO shuttle_stop VALUES ('shuttlecock_o', 37.29, 126.83)"))
+        await conn.execute(
+            text(
+                "INSERT INTO shuttle_route VALUES "
+                "('DHDH', 'test_description', 'test_description', 'DH', 'shuttlecock_o', 'shuttlecock_o')",
+            ),
+        )
+        await conn.execute(text("INSERT INTO shuttle_route_stop VALUES ('DHDH', 'shuttlecock_o', 0, '00:00:00')"))
+        await conn.execute(
+            text(
+                "INSERT INTO shuttle_timetable VALUES "
+                "(1, 'semester', true, 'DHDH', '08:00+09:00'),"
+                "(2, 'semester', true, 'DHDH', '12:00+09:00'),"
+                "(3, 'semester', true, 'DHDH', '23:30+09:00'),"
+                "(4, 'semester', false, 'DHDH', '10:00+09:00')",
+            ),
+        )
+        await conn.execute(text("refresh materialized view shuttle_timetable_view"))
+        await conn.execute(text("refresh materialized view shuttle_timetable_grouped_view"))
+
+
 # Subway Datas
 @pytest_asyncio.fixture
 async def create_test_subway_station_name() -> None:
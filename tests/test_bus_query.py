@@ -1,6 +1,23 @@
+import datetime
+
 import pytest
 from async_asgi_testclient import TestClient
+from sqlalchemy import select, text
 
+from bus.cache import decode_realtime, encode_realtime, realtime_ttl
+from bus.graph import bus_network
+from bus.statistics import aggregate_statistics
+from bus.partition import (
+    create_partition,
+    list_partitions,
+    maintain_partitions,
+    month_start,
+    next_month,
+    partition_name,
+)
+from config import settings
+from database import engine, fetch_rows
+from model.bus import BusRealtime, BusDepartureLogDaily
 from query.router import graphql_schema
 
 
@@ -343,3 +360,239 @@ async def test_get_bus_query_filter_weekdays(
             timetable = route["timetable"]
             for item in timetable:
                 assert item["weekdays"] == "weekdays"
+
+
+@pytest.mark.asyncio
+async def test_get_bus_query_log_window(
+    client: TestClient,
+    clean_db,
+    create_test_bus_departure_log,
+) -> None:
+    old_date = datetime.datetime.now().date() - datetime.timedelta(days=30)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(f"INSERT INTO bus_departure_log VALUES (1, 1, '{old_date}', '00:00:00', '2000001')"),
+        )
+    query = """
+        query ($logDate: [Date!]) {
+            bus (id_: [1], logDate: $logDate) {
+                routes { log { departureDate, departureTime } }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    logs = [log for stop in response.data["bus"] for route in stop["routes"] for log in route["log"]]
+    assert len(logs) == 9
+    assert old_date.isoformat() not in [log["departureDate"] for log in logs]
+
+    response = await graphql_schema.execute(query, variable_values={"logDate": [old_date.isoformat()]})
+    assert response.errors is None
+    assert response.data is not None
+    logs = [log for stop in response.data["bus"] for route in stop["routes"] for log in route["log"]]
+    assert [log["departureDate"] for log in logs] == [old_date.isoformat()]
+
+
+@pytest.mark.asyncio
+async def test_get_bus_query_timetable_service_day_order(
+    client: TestClient,
+    clean_db,
+    create_test_bus_timetable,
+) -> None:
+    query = """
+        query {
+            bus (id_: [1], weekdays: ["saturday"], start: "05:00:00", end: "08:00:00") {
+                routes { timetable { weekdays, time } }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    timetable = [item for stop in response.data["bus"] for route in stop["routes"] for item in route["timetable"]]
+    assert {item["weekdays"] for item in timetable} == {"saturday"}
+    assert [item["time"] for item in timetable] == [
+        "05:00:00", "06:00:00", "07:00:00", "08:00:00", "25:00:00", "26:00:00", "27:00:00",
+    ]
+
+
+def test_bus_realtime_cache_encoding() -> None:
+    updated_at = datetime.datetime(2024, 3, 4, 12, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+    items = [
+        BusRealtime(
+            stop_id=1, route_id=2, sequence=i, stops=i, seats=41,
+            time=datetime.timedelta(seconds=i * 10), low_floor=i % 2 == 0, updated_at=updated_at,
+        )
+        for i in range(1, 3)
+    ]
+    decoded = decode_realtime(1, 2, encode_realtime(items))
+    assert [(item.stop_id, item.route_id, item.sequence) for item in decoded] == [(1, 2, 1), (1, 2, 2)]
+    assert [item.time for item in decoded] == [item.time for item in items]
+    assert [item.low_floor for item in decoded] == [False, True]
+    assert decoded[0].updated_at == updated_at
+    # TTL은 가장 늦은 도착 시간을 따르되 설정값을 넘지 않는다.
+    assert realtime_ttl(items) == 20
+    assert realtime_ttl([]) > 0
+
+
+@pytest.mark.asyncio
+async def test_bus_network(
+    clean_db,
+    create_test_bus_route_stop,
+) -> None:
+    network = await bus_network.get()
+    assert network.routes[1].name == "test_route1"
+    assert [edge.stop_id for edge in network.route_stops(1)] == list(range(1, 8))
+    assert [edge.route_id for edge in network.stop_routes(3)] == [1]
+    assert network.next_stop(1, 3).stop_id == 4
+    assert network.next_stop(1, 7) is None
+    assert network.minutes_between(1, 2, 5) == 0
+    assert network.minutes_between(1, 5, 2) is None
+    async with engine.begin() as conn:
+        await conn.execute(text("DELETE FROM bus_route_stop WHERE stop_id = 7"))
+    # 관리자 API를 거치지 않은 변경은 무효화 전까지 반영되지 않는다.
+    assert len((await bus_network.get()).route_stops(1)) == 7
+    bus_network.invalidate()
+    assert len((await bus_network.get()).route_stops(1)) == 6
+
+
+@pytest.mark.asyncio
+async def test_maintain_bus_departure_log_partitions(
+    clean_db,
+    create_test_bus_route_stop,
+) -> None:
+    today = datetime.date.today()
+    cutoff = today - datetime.timedelta(days=settings.BUS_DEPARTURE_LOG_RETENTION_DAYS)
+    expired_month = month_start(month_start(cutoff) - datetime.timedelta(days=1))
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(expired_month)}"))
+        await create_partition(conn, expired_month)
+        await conn.execute(
+            text(
+                "INSERT INTO bus_departure_log VALUES "
+                f"(1, 1, '{expired_month}', '06:00:00+09:00', '2000001'), "
+                f"(1, 1, '{expired_month}', '08:30:00+09:00', '2000002'), "
+                f"(1, 1, '{today}', '07:00:00+09:00', '2000003')",
+            ),
+        )
+    created, dropped = await maintain_partitions(today)
+    assert partition_name(expired_month) in dropped
+    async with engine.connect() as conn:
+        partitions = await list_partitions(conn)
+        assert month_start(today) in partitions
+        assert next_month(month_start(today)) in partitions
+        assert all(next_month(month) > cutoff for month in partitions)
+        assert (await conn.execute(text("SELECT count(*) FROM bus_departure_log"))).scalar() == 1
+        current = (await conn.execute(
+            text(f"SELECT count(*) FROM {partition_name(month_start(today))}"),
+        )).scalar()
+        assert current == 1
+    summary = (await fetch_rows(select(BusDepartureLogDaily)))[0][0]
+    assert (summary.stop_id, summary.route_id, summary.date, summary.count) == (1, 1, expired_month, 2)
+    assert summary.first_time.replace(tzinfo=None) == datetime.time(6, 0)
+    assert summary.last_time.replace(tzinfo=None) == datetime.time(8, 30)
+    assert await maintain_partitions(today) == ([], [])
+
+
+@pytest.mark.asyncio
+async def test_get_bus_statistics(
+    client: TestClient,
+    clean_db,
+    create_test_bus_statistics,
+) -> None:
+    query = """
+        query {
+            busStatistics (routeId: [1], stopId: [1]) {
+                routeID, stopID, weekdays, hour, count, headway, deviation, early, late, p10, p50, p90
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    statistics = {item["hour"]: item for item in response.data["busStatistics"]}
+    assert statistics[6] == {
+        "routeID": 1, "stopID": 1, "weekdays": "weekdays", "hour": 6, "count": 1, "headway": None,
+        "deviation": 1.0, "early": 0.0, "late": 0.0, "p10": 1, "p50": 1, "p90": 1,
+    }
+    assert statistics[7]["count"] == 2
+    assert statistics[7]["headway"] == 44.0
+    assert statistics[7]["deviation"] == 14.0
+    assert (statistics[7]["early"], statistics[7]["late"]) == (0.0, 0.5)
+    assert (statistics[7]["p10"], statistics[7]["p50"], statistics[7]["p90"]) == (-1, -1, 29)
+
+    # 이미 집계한 날짜는 다시 집계하지 않는다.
+    assert await aggregate_statistics(datetime.date(2024, 3, 6)) == 0
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO bus_departure_log VALUES (1, 1, '2024-03-06', '07:01:00+09:00', '2000004')"),
+        )
+    assert await aggregate_statistics(datetime.date(2024, 3, 7)) == 1
+    response = await graphql_schema.execute(query)
+    statistics = {item["hour"]: item for item in response.data["busStatistics"]}
+    assert statistics[7]["count"] == 3
+    assert statistics[7]["p50"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_bus_statistics_service_day(
+    client: TestClient,
+    clean_db,
+    create_test_bus_timetable,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from config import settings
+
+    # 2024-03-09(토) 23:50 출발과 03-10(일) 00:30 출발은 같은 토요일 운행이다.
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO bus_departure_log VALUES "
+                "(1, 1, '2024-02-20', '07:00:00+09:00', '2000001'), "
+                "(1, 1, '2024-03-09', '23:50:00+09:00', '2000002'), "
+                "(1, 1, '2024-03-10', '00:30:00+09:00', '2000003')",
+            ),
+        )
+    monkeypatch.setattr(settings, "BUS_STATISTICS_CHUNK_DAYS", 3)
+    assert await aggregate_statistics(datetime.date(2024, 3, 10)) == 3
+    query = """
+        query {
+            busStatistics (routeId: [1], stopId: [1]) { weekdays, hour, count, headway }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    statistics = {(item["weekdays"], item["hour"]): item for item in response.data["busStatistics"]}
+    assert statistics[("weekdays", 7)]["count"] == 1
+    assert statistics[("saturday", 23)]["count"] == 1
+    assert statistics[("saturday", 0)]["count"] == 1
+    assert statistics[("saturday", 0)]["headway"] == 40.0
+    assert ("sunday", 0) not in statistics
+
+
+@pytest.mark.asyncio
+async def test_get_bus_query_filter_stop_name_ranked(
+    client: TestClient,
+    clean_db,
+    create_test_bus_stop,
+) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO bus_stop VALUES (100, 'STOP1', 1, '00100', '서울', 89.9, 89.9)"),
+        )
+    query = """
+        query {
+            bus (name: "stop1") { id, name }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    # 대소문자를 구분하지 않고, 검색어와 더 비슷한 이름이 먼저 온다.
+    assert [stop["name"] for stop in response.data["bus"]] == ["STOP1", "test_stop1"]
+
+    response = await graphql_schema.execute('query { bus (name: "no_such_stop") { id } }')
+    assert response.errors is None
+    assert response.data == {"bus": []}
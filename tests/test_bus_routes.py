@@ -1,12 +1,13 @@
-from datetime import time
+import asyncio
+from datetime import date, time, timedelta
 
 import pytest
 from async_asgi_testclient import TestClient
-from sqlalchemy import select
+from sqlalchemy import select, text
 
-from database import fetch_one
+from database import engine, fetch_all, fetch_one
 from model.bus import BusRoute, BusStop, BusRouteStop, BusTimetable
-from tests.utils import get_access_token
+from tests.utils import get_access_token, read_events
 from utils import KST
 
 
@@ -1654,3 +1655,399 @@ async def test_list_realtime_route_filter(
         assert realtime.get("time") is not None
         assert realtime.get("lowFloor") is not None
         assert realtime.get("updatedAt") is not None
+
+
+@pytest.mark.asyncio
+async def test_list_realtime_partial_cache(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from bus import cache as realtime_cache
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO bus_realtime VALUES "
+                "(2, 1, 1, 1, 41, '00:03:00', false, now())",
+            ),
+        )
+
+    # 1번 정류장만 캐시에 있는 상태를 가정한다.
+    cached = await realtime_cache.get_realtime([(1, 1)])
+
+    async def read_warm(keys):
+        return {key: cached[key] for key in keys if key in cached}
+
+    monkeypatch.setattr(realtime_cache, "read_realtime", read_warm)
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/bus/realtime?route_id=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    stops = [realtime.get("stopID") for realtime in response.json().get("data")]
+    assert stops == [1] * 9 + [2]
+
+
+@pytest.mark.asyncio
+async def test_list_realtime_cached_index(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from bus import cache as realtime_cache
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO bus_realtime VALUES "
+                "(2, 1, 1, 1, 41, '00:03:00', false, now())",
+            ),
+        )
+
+    # Redis에 (정류장, 노선) 목록이 있으면 데이터베이스의 목록을 다시 읽지 않는다.
+    async def read_index():
+        return {(1, 1)}
+
+    async def build_index(keys):
+        raise AssertionError("index should not be rebuilt")
+
+    monkeypatch.setattr(realtime_cache, "read_realtime_index", read_index)
+    monkeypatch.setattr(realtime_cache, "build_realtime_index", build_index)
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/bus/realtime?route_id=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    stops = [realtime.get("stopID") for realtime in response.json().get("data")]
+    assert stops == [1] * 9
+
+
+@pytest.mark.asyncio
+async def test_list_realtime_stop_route_filter(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+):
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/bus/realtime?stop_id=1&route_id=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    sequences = [realtime.get("sequence") for realtime in response.json().get("data")]
+    assert sequences == sorted(sequences)
+    assert len(sequences) == 9
+    for realtime in response.json().get("data"):
+        assert realtime.get("stopID") == 1
+        assert realtime.get("routeID") == 1
+
+
+@pytest.mark.asyncio
+async def test_list_realtime_projected(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+):
+    # 1번 → 2번 정류장은 최근 기록상 5분, 2번 → 3번 정류장은 기록이 없어 노선 정보(0분)를 쓴다.
+    values = ""
+    for i in range(1, 4):
+        departure_date = date.today() - timedelta(days=i)
+        values += f"(1, 1, '{departure_date}', '07:00:00+09:00', 'v{i}'),"
+        values += f"(2, 1, '{departure_date}', '07:05:00+09:00', 'v{i}'),"
+    async with engine.begin() as conn:
+        await conn.execute(text(f"INSERT INTO bus_departure_log VALUES {values}"[:-1]))
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/bus/realtime?stop_id=3&route_id=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    assert [
+        (item.get("stopID"), item.get("sequence"), item.get("stop"), item.get("time"))
+        for item in response.json().get("data")
+    ] == [(3, i, i + 2, i + 5) for i in range(1, 10)]
+
+
+@pytest.mark.asyncio
+async def test_ingest_realtime(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from bus import cache as realtime_cache
+
+    index_updates = []
+
+    async def update_index(removed, added):
+        index_updates.append((sorted(removed), sorted(added)))
+
+    monkeypatch.setattr(realtime_cache, "update_realtime_index", update_index)
+    access_token = await get_access_token(client)
+    snapshot = {
+        "data": [
+            {
+                "stopID": 1,
+                "routeID": 1,
+                "arrivals": [
+                    {"sequence": 1, "stop": 2, "time": 180, "seat": 30, "lowFloor": True},
+                    {"sequence": 2, "stop": 5, "time": 420, "seat": -1, "lowFloor": False},
+                ],
+            },
+            {"stopID": 2, "routeID": 1, "arrivals": []},
+        ],
+    }
+    response = await client.post(
+        "/api/bus/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=snapshot,
+    )
+    assert response.status_code == 201
+    assert response.json().get("stop") == [1, 2]
+    assert response.json().get("deleted") == 9
+    assert response.json().get("inserted") == 2
+    assert response.json().get("elapsed") >= 0
+    assert index_updates == [([(1, 1)], [(1, 1)])]
+
+    response = await client.get(
+        "/api/bus/realtime?stop_id=1&route_id=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    assert [(item.get("sequence"), item.get("time")) for item in response.json().get("data")] == [(1, 3), (2, 7)]
+
+
+@pytest.mark.asyncio
+async def test_stream_realtime(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_realtime,
+):
+    # 앱 사용자도 구독할 수 있도록 인증 없이 연결한다.
+    response = await client.get("/api/bus/realtime/stream?stop_id=1&stop_id=2", stream=True)
+    assert response.status_code == 200
+    assert response.headers.get("content-type").startswith("text/event-stream")
+    events = read_events(response)
+    initial = {event["key"]: event["data"] for event in [await anext(events), await anext(events)]}
+    assert initial.keys() == {1, 2}
+    route = initial[1][0]
+    assert (route["sequence"], route["info"]["id"], route["info"]["name"]) == (1, 1, "test_route1")
+    # GraphQL 응답과 같이 남은 시간(분)을 보내고, 2번 정류장은 1번 정류장의 도착 정보로 추정한다.
+    assert [(item["sequence"], round(item["time"])) for item in route["realtime"]] == [(i, i) for i in range(1, 10)]
+    assert {"stop", "seat", "lowFloor", "updatedAt"} <= route["realtime"][0].keys()
+    assert [item["sequence"] for item in initial[2][0]["realtime"]] == list(range(1, 10))
+
+    # 바뀐 정류장의 도착 정보만 다시 보낸다.
+    access_token = await get_access_token(client)
+    arrival = {"sequence": 1, "stop": 2, "time": 180, "seat": 30, "lowFloor": True}
+    response = await client.post(
+        "/api/bus/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stopID": 1, "routeID": 1, "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 201
+    updated = {event["key"]: event["data"] for event in [await anext(events), await anext(events)]}
+    assert [(item["sequence"], round(item["time"])) for item in updated[1][0]["realtime"]] == [(1, 3)]
+    assert [item["sequence"] for item in updated[2][0]["realtime"]] == [1]
+
+    response = await client.get("/api/bus/realtime/stream?stop_id=100")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "STOP_NOT_FOUND"}
+
+
+@pytest.mark.asyncio
+async def test_stream_realtime_listener_keeps_subscription(monkeypatch: pytest.MonkeyPatch):
+    import database
+    from broadcast import RealtimeBroadcaster
+
+    subscribed = []
+
+    class PubSub:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *args):
+            return False
+
+        async def subscribe(self, channel):
+            subscribed.append(channel)
+
+        async def listen(self):
+            yield {"type": "subscribe", "data": 1}
+            yield {"type": "message", "data": "[1]"}
+            yield {"type": "message", "data": "[1]"}
+            await asyncio.Event().wait()
+
+    class Redis:
+        def pubsub(self):
+            return PubSub()
+
+    calls = 0
+
+    async def loader(keys):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("loader failed")
+        return {key: [calls] for key in keys}
+
+    monkeypatch.setattr(database, "redis_client", Redis())
+    broadcaster: RealtimeBroadcaster[int] = RealtimeBroadcaster("test:updates", loader)
+    async with broadcaster.subscribe([1]) as queue:
+        broadcaster.start()
+        try:
+            # 첫 갱신을 전달하지 못해도 구독을 유지하고 다음 갱신을 전달한다.
+            assert await asyncio.wait_for(queue.get(), timeout=5) == (1, [2])
+        finally:
+            await broadcaster.stop()
+    assert subscribed == ["test:updates"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_realtime_invalid(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_route_stop,
+):
+    access_token = await get_access_token(client)
+    arrival = {"sequence": 1, "stop": 2, "time": 180, "seat": 30, "lowFloor": True}
+    response = await client.post(
+        "/api/bus/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stopID": 100, "routeID": 1, "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "ROUTE_STOP_NOT_FOUND"}
+
+    response = await client.post(
+        "/api/bus/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stopID": 1, "routeID": 1, "arrivals": [arrival, arrival]}]},
+    )
+    assert response.status_code == 409
+    assert response.json() == {"detail": "DUPLICATE_REALTIME"}
+
+
+@pytest.mark.asyncio
+async def test_list_statistics(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_statistics,
+):
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/bus/statistics?route_id=1&stop_id=1&weekdays=weekdays",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    assert [item.get("hour") for item in response.json().get("data")] == [6, 7]
+    for item in response.json().get("data"):
+        assert item.get("routeID") == 1
+        assert item.get("stopID") == 1
+        assert item.get("weekdays") == "weekdays"
+        assert item.get("count") is not None
+        assert item.get("p50") is not None
+
+
+@pytest.mark.asyncio
+async def test_import_bus_timetable_csv(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_timetable,
+):
+    access_token = await get_access_token(client)
+    rows = "".join(
+        f"{route_id},1,{weekdays},{hour:02d}:{minute:02d}:00\n"
+        for route_id in range(1, 10)
+        for weekdays in ("weekdays", "saturday", "sunday")
+        for hour in range(24)
+        for minute in range(0, 60, 15)
+    )
+    response = await client.post(
+        "/api/bus/timetable/import",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "text/csv",
+        },
+        data="routeID,start,weekdays,departureTime\n" + rows,
+    )
+    assert response.status_code == 201
+    response_json = response.json()
+    # 고정값으로 들어 있던 1번 노선의 01:00 ~ 09:00 정각 출발은 건너뛴다.
+    assert response_json.get("skipped") == 27
+    assert response_json.get("inserted") == 9 * 3 * 24 * 4 - 27
+    assert response_json.get("elapsed") >= 0
+    timetable = await fetch_all(select(BusTimetable).where(BusTimetable.route_id == 2))
+    assert len(timetable) == 3 * 24 * 4
+
+
+@pytest.mark.asyncio
+async def test_import_bus_timetable_ndjson(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_route,
+):
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/bus/timetable/import",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/x-ndjson",
+        },
+        data='{"routeID": 1, "start": 1, "weekdays": "weekdays", "departureTime": "08:00:00"}\n'
+        '{"routeID": 1, "start": 1, "weekdays": "weekdays", "departureTime": "08:10:00"}\n',
+    )
+    assert response.status_code == 201
+    assert response.json().get("inserted") == 2
+    assert response.json().get("skipped") == 0
+
+
+@pytest.mark.asyncio
+async def test_import_bus_timetable_invalid(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_bus_route,
+):
+    access_token = await get_access_token(client)
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "text/csv",
+    }
+    response = await client.post(
+        "/api/bus/timetable/import",
+        headers=headers,
+        data="routeID,start,weekdays,departureTime\n1,1,weekdays,08:00:00\n100,1,weekdays,08:00:00\n",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "ROUTE_NOT_FOUND"}
+    response = await client.post(
+        "/api/bus/timetable/import",
+        headers=headers,
+        data="routeID,start,weekdays,departureTime\n1,100,weekdays,08:00:00\n",
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "START_STOP_NOT_FOUND"}
+    response = await client.post(
+        "/api/bus/timetable/import",
+        headers=headers,
+        data="routeID,start,weekdays,departureTime\n1,1,weekdays,25:00:00\n",
+    )
+    assert response.status_code == 422
+    # 실패한 가져오기는 아무것도 남기지 않는다.
+    assert await fetch_all(select(BusTimetable)) == []
@@ -1,7 +1,10 @@
 import pytest
 from async_asgi_testclient import TestClient
+from sqlalchemy import text
 
+from database import engine
 from query.router import graphql_schema
+from tests.utils import get_access_token
 
 
 @pytest.mark.asyncio
@@ -93,3 +96,100 @@ async def test_notice_query_with_filter_by_title(
         assert "category" in notice.keys()
         assert "id" in notice["category"].keys()
         assert "name" in notice["category"].keys()
+
+
+@pytest.mark.asyncio
+async def test_notice_query_with_filter_by_title_after_write(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_notice_category,
+    create_test_notice,
+):
+    query = """
+        query {
+            notice (language: "korean", title: "fresh_title") { title }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data["notice"] == []
+
+    # 검색 색인이 만들어진 뒤에 추가한 공지사항도 바로 검색된다.
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/notice/100/notices",
+        json={
+            "title": "fresh_title",
+            "url": "test_url",
+            "expired": "2099-12-31T00:00:00+09:00",
+            "language": "korean",
+        },
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 201
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert [notice["title"] for notice in response.data["notice"]] == ["fresh_title"]
+
+
+@pytest.mark.asyncio
+async def test_notice_query_with_filter_by_title_candidate_limit(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_notice_category,
+    create_test_notice,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    from config import settings
+    from search import trigram_available
+
+    if await trigram_available():
+        pytest.skip("pg_trgm is installed")
+    values = ", ".join(
+        f"({i}, 'test_title{i}', 'test_url', NULL, 100, 'test_id', 'korean')" for i in range(1, 6)
+    )
+    async with engine.begin() as conn:
+        await conn.execute(text(f"INSERT INTO notices VALUES {values}"))
+    monkeypatch.setattr(settings, "SEARCH_CANDIDATE_LIMIT", 2)
+    query = """
+        query {
+            notice (language: "korean", title: "test_title") { title }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    # 후보가 많으면 유사도를 계산하지 않고 모든 제목을 원래 순서(id)대로 돌려준다.
+    assert [notice["title"] for notice in response.data["notice"]] == [
+        "test_title1",
+        "test_title2",
+        "test_title3",
+        "test_title4",
+        "test_title5",
+        "test_title9999",
+    ]
+
+    monkeypatch.setattr(settings, "SEARCH_CANDIDATE_LIMIT", 10)
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    # 후보가 적으면 유사도 순으로 정렬하고, 유사도가 같으면 id 순으로 정렬한다.
+    assert [notice["title"] for notice in response.data["notice"]][-1] == "test_title9999"
+
+
+@pytest.mark.asyncio
+async def test_notice_query_rechecks_trigram_after_write(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_notice_category,
+    create_test_notice,
+):
+    import search
+    from model.notice import Notice
+
+    await search.trigram_available()
+    assert search._trigram_available is not None
+    # 쓰기 후에는 pg_trgm 설치 여부도 다시 확인한다.
+    search.invalidate_index(Notice.title)
+    assert search._trigram_available is None
@@ -1,10 +1,18 @@
-from datetime import datetime
+import asyncio
+from datetime import date, datetime, time
 
 import pytest
 from async_asgi_testclient import TestClient
 from pytz import timezone
 
 from query.router import graphql_schema
+from shuttle.cache import (
+    CompiledServiceCalendar,
+    CompiledShuttleDepartures,
+    CompiledShuttleTimetable,
+)
+from shuttle.refresh import view_refresher
+from tests.utils import get_access_token
 
 
 def validate_stop_response(stop: dict):
@@ -734,3 +742,438 @@ async def test_get_shuttle_grouped_timetable(
         assert "stop" in item
         assert "time" in item
         assert "destination" in item
+
+
+def test_compiled_shuttle_timetable_search() -> None:
+    rows = [
+        (1, "semester", True, "route_a", "DH", "stop_a", time(8, 0)),
+        (1, "semester", True, "route_a", "DH", "stop_b", time(8, 10)),
+        (2, "semester", True, "route_b", "DY", "stop_a", time(7, 30)),
+        (3, "semester", False, "route_a", "DH", "stop_a", time(9, 0)),
+        (4, "vacation", True, "route_a", "DH", "stop_a", time(8, 5)),
+    ]
+    timetable = CompiledShuttleTimetable(rows)
+
+    result = timetable.search(period=["semester"], weekdays=True, stop_name=["stop_a"])
+    assert [item.seq for item in result] == [2, 1]
+    assert timetable.via[1] == (("stop_a", 8 * 3600), ("stop_b", 8 * 3600 + 600))
+
+    result = timetable.search(start=8 * 3600, end=8 * 3600 + 300)
+    assert [item.seq for item in result] == [1, 4]
+
+    result = timetable.search(route_name=["route_b"], route_tag=["DY"])
+    assert [(item.seq, item.route_name, item.stop_name) for item in result] == [(2, "route_b", "stop_a")]
+    assert timetable.search(route_name=["route_c"]) == []
+
+
+def test_compiled_service_calendar() -> None:
+    kst = timezone("Asia/Seoul")
+    calendar = CompiledServiceCalendar(
+        periods=[
+            (
+                kst.localize(datetime(2024, 1, 1, 0, 0, 0)),
+                kst.localize(datetime(2024, 2, 29, 23, 59, 59)),
+                "semester",
+            ),
+            (
+                kst.localize(datetime(2024, 1, 15, 0, 0, 0)),
+                kst.localize(datetime(2024, 1, 31, 23, 59, 59)),
+                "vacation",
+            ),
+        ],
+        holidays=[
+            (date(2024, 1, 2), "weekends", "solar"),
+            (date(2024, 1, 1), "halt", "lunar"),
+        ],
+        window_start=date(2024, 1, 1),
+        window_days=31,
+    )
+    assert calendar.get(date(2024, 1, 2)) == ("semester", "weekends")
+    assert calendar.get(date(2024, 1, 3)) == ("semester", "weekdays")
+    assert calendar.get(date(2024, 1, 6)) == ("semester", "weekends")
+    assert calendar.get(date(2024, 1, 16)) == ("vacation", "weekdays")
+    # 음력 1월 1일 (양력 2024-02-10), 미리 계산된 범위 밖의 날짜
+    assert calendar.get(date(2024, 2, 10)) == ("semester", "halt")
+    assert calendar.get(date(2024, 3, 4)) == (None, "weekdays")
+
+
+def test_compiled_service_calendar_period_boundary() -> None:
+    kst = timezone("Asia/Seoul")
+    calendar = CompiledServiceCalendar(
+        periods=[
+            (
+                kst.localize(datetime(2024, 1, 1, 0, 0, 0)),
+                kst.localize(datetime(2024, 1, 10, 12, 0, 0)),
+                "semester",
+            ),
+            (
+                kst.localize(datetime(2024, 1, 10, 12, 0, 1)),
+                kst.localize(datetime(2024, 1, 31, 23, 59, 59)),
+                "vacation",
+            ),
+        ],
+        holidays=[],
+        window_start=date(2024, 1, 1),
+        window_days=31,
+    )
+    # 기간이 바뀌는 날에는 조회 시각에 따라 운행 기간이 달라진다.
+    assert calendar.at(kst.localize(datetime(2024, 1, 10, 9, 0, 0))) == ("semester", "weekdays")
+    assert calendar.at(kst.localize(datetime(2024, 1, 10, 12, 0, 0))) == ("semester", "weekdays")
+    assert calendar.at(kst.localize(datetime(2024, 1, 10, 15, 0, 0))) == ("vacation", "weekdays")
+    assert calendar.at(datetime(2024, 1, 10, 15, 0, 0)) == ("vacation", "weekdays")
+    assert calendar.get(date(2024, 1, 10)) == ("semester", "weekdays")
+    # 운행 기간이 끝난 뒤의 시각에는 기간이 없다.
+    assert calendar.at(kst.localize(datetime(2024, 2, 1, 0, 0, 0))) == (None, "weekdays")
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_timetable_after_holiday_created(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_period,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+) -> None:
+    query = """
+        query {
+            shuttle (timestamp: "2024-01-10T12:00:00+09:00") {
+                timetable { id }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    assert len(response.data["shuttle"]["timetable"]) == 9
+
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/shuttle/holiday",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "calendar": "solar",
+            "date": "2024-01-10",
+            "type": "halt",
+        },
+    )
+    assert response.status_code == 201
+
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    assert response.data["shuttle"]["timetable"] == []
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_timetable_via(
+    client: TestClient,
+    clean_db,
+    create_test_shuttle_period,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+) -> None:
+    from shuttle.query import resolve_shuttle_timetable
+
+    timetable = await resolve_shuttle_timetable(timestamp=None, period=["semester"])
+    assert len(timetable) > 0
+    for item in timetable:
+        departures = [departure for _, departure in item.via_stops]
+        assert departures == sorted(departures)
+        assert [via.stop for via in item.via()] == [stop for stop, _ in item.via_stops]
+        assert item.stop_name in [via.stop for via in item.via()]
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_timetable_after_update(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_period,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+) -> None:
+    query = """
+        query {
+            shuttle (period: ["semester"], routeName: ["test_route1"]) {
+                timetable { id, time }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    timetable = response.data["shuttle"]["timetable"]
+    assert len(timetable) == 9
+    assert [item["time"] for item in timetable] == sorted(item["time"] for item in timetable)
+
+    access_token = await get_access_token(client)
+    response = await client.put(
+        "/api/shuttle/timetable/1",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "period": "semester",
+            "weekdays": True,
+            "route": "test_route1",
+            "time": "23:00:00",
+        },
+    )
+    assert response.status_code == 200
+    await view_refresher.flush()
+
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    timetable = response.data["shuttle"]["timetable"]
+    assert len(timetable) == 9
+    assert timetable[-1] == {"id": 1, "time": "23:01:00"}
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_query_resolves_selected_fields_only(
+    client: TestClient,
+    clean_db,
+    create_test_shuttle_period,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from shuttle import query as shuttle_query
+
+    async def unexpected_resolver(*args, **kwargs):
+        raise AssertionError("unselected field was resolved")
+
+    for resolver in (
+        "resolve_shuttle_period",
+        "resolve_shuttle_holiday",
+        "resolve_shuttle_stop",
+        "resolve_shuttle_route",
+        "resolve_shuttle_timetable",
+    ):
+        monkeypatch.setattr(shuttle_query, resolver, unexpected_resolver)
+
+    query = """
+        query {
+            shuttle {
+                groupedTimetable {
+                    id, period, weekdays, route, tag, stop, time, destination
+                }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    assert isinstance(response.data["shuttle"]["groupedTimetable"], list)
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_query_concurrent_limit(
+    client: TestClient,
+    clean_db,
+    create_test_shuttle_period,
+    create_test_shuttle_holiday,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from config import settings
+    from shuttle import query as shuttle_query
+
+    limit = settings.SHUTTLE_QUERY_CONCURRENCY
+    in_flight, peak = 0, 0
+    saturated = asyncio.Event()
+
+    def instrumented(resolver):
+        async def wrapper(*args, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            if in_flight >= limit:
+                saturated.set()
+            try:
+                # 제한 개수만큼 동시에 실행되어야 진행한다. 순차 실행이면 시간 초과로 실패한다.
+                await asyncio.wait_for(saturated.wait(), timeout=5)
+                return await resolver(*args, **kwargs)
+            finally:
+                in_flight -= 1
+        return wrapper
+
+    resolvers = (
+        "resolve_shuttle_period",
+        "resolve_shuttle_holiday",
+        "resolve_shuttle_stop",
+        "resolve_shuttle_route",
+        "resolve_shuttle_timetable",
+        "resolve_shuttle_grouped_timetable",
+    )
+    assert len(resolvers) > limit
+    for resolver in resolvers:
+        monkeypatch.setattr(shuttle_query, resolver, instrumented(getattr(shuttle_query, resolver)))
+
+    query = """
+        query {
+            shuttle {
+                period { type }
+                holiday { date }
+                stop { name }
+                route { name }
+                timetable { id }
+                groupedTimetable { id }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert peak == limit
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("group", ["destination", "time"])
+async def test_get_shuttle_grouped_timetable_plan_uses_index(
+    clean_db,
+    group: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from sqlalchemy import text
+    from sqlalchemy.dialects import postgresql
+
+    from database import engine
+    from shuttle import query as shuttle_query
+
+    plans: list[str] = []
+
+    async def explain(query):
+        compiled = query.compile(
+            dialect=postgresql.asyncpg.dialect(),
+            compile_kwargs={"render_postcompile": True},
+        )
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+        async with engine.begin() as conn:
+            # 데이터가 적어 순차 탐색이 선택되는 것을 막고 인덱스 사용 여부만 확인한다.
+            await conn.execute(text("set local enable_seqscan = off"))
+            result = await conn.exec_driver_sql(f"explain {compiled}", parameters)
+            plans.append("\n".join(row[0] for row in result.all()))
+        return []
+
+    monkeypatch.setattr(shuttle_query, "fetch_all", explain)
+    await shuttle_query.resolve_shuttle_grouped_timetable(
+        group=group,
+        period=["semester"],
+        weekdays=[True],
+        stop_name=["shuttlecock_o"],
+        start=time(8, 0, 0),
+    )
+    assert len(plans) == 1
+    assert "idx_shuttle_timetable_grouped_view_" in plans[0]
+    assert "Seq Scan" not in plans[0]
+    assert "Sort Key: shuttle_timetable_grouped_view.stop_name" not in plans[0]
+
+
+def test_compiled_shuttle_departures_next() -> None:
+    kst = timezone("Asia/Seoul")
+    calendar = CompiledServiceCalendar(
+        periods=[
+            (
+                kst.localize(datetime(2024, 1, 1, 0, 0, 0)),
+                kst.localize(datetime(2024, 2, 29, 23, 59, 59)),
+                "semester",
+            ),
+        ],
+        holidays=[(date(2024, 1, 4), "halt", "solar")],
+        window_start=date(2024, 1, 1),
+        window_days=31,
+    )
+    rows = [
+        (1, "semester", True, "route_a", "DH", "stop_a", "STATION", time(8, 0)),
+        (2, "semester", True, "route_a", "DH", "stop_a", "STATION", time(23, 30)),
+        (3, "semester", True, "route_b", "DY", "stop_a", "TERMINAL", time(9, 0)),
+        (4, "semester", False, "route_a", "DH", "stop_a", "STATION", time(10, 0)),
+    ]
+    departures = CompiledShuttleDepartures(rows)
+    assert departures.groups == {"stop_a": ["STATION", "TERMINAL"]}
+
+    # 2024-01-03 (수) 23:00, 다음 날은 운행 중지이므로 2024-01-05 (금)까지 이어서 찾는다.
+    result = departures.next(calendar, ["stop_a"], kst.localize(datetime(2024, 1, 3, 23, 0)), 2)
+    assert [(item.seq, item.destination_group, item.date) for item in result] == [
+        (2, "STATION", date(2024, 1, 3)),
+        (1, "STATION", date(2024, 1, 5)),
+        (3, "TERMINAL", date(2024, 1, 5)),
+        (3, "TERMINAL", date(2024, 1, 8)),
+    ]
+    # 2024-01-05 (금) 23:45 이후에는 주말 시간표를 사용한다.
+    result = departures.next(calendar, None, kst.localize(datetime(2024, 1, 5, 23, 45)), 1)
+    assert [(item.seq, item.date) for item in result] == [(4, date(2024, 1, 6)), (3, date(2024, 1, 8))]
+    # 시간 순으로 묶으면 행선지와 관계없이 정류장별로 가장 빠른 출발만 남긴다.
+    result = departures.next(calendar, ["stop_a"], kst.localize(datetime(2024, 1, 3, 23, 0)), 2, group="time")
+    assert [(item.seq, item.destination_group, item.date) for item in result] == [
+        (2, "STATION", date(2024, 1, 3)),
+        (1, "STATION", date(2024, 1, 5)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_next_departures(
+    client: TestClient,
+    clean_db,
+    create_test_shuttle_grouped_timetable,
+) -> None:
+    query = """
+        query {
+            shuttle (timestamp: "2024-01-03T23:00:00+09:00", stopName: ["shuttlecock_o"], count: 3) {
+                nextDepartures { id, stop, destination, date, time }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    assert response.data["shuttle"]["nextDepartures"] == [
+        {"id": 3, "stop": "shuttlecock_o", "destination": "STATION", "date": "2024-01-03", "time": "23:30:00"},
+        {"id": 1, "stop": "shuttlecock_o", "destination": "STATION", "date": "2024-01-04", "time": "08:00:00"},
+        {"id": 2, "stop": "shuttlecock_o", "destination": "STATION", "date": "2024-01-04", "time": "12:00:00"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_query_not_modified(
+    client: TestClient,
+    clean_db,
+    create_test_shuttle_period,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+) -> None:
+    from shuttle.version import bump_version
+
+    version = await bump_version()
+    query = """
+        query ($version: Int) {
+            shuttle (period: ["semester"], version: $version) {
+                version, notModified
+                timetable { id }
+                nextDepartures { id }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query, variable_values={"version": version})
+    assert response.errors is None
+    assert response.data is not None
+    assert response.data["shuttle"] == {
+        "version": version,
+        "notModified": True,
+        "timetable": [],
+        "nextDepartures": [],
+    }
+
+    response = await graphql_schema.execute(query, variable_values={"version": version - 1})
+    assert response.errors is None
+    assert response.data is not None
+    assert response.data["shuttle"]["version"] == version
+    assert response.data["shuttle"]["notModified"] is False
+    assert len(response.data["shuttle"]["timetable"]) == 9
+
+    response = await graphql_schema.execute(query, variable_values={"version": None})
+    assert response.errors is None
+    assert response.data is not None
+    assert response.data["shuttle"]["version"] == version
+    assert response.data["shuttle"]["notModified"] is False
@@ -4,8 +4,17 @@ import pytest
 from async_asgi_testclient import TestClient
 from sqlalchemy import select
 
-from database import fetch_one
-from model.shuttle import ShuttleHoliday, ShuttlePeriod, ShuttleRoute, ShuttleStop, ShuttleRouteStop, ShuttleTimetable
+from database import fetch_one, fetch_all
+from model.shuttle import (
+    ShuttleHoliday,
+    ShuttlePeriod,
+    ShuttleRoute,
+    ShuttleStop,
+    ShuttleRouteStop,
+    ShuttleTimetable,
+    ShuttleTimetableView,
+)
+from shuttle.refresh import view_refresher
 from tests.utils import get_access_token
 from utils import KST
 
@@ -1633,6 +1642,99 @@ async def test_create_shuttle_timetable_internal_server_error(
     assert response_json.get("detail") == "INTERNAL_SERVER_ERROR"
 
 
+@pytest.mark.asyncio
+async def test_import_shuttle_timetable(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_timetable,
+):
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/shuttle/timetable/import",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=[
+            {"period": "semester", "weekdays": True, "route": "test_route1", "time": "08:00:00"},
+            {"period": "semester", "weekdays": False, "route": "test_route2", "time": "09:00:00"},
+        ],
+    )
+    assert response.status_code == 201
+    response_json = response.json()
+    assert response_json.get("period") == ["semester"]
+    assert response_json.get("deleted") == 9
+    assert response_json.get("inserted") == 2
+    timetable = await fetch_all(select(ShuttleTimetable).where(ShuttleTimetable.period == "semester"))
+    assert len(timetable) == 2
+    view = await fetch_all(select(ShuttleTimetableView).where(ShuttleTimetableView.period == "semester"))
+    assert {item.id_ for item in view} == {item.id_ for item in timetable}
+
+
+@pytest.mark.asyncio
+async def test_import_shuttle_timetable_csv(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_period,
+):
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/shuttle/timetable/import",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "text/csv",
+        },
+        data="period,weekdays,route,time\n"
+        "semester,true,test_route1,08:00:00\n"
+        "vacation,false,test_route1,08:30:00\n",
+    )
+    assert response.status_code == 201
+    response_json = response.json()
+    assert response_json.get("period") == ["semester", "vacation"]
+    assert response_json.get("deleted") == 0
+    assert response_json.get("inserted") == 2
+    view = await fetch_all(select(ShuttleTimetableView).where(ShuttleTimetableView.route_name == "test_route1"))
+    assert len(view) > 0
+
+
+@pytest.mark.asyncio
+async def test_import_shuttle_timetable_invalid(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_timetable,
+):
+    access_token = await get_access_token(client)
+    response = await client.post(
+        "/api/shuttle/timetable/import",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=[{"period": "semester", "weekdays": True, "route": "test_route100", "time": "08:00:00"}],
+    )
+    assert response.status_code == 404
+    assert response.json().get("detail") == "ROUTE_NOT_FOUND"
+
+    response = await client.post(
+        "/api/shuttle/timetable/import",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=[{"period": "semester", "weekdays": True, "route": "test_route1"}],
+    )
+    assert response.status_code == 422
+
+    response = await client.post(
+        "/api/shuttle/timetable/import",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json=[
+            {"period": "semester", "weekdays": True, "route": "test_route1", "time": "08:00:00"},
+            {"period": "semester", "weekdays": True, "route": "test_route1", "time": "08:00:00"},
+        ],
+    )
+    assert response.status_code == 409
+    assert response.json().get("detail") == "DUPLICATE_TIMETABLE"
+    timetable = await fetch_all(select(ShuttleTimetable))
+    assert len(timetable) == 9
+
+
 @pytest.mark.asyncio
 async def test_get_shuttle_timetable_item(
     client: TestClient,
@@ -1986,3 +2088,129 @@ async def test_get_shuttle_timetable_view_filter_end_time(
         assert schedule.get("route") is not None
         assert schedule.get("stop") is not None
         assert schedule.get("time") <= "05:00"
+
+
+@pytest.mark.asyncio
+async def test_refresh_shuttle_timetable_view(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_route_stop,
+    create_test_shuttle_period,
+):
+    access_token = await get_access_token(client)
+    for time in ["08:00:00", "08:10:00", "08:20:00"]:
+        response = await client.post(
+            "/api/shuttle/timetable",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "period": "semester",
+                "weekdays": True,
+                "route": "test_route1",
+                "time": time,
+            },
+        )
+        assert response.status_code == 201
+
+    response = await client.get(
+        "/api/shuttle/timetable-view/status",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    assert response.json().get("pending") is True
+
+    await view_refresher.flush()
+    response = await client.get(
+        "/api/shuttle/timetable-view/status",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 200
+    response_json = response.json()
+    assert response_json.get("pending") is False
+    assert response_json.get("refreshedAt") is not None
+    assert response_json.get("duration") >= 0
+    view = await fetch_all(select(ShuttleTimetableView))
+    assert len({item.id_ for item in view}) == 3
+
+    response = await client.post(
+        "/api/shuttle/timetable-view/refresh",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 202
+    assert response.json().get("pending") is True
+    await view_refresher.flush()
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_stop_next_departure(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_grouped_timetable,
+):
+    access_token = await get_access_token(client)
+    response = await client.get(
+        "/api/shuttle/stop/shuttlecock_o/departure",
+        headers={"Authorization": f"Bearer {access_token}"},
+        query_string={"count": 2, "timestamp": "2024-01-03T23:00:00+09:00"},
+    )
+    assert response.status_code == 200
+    response_json = response.json()
+    assert [(item.get("sequence"), item.get("date"), item.get("time")) for item in response_json.get("data")] == [
+        (3, "2024-01-03", "23:30:00"),
+        (1, "2024-01-04", "08:00:00"),
+    ]
+    assert response_json.get("data")[0].get("destination") == "STATION"
+    assert response_json.get("data")[0].get("tag") == "DH"
+
+    response = await client.get(
+        "/api/shuttle/stop/test_stop100/departure",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 404
+    assert response.json().get("detail") == "STOP_NOT_FOUND"
+
+
+@pytest.mark.asyncio
+async def test_get_shuttle_timetable_not_modified(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_shuttle_timetable,
+):
+    access_token = await get_access_token(client)
+    for path in ["/api/shuttle/timetable", "/api/shuttle/timetable-view"]:
+        response = await client.get(path, headers={"Authorization": f"Bearer {access_token}"})
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag is not None
+
+        response = await client.get(
+            path,
+            headers={"Authorization": f"Bearer {access_token}", "If-None-Match": etag},
+        )
+        assert response.status_code == 304
+        assert response.headers.get("ETag") == etag
+        assert response.content == b""
+
+        response = await client.get(path, headers={"If-None-Match": etag})
+        assert response.status_code == 401
+
+    response = await client.put(
+        "/api/shuttle/timetable/1",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={
+            "period": "semester",
+            "weekdays": False,
+            "route": "test_route1",
+            "time": "10:00:00",
+        },
+    )
+    assert response.status_code == 200
+    response = await client.get(
+        "/api/shuttle/timetable",
+        headers={"Authorization": f"Bearer {access_token}", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers.get("ETag") != etag
+    await view_refresher.flush()
@@ -1,7 +1,15 @@
+import datetime
+from datetime import time
+
 import pytest
 from async_asgi_testclient import TestClient
+from sqlalchemy import text
 
+from database import engine
 from query.router import graphql_schema
+from subway.cache import CompiledSubwayTimetable
+from subway.estimator import SubwayArrivalModel
+from utils import KST
 
 
 def validate_response(response: dict) -> None:
@@ -355,3 +363,135 @@ async def test_get_subway_query_filter_weekends(
             assert item["weekdays"] is False
         for item in down_timetable:
             assert item["weekdays"] is False
+
+
+@pytest.mark.asyncio
+async def test_get_subway_query_filter_window(
+    client: TestClient,
+    clean_db,
+    create_test_subway_realtime,
+    create_test_subway_timetable,
+) -> None:
+    query = """
+        query {
+            subway (weekdays: true, start: "00:03:00", end: "00:06:00") {
+                id,
+                timetable {
+                    up { weekdays, time, terminal { id } },
+                    down { weekdays, time, terminal { id } }
+                }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    for station in response.data["subway"]:
+        timetable = station["timetable"]
+        index = int(station["id"][1:])
+        if 3 <= index <= 6:
+            assert timetable["up"] == [{"weekdays": True, "time": f"00:0{index}:00", "terminal": {"id": "K009"}}]
+            assert timetable["down"] == [{"weekdays": True, "time": f"00:0{index}:00", "terminal": {"id": "K001"}}]
+        else:
+            assert timetable["up"] == []
+            assert timetable["down"] == []
+
+
+def test_compiled_subway_timetable_search() -> None:
+    stations = [("K001", "station_a"), ("K002", "station_b"), ("K009", "station_z")]
+    rows = [
+        ("K002", "up", "weekdays", time(8, 10), "K001", "K009"),
+        ("K002", "up", "weekdays", time(8, 0), "K001", "K009"),
+        ("K002", "up", "weekends", time(8, 5), "K001", "K009"),
+        ("K002", "down", "weekdays", time(8, 3), "K009", "K001"),
+    ]
+    timetable = CompiledSubwayTimetable(stations, rows)
+
+    result = timetable.search("K002", "up")
+    assert [(item.weekday, item.departure) for item in result] == [
+        ("weekdays", 8 * 3600), ("weekends", 8 * 3600 + 300), ("weekdays", 8 * 3600 + 600),
+    ]
+    assert (result[0].start_station_name, result[0].terminal_station_name) == ("station_a", "station_z")
+
+    result = timetable.search("K002", "up", weekdays=True, start=8 * 3600 + 1, end=8 * 3600 + 600)
+    assert [item.departure for item in result] == [8 * 3600 + 600]
+    assert [item.terminal_station_id for item in timetable.search("K002", "down")] == ["K001"]
+    assert timetable.search("K001", "up") == []
+
+
+def test_subway_arrival_model_estimate() -> None:
+    stations = [
+        (f"K00{i}", 1001, f"station_{i}", i, datetime.timedelta(minutes=2 * i)) for i in range(1, 6)
+    ]
+    now = datetime.datetime(2024, 3, 5, 8, 0, tzinfo=KST)
+    realtime = [
+        # 1번 열차는 2번 역과 3번 역 정보가 모두 남아 있다.
+        dict(station_id="K002", heading="true", time=datetime.timedelta(minutes=1), train_number="1"),
+        dict(station_id="K003", heading="true", time=datetime.timedelta(minutes=2), train_number="1"),
+        dict(station_id="K001", heading="true", time=datetime.timedelta(minutes=5), train_number="2"),
+        # 종착역 방향이 반대인 열차는 5번 역을 지나지 않는다.
+        dict(station_id="K004", heading="true", time=datetime.timedelta(minutes=1), train_number="3"),
+    ]
+    rows = [
+        type("Row", (), dict(
+            item, location="station_0", stop=1, terminal_station_id="K005" if item["train_number"] != "3" else "K001",
+            is_express=False, is_last=False, status=0, updated_at=now - datetime.timedelta(minutes=3),
+        ))
+        for item in realtime
+    ]
+    model = SubwayArrivalModel(stations, rows)
+    timetable = CompiledSubwayTimetable(
+        [(station_id, name) for station_id, _, name, _, _ in stations],
+        [
+            ("K005", "up", "weekdays", time(8, 30), "K001", "K005"),
+            ("K005", "up", "weekdays", time(7, 30), "K001", "K005"),
+        ],
+    )
+
+    result = model.estimate(timetable, "K005", "true", now, 3)
+    assert [(item.sequence, item.train_number, item.arrival, item.stop) for item in result] == [
+        (1, "1", now + datetime.timedelta(minutes=3), 3),
+        (2, "2", now + datetime.timedelta(minutes=10), 5),
+        (3, "", now + datetime.timedelta(minutes=30), 4),
+    ]
+    assert model.estimate(timetable, "K005", "false", now, 3) == []
+
+
+@pytest.mark.asyncio
+async def test_get_subway_query_estimated_realtime(
+    client: TestClient,
+    clean_db,
+    create_test_subway_route_station,
+) -> None:
+    updated_at = datetime.datetime.now(tz=KST) - datetime.timedelta(minutes=2)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO subway_realtime VALUES "
+                f"('K002', 1, 'test_station_name1', 1, '00:01:00', 'true', 'K009', '4001', '{updated_at}', "
+                "false, false, 1)",
+            ),
+        )
+    query = """
+        query {
+            subway (id_: ["K002", "K005"]) {
+                id,
+                realtime {
+                    up { sequence, stop, time, trainNo, estimated, terminal { id } },
+                    down { sequence, estimated }
+                }
+            }
+        }
+    """
+    response = await graphql_schema.execute(query)
+    assert response.errors is None
+    assert response.data is not None
+    realtime = {station["id"]: station["realtime"] for station in response.data["subway"]}
+    # 2번 역을 1분 전에 지난 열차는 3분 뒤(누적 시간 차이) 5번 역에 도착한다.
+    assert realtime["K002"]["up"] == []
+    [estimate] = realtime["K005"]["up"]
+    assert (estimate["sequence"], estimate["stop"], estimate["trainNo"]) == (1, 4, "4001")
+    assert estimate["estimated"] is True
+    assert estimate["terminal"] == {"id": "K009"}
+    assert 1.5 <= estimate["time"] <= 2.0
+    assert realtime["K005"]["down"] == []
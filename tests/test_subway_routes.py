@@ -4,7 +4,7 @@ from sqlalchemy import select
 
 from database import fetch_one
 from model.subway import SubwayStation, SubwayRoute, SubwayRouteStation, SubwayTimetable
-from tests.utils import get_access_token
+from tests.utils import get_access_token, read_events
 
 
 @pytest.mark.asyncio
@@ -1126,3 +1126,147 @@ async def test_get_subway_realtime(
         assert item.get("terminalStationID") is not None
         assert item.get("last") is not None
         assert item.get("status") is not None
+
+
+@pytest.mark.asyncio
+async def test_ingest_subway_realtime(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_subway_realtime,
+) -> None:
+    access_token = await get_access_token(client)
+    arrival = {
+        "sequence": 1, "current": "test_station_name1", "station": 2, "time": 150, "heading": "true",
+        "trainNumber": "4101", "express": False, "last": False, "terminalStationID": "K009", "status": 1,
+    }
+    response = await client.get(
+        "/api/subway/station/K002/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    etag = response.headers.get("ETag")
+    assert etag == '"subway-realtime-0"'
+
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stationID": "K002", "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 201
+    assert response.json().get("station") == ["K002"]
+    assert response.json().get("deleted") == 2
+    assert response.json().get("inserted") == 1
+    version = response.json().get("version")
+
+    response = await client.get(
+        "/api/subway/station/K002/realtime",
+        headers={"Authorization": f"Bearer {access_token}", "If-None-Match": etag},
+    )
+    assert response.status_code == 200
+    assert response.headers.get("ETag") == f'"subway-realtime-{version}"'
+    assert [(item.get("sequence"), item.get("time")) for item in response.json().get("data")] == [(1, "00:02:30")]
+    response = await client.get(
+        "/api/subway/station/K002/realtime",
+        headers={"Authorization": f"Bearer {access_token}", "If-None-Match": f'"subway-realtime-{version}"'},
+    )
+    assert response.status_code == 304
+    response = await client.get(
+        "/api/subway/station/K002/realtime",
+        headers={"If-None-Match": f'"subway-realtime-{version}"'},
+    )
+    assert response.status_code == 401
+
+    # 노선 단위 교체는 스냅샷에 없는 역의 도착 정보도 비운다.
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"routeID": 1001, "data": [{"stationID": "K003", "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 201
+    assert response.json().get("deleted") == 17
+    assert response.json().get("version") == version + 1
+    response = await client.get(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert [item.get("stationID") for item in response.json().get("data")] == ["K003"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_subway_realtime_invalid(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_subway_route_station,
+) -> None:
+    access_token = await get_access_token(client)
+    arrival = {
+        "sequence": 1, "current": "test_station_name1", "station": 2, "time": 150, "heading": "true",
+        "trainNumber": "4101", "express": False, "last": False, "terminalStationID": "K009", "status": 1,
+    }
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stationID": "K999", "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "STATION_NOT_FOUND"}
+
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"routeID": 9999, "data": [{"stationID": "K001", "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "ROUTE_NOT_FOUND"}
+
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"data": [{"stationID": "K001", "arrivals": [arrival, arrival]}]},
+    )
+    assert response.status_code == 409
+    assert response.json() == {"detail": "DUPLICATE_REALTIME"}
+
+
+@pytest.mark.asyncio
+async def test_stream_subway_realtime(
+    client: TestClient,
+    clean_db,
+    create_test_user,
+    create_test_subway_realtime,
+) -> None:
+    # 앱 사용자도 구독할 수 있도록 인증 없이 연결한다.
+    response = await client.get("/api/subway/realtime/stream?station_id=K001&station_id=K002", stream=True)
+    assert response.status_code == 200
+    events = read_events(response)
+    initial = {event["key"]: event["data"] for event in [await anext(events), await anext(events)]}
+    assert initial.keys() == {"K001", "K002"}
+    # GraphQL 응답과 같이 방면별로 남은 시간(분)을 보낸다.
+    up = initial["K002"]["up"]
+    assert [(item["trainNo"], round(item["time"]), item["estimated"]) for item in up] == [("4002", 2, False)]
+    assert up[0]["terminal"] == {"id": "K009", "name": "test_station_name9"}
+    assert [item["trainNo"] for item in initial["K002"]["down"]] == ["4002"]
+
+    # 노선 단위 교체로 비워진 역도 함께 알린다.
+    access_token = await get_access_token(client)
+    arrival = {
+        "sequence": 1, "current": "test_station_name1", "station": 2, "time": 150, "heading": "true",
+        "trainNumber": "4101", "express": False, "last": False, "terminalStationID": "K009", "status": 1,
+    }
+    response = await client.post(
+        "/api/subway/realtime",
+        headers={"Authorization": f"Bearer {access_token}"},
+        json={"routeID": 1001, "data": [{"stationID": "K002", "arrivals": [arrival]}]},
+    )
+    assert response.status_code == 201
+    updates = {event["key"]: event["data"] for event in [await anext(events), await anext(events)]}
+    # 실시간 정보가 없는 방면은 추정값만 보낸다.
+    assert all(item["estimated"] for item in updates["K001"]["up"] + updates["K001"]["down"])
+    assert [(item["trainNo"], item["time"], item["estimated"]) for item in updates["K002"]["up"]] == [
+        ("4101", 2.5, False),
+    ]
+
+    response = await client.get("/api/subway/realtime/stream?station_id=K999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "STATION_NOT_FOUND"}
@@ -1,3 +1,6 @@
+import json
+from typing import AsyncIterator
+
 from async_asgi_testclient import TestClient
 
 
@@ -16,3 +19,15 @@ async def get_access_token(client: TestClient) -> str:
 
     assert access_token is not None
     return access_token
+
+
+async def read_events(response) -> AsyncIterator[dict]:
+    # text/event-stream 응답에서 data 줄만 JSON으로 읽는다.
+    buffer = ""
+    async for chunk in response.iter_content(1024):
+        buffer += chunk.decode()
+        while "\n\n" in buffer:
+            event, buffer = buffer.split("\n\n", 1)
+            for line in event.split("\n"):
+                if line.startswith("data: "):
+                    yield json.loads(line.removeprefix("data: "))